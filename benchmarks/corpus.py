@@ -0,0 +1,327 @@
+# 合成测试语料：按 发包规范V1_PPT 字段配置生成PPT（标题位置、规则关键字、群组图片、版本变更表），以及N行的方案总表
+# 用法：python -m benchmarks.corpus --out DIR [--decks 10] [--slides 30] [--shapes 20] [--table-rows 5] [--rows 1000]
+# 每个PPT的预期提取结果写入 DIR/manifest.json，可用来校验生成的语料确实命中全部字段规则
+import io
+import os
+import sys
+import json
+import random
+import argparse
+from typing import Dict, List, Optional, Sequence
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 与 config/title_positions.yaml（v1）及 config/filelds_config.yaml（发包规范V1_PPT）一致的位置，单位cm
+TITLE_BOX = (8.0, 0.6, 9.4, 1.4)
+SECOND_TITLE_BOX = (0.1, 2.2, 5.9, 1.0)
+PROJECT_CODE_BOX = (22.0, 1.4, 2.0, 3.35)
+DFM_INFO_BOX = (14.44, 15.58, 4.15, 3.23)
+SLIDE_SIZE = (33.867, 19.05)
+# 填充形状只放在这个区域（远离标题与规则关键字），不改变规则的命中结果
+FILLER_AREA = (18.5, 5.0, 14.5, 10.0)
+# 方案整体概况页的群组：显示位置与子坐标系不同（平移并按 x/y 不同比例缩放），验证群组内形状的坐标换算
+OVERVIEW_GROUP_OFFSET = (2.0, 4.5)
+OVERVIEW_GROUP_SCALE = (0.8, 0.6)
+
+SPEC_TITLE = "設備規格及參數"
+PLAN_TITLE = "二.改造方案介紹及模組說明"
+OVERVIEW_TITLE = "1.方案整體概況"
+CRAFT_TITLE = "2.工藝流程"
+VERSION_TITLE = "方案版本變更記錄"
+VERSION_HEADERS = ("序號", "報告版本\n（版本號+報告日期）", "變更內容\n（需說明變更前和變更后內容對比）", "變更\n日期")
+REQUIRED_SLIDES = 5
+
+EXCEL_HEADERS = ("序號", "立項編碼", "項目名稱", "方案類型", "設備分類", "負責人", "備註")
+EXCEL_HEADER_ROW = 4
+ACTIONS = ("大改", "小改造", "中改", "新制")
+TYPES = ("制成類", "檢測類", "組裝類")
+
+
+def _png(size_px: int, color) -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (size_px, size_px), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class DeckBuilder:
+    """在一个 Presentation 上按厘米坐标添加形状"""
+
+    def __init__(self, rng: random.Random, image_px: int):
+        from pptx import Presentation
+        from pptx.util import Cm
+        self.Cm = Cm
+        self.rng = rng
+        self.prs = Presentation()
+        self.prs.slide_width = Cm(SLIDE_SIZE[0])
+        self.prs.slide_height = Cm(SLIDE_SIZE[1])
+        self.layout = self.prs.slide_layouts[6]  # 空白版式
+        self.images = [_png(image_px, color) for color in ((200, 60, 60), (60, 160, 60), (60, 60, 200))]
+
+    def _box(self, box: Sequence[float]):
+        return [self.Cm(v) for v in box]
+
+    def add_slide(self, title: Optional[str] = None, second_title: Optional[str] = None):
+        slide = self.prs.slides.add_slide(self.layout)
+        if title:
+            self.add_text(slide.shapes, title, TITLE_BOX)
+        if second_title:
+            self.add_text(slide.shapes, second_title, SECOND_TITLE_BOX)
+        return slide
+
+    def add_text(self, shapes, text: str, box: Sequence[float]):
+        shape = shapes.add_textbox(*self._box(box))
+        shape.text_frame.text = text
+        return shape
+
+    def add_rectangle(self, shapes, text: str, box: Sequence[float]):
+        from pptx.enum.shapes import MSO_SHAPE
+        shape = shapes.add_shape(MSO_SHAPE.RECTANGLE, *self._box(box))
+        shape.text_frame.text = text
+        return shape
+
+    def add_picture(self, shapes, box: Sequence[float]):
+        return shapes.add_picture(io.BytesIO(self.rng.choice(self.images)), *self._box(box))
+
+    def add_table(self, shapes, headers: Sequence[str], rows: List[Sequence[str]], box: Sequence[float]):
+        table = shapes.add_table(len(rows) + 1, len(headers), *self._box(box)).table
+        for col, header in enumerate(headers):
+            table.cell(0, col).text = header
+        for row_idx, row in enumerate(rows, start=1):
+            for col, value in enumerate(row):
+                table.cell(row_idx, col).text = value
+        return table
+
+    def transform_group(self, group, offset: Sequence[float], scale: Sequence[float]) -> None:
+        """把群组显示在 offset（cm）处并按 scale 缩放（a:off/a:ext），子形状的坐标（a:chOff/a:chExt）不变"""
+        xfrm = group._element.xfrm
+        xfrm.off.x, xfrm.off.y = self.Cm(offset[0]), self.Cm(offset[1])
+        xfrm.ext.cx, xfrm.ext.cy = round(xfrm.chExt.cx * scale[0]), round(xfrm.chExt.cy * scale[1])
+
+    def add_master_text(self, text: str, box: Sequence[float]) -> None:
+        """在空白版式中放一个文本框（母版形状），python-pptx 不支持直接向版式添加，借用临时页面的形状元素"""
+        slide = self.prs.slides.add_slide(self.layout)
+        element = self.add_text(slide.shapes, text, box)._element
+        self.layout.shapes._spTree.append(element)
+        # 删除临时页面
+        sld_id_lst = self.prs.slides._sldIdLst
+        sld_id = sld_id_lst[-1]
+        self.prs.part.drop_rel(sld_id.rId)
+        sld_id_lst.remove(sld_id)
+
+    def add_fillers(self, slide, count: int, table_rows: int) -> None:
+        """在填充区域随机放置文本框、矩形、图片、群组与表格"""
+        left0, top0, width0, height0 = FILLER_AREA
+        for i in range(count):
+            width, height = self.rng.uniform(1.0, 4.0), self.rng.uniform(0.6, 2.5)
+            box = (left0 + self.rng.uniform(0, width0 - width), top0 + self.rng.uniform(0, height0 - height),
+                   width, height)
+            kind = i % 6
+            if kind in (0, 1):
+                self.add_text(slide.shapes, f"說明文字 {i}\n第二行內容 {self.rng.randint(0, 9999)}", box)
+            elif kind == 2:
+                self.add_rectangle(slide.shapes, f"模組 {i}", box)
+            elif kind == 3:
+                self.add_picture(slide.shapes, box)
+            elif kind == 4:
+                group = slide.shapes.add_group_shape()
+                self.add_text(group.shapes, f"群組說明 {i}", box)
+                self.add_picture(group.shapes, (box[0], box[1] + box[3], box[2], box[3]))
+            elif table_rows:
+                rows = [(str(r), f"項目{r}", f"{self.rng.randint(1, 99)}") for r in range(1, table_rows + 1)]
+                self.add_table(slide.shapes, ("序號", "名稱", "數量"), rows, (box[0], box[1], 6.0, 0.8 * (table_rows + 1)))
+
+    def save(self, path: str) -> None:
+        self.prs.save(path)
+
+
+def _group_box(box: Sequence[float], child_origin: Sequence[float], offset: Sequence[float],
+               scale: Sequence[float]) -> List[float]:
+    """群组子坐标系中的 box（cm）换算到幻灯片坐标：offset + (子坐标 - 子坐标原点) * 缩放"""
+    return [round(offset[0] + (box[0] - child_origin[0]) * scale[0], 2),
+            round(offset[1] + (box[1] - child_origin[1]) * scale[1], 2),
+            round(box[2] * scale[0], 2), round(box[3] * scale[1], 2)]
+
+
+def build_deck(path: str, project_code: str, slides: int = 12, shapes: int = 20, table_rows: int = 5,
+               image_px: int = 64, seed: int = 0) -> Dict:
+    """
+    生成一个符合 发包规范V1_PPT 字段配置的PPT
+
+    Args:
+        path: 输出路径
+        project_code: 母版中的立项编码（ProjectCode）
+        slides: 总页数（至少包含5个规则页，不足时按5页生成）
+        shapes: 每页的填充形状数
+        table_rows: 版本变更表与填充表格的数据行数
+        image_px: 图片边长（像素）
+        seed: 随机种子
+
+    Returns:
+        dict: 页数、形状数、预期提取的文本字段（expected）与图片字段的幻灯片坐标（boxes，cm）
+    """
+    rng = random.Random(seed)
+    builder = DeckBuilder(rng, image_px)
+    slides = max(REQUIRED_SLIDES, int(slides))
+    table_rows = max(1, int(table_rows))
+    engineer = f"工程師{rng.randint(1, 99)}"
+    changing_date = f"2026/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+    specs = {
+        "dev_max_size": ("場地佔用", f"{rng.randint(1000, 5000)}x{rng.randint(1000, 5000)}mm"),
+        "dev_failure_rate": ("故障率", f"≤{rng.randint(1, 5)}%"),
+        "ComprehensiveCT": ("綜合CT", f"{rng.randint(2, 30)}.5S/PCS"),
+        "ComprehensiveUPH": ("UPH", f"{rng.randint(100, 900)}PCS/H"),
+        "dev_overkill_rate": ("過殺率(檢測設備)", f"{rng.randint(1, 9) / 10}%"),
+        "dev_miss_rate": ("漏檢率(檢測設備)", f"{rng.randint(1, 9) / 100}%"),
+        "dev_operation_manpower": ("機台操作人力", f"{rng.randint(1, 3)}人/機"),
+    }
+    version_rows = [(str(r), f"V{r}.0 2026/0{r % 9 + 1}/01", f"第{r}次變更：調整模組{r}", f"2026/0{r % 9 + 1}/0{r % 9 + 1}")
+                    for r in range(1, table_rows + 1)]
+
+    builder.add_master_text(project_code, PROJECT_CODE_BOX)
+
+    # 第1页：封面，DFM 信息按换行拆分到 engineer / changing_date
+    cover = builder.add_slide()
+    builder.add_text(cover.shapes, f"DFM\n{engineer}\n審核\n{changing_date}", DFM_INFO_BOX)
+
+    # 第2页：设备规格，每个规格一个文本框（match_rule -1，取冒号后的值）
+    spec = builder.add_slide(SPEC_TITLE)
+    for row, (field, (label, value)) in enumerate(specs.items()):
+        # 綜合CT 的规则要求数值后还有内容（实际PPT中通常跟着备注）
+        remark = " （含上下料）" if field == "ComprehensiveCT" else ""
+        builder.add_text(spec.shapes, f"{row + 1}.{label}：{value}{remark}", (1.0, 3.5 + row * 1.6, 14.0, 1.2))
+
+    # 第3页：版本变更记录表，取最后一行
+    version = builder.add_slide(VERSION_TITLE)
+    builder.add_table(version.shapes, VERSION_HEADERS, version_rows, (1.0, 3.5, 24.0, 0.9 * (table_rows + 1)))
+
+    # 第4页：方案整体概况，群组内的关键字（match_rule 1 取群组内图片，5 取文本框本身）与顶层关键字下方的图片；
+    # 群组经过平移与缩放，群组内形状的预期位置为换算后的幻灯片坐标
+    overview = builder.add_slide(PLAN_TITLE, OVERVIEW_TITLE)
+    group = overview.shapes.add_group_shape()
+    group_text_box, group_picture_box = (1.0, 4.0, 7.0, 1.0), (1.0, 5.2, 7.0, 5.0)
+    builder.add_text(group.shapes, "4.長寬高尺寸,佔地面積：", group_text_box)
+    builder.add_picture(group.shapes, group_picture_box)
+    builder.transform_group(group, OVERVIEW_GROUP_OFFSET, OVERVIEW_GROUP_SCALE)
+    child_origin = (group_text_box[0], group_text_box[1])
+    builder.add_text(overview.shapes, "3.俯視佈局圖:", (9.0, 4.0, 7.0, 1.0))
+    builder.add_picture(overview.shapes, (9.0, 5.2, 7.0, 5.0))
+
+    # 第5页：工艺流程，关键字下方的矩形/图片
+    craft = builder.add_slide(PLAN_TITLE, CRAFT_TITLE)
+    builder.add_rectangle(craft.shapes, "工藝流程介紹", (1.0, 4.0, 10.0, 1.0))
+    builder.add_picture(craft.shapes, (1.0, 5.2, 14.0, 8.0))
+
+    # 其余页：普通模组说明页
+    for page in range(REQUIRED_SLIDES + 1, slides + 1):
+        builder.add_slide(f"模組說明 {page}", f"{page}.模組細節")
+
+    total_shapes = 0
+    for page, slide in enumerate(builder.prs.slides, start=1):
+        builder.add_fillers(slide, shapes, table_rows)
+        total_shapes += len(slide.shapes)
+    builder.save(path)
+
+    expected = {"ProjectCode": project_code, "engineer": engineer, "changing_date": changing_date}
+    for field, (_, value) in specs.items():
+        expected[field] = value
+    last = version_rows[-1]
+    expected.update({"version": last[1], "changing_description": last[2], "release_date": last[3]})
+    boxes = {
+        "img_dev_frontlooking": _group_box(group_picture_box, child_origin, OVERVIEW_GROUP_OFFSET, OVERVIEW_GROUP_SCALE),
+        "img_dev_occupancy": _group_box(group_text_box, child_origin, OVERVIEW_GROUP_OFFSET, OVERVIEW_GROUP_SCALE),
+        "img_dev_overlooking": [9.0, 5.2, 7.0, 5.0],
+    }
+    return {"path": path, "slides": slides, "shapes": total_shapes, "size": os.path.getsize(path),
+            "expected": expected, "boxes": boxes}
+
+
+def build_workbook(path: str, rows: int, project_codes: Sequence[str] = (), seed: int = 0,
+                   sheet_name: str = "Sheet1", header_row: int = EXCEL_HEADER_ROW) -> Dict:
+    """
+    生成方案总表：前 header_row-1 行为说明，第 header_row 行为标题，之后 rows 行数据
+
+    Args:
+        path: 输出路径
+        rows: 数据行数
+        project_codes: 必须出现在总表中的立项编码（排在最前，其余行随机生成）
+        seed: 随机种子
+        sheet_name: 工作表名
+        header_row: 标题行行号（与 app_settings.yaml 的 header_row_num 一致）
+    """
+    from openpyxl import Workbook
+    rng = random.Random(seed)
+    # 不使用 write_only：只读加载依赖保存时写入的表格尺寸（max_row）
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sheet_name
+    ws.append(["方案總表（合成數據）"])
+    for _ in range(header_row - 2):
+        ws.append([])
+    ws.append(list(EXCEL_HEADERS))
+    codes = list(project_codes)
+    for idx in range(1, rows + 1):
+        code = codes[idx - 1] if idx <= len(codes) else f"SYN{seed:03d}{idx:07d}"
+        ws.append([idx, code, f"合成方案{idx}", rng.choice(ACTIONS), rng.choice(TYPES),
+                   f"負責人{rng.randint(1, 50)}", None])
+    wb.save(path)
+    return {"path": path, "rows": rows, "size": os.path.getsize(path)}
+
+
+def build_corpus(out_dir: str, decks: int = 10, slides: int = 12, shapes: int = 20, table_rows: int = 5,
+                 rows: int = 1000, image_px: int = 64, seed: int = 0) -> Dict:
+    """
+    生成一组PPT（每个一个目录，文件名带 V3 版本号）和一个方案总表
+
+    Returns:
+        dict: manifest（PPT列表及预期字段、总表路径与行数）
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    deck_infos = []
+    for idx in range(decks):
+        deck_dir = os.path.join(out_dir, f"deck_{idx:04d}")
+        os.makedirs(deck_dir, exist_ok=True)
+        code = f"SYN{seed:03d}-{idx:05d}"
+        deck_infos.append(build_deck(os.path.join(deck_dir, f"synthetic_{idx:04d}_V3.pptx"), code,
+                                     slides=slides, shapes=shapes, table_rows=table_rows,
+                                     image_px=image_px, seed=seed * 100003 + idx))
+    workbook = None
+    if rows:
+        workbook = build_workbook(os.path.join(out_dir, "方案总表.xlsx"), rows,
+                                  [info["expected"]["ProjectCode"] for info in deck_infos], seed=seed)
+    manifest = {
+        "params": {"decks": decks, "slides": slides, "shapes": shapes, "table_rows": table_rows,
+                   "rows": rows, "image_px": image_px, "seed": seed},
+        "decks": deck_infos,
+        "workbook": workbook,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="生成合成的PPT与方案总表语料")
+    parser.add_argument("--out", required=True, help="输出目录")
+    parser.add_argument("--decks", type=int, default=10, help="PPT数量（默认: 10）")
+    parser.add_argument("--slides", type=int, default=12, help="每个PPT的页数，至少5（默认: 12）")
+    parser.add_argument("--shapes", type=int, default=20, help="每页的填充形状数（默认: 20）")
+    parser.add_argument("--table-rows", type=int, default=5, help="表格数据行数（默认: 5）")
+    parser.add_argument("--rows", type=int, default=1000, help="方案总表行数，0 表示不生成（默认: 1000）")
+    parser.add_argument("--image-px", type=int, default=64, help="图片边长像素（默认: 64）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认: 0）")
+    args = parser.parse_args(argv)
+
+    manifest = build_corpus(args.out, max(1, args.decks), args.slides, max(0, args.shapes),
+                            args.table_rows, max(0, args.rows), max(8, args.image_px), args.seed)
+    print(json.dumps({
+        "out": os.path.abspath(args.out),
+        "decks": len(manifest["decks"]),
+        "deck_bytes": sum(info["size"] for info in manifest["decks"]),
+        "workbook_rows": manifest["workbook"]["rows"] if manifest["workbook"] else 0,
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# 端到端扩展性基准：用合成语料（benchmarks/corpus.py）跑完整的 PackingFileProcessor 流程
+# （读取解析 → 字段提取 → 总表匹配 → 图片 → 写入文档），统计吞吐量与峰值内存随输入规模的变化
+# 图片阶段用空白整页图代替 PowerPoint COM 导出（裁剪与插入文档照常执行），可在无 Office 的环境运行
+# 用法：python -m benchmarks.e2e_scaling [--slides 10,40,160] [--shapes 20] [--decks 4] [--rows 1000,10000] [--output report.json]
+# 提取结果与语料的预期字段不一致或文档生成失败时返回非0
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.corpus import SLIDE_SIZE, build_corpus, build_workbook
+from exporters.registry import ImageRenderCache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PIXELS_PER_CM = 96 / 2.54  # 与 ImageExporter.crop_region 的换算一致
+
+
+class StubImageRenderCache(ImageRenderCache):
+    """整页图片用空白PNG代替 COM 导出，其余（按区域裁剪、缓存、插入文档）与 ImageRenderCache 相同"""
+
+    def __init__(self, pptx_path: str, staged=None):
+        super().__init__(pptx_path, staged)
+        self._temp_dir = tempfile.mkdtemp(prefix="e2e_images_")
+
+    @property
+    def temp_dir(self) -> Optional[str]:
+        return self._temp_dir
+
+    def _slide_image(self, page_number: int) -> Optional[str]:
+        if page_number not in self._slides:
+            from PIL import Image
+            path = os.path.join(self._temp_dir, f"slide_{page_number}.png")
+            size = (int(SLIDE_SIZE[0] * PIXELS_PER_CM), int(SLIDE_SIZE[1] * PIXELS_PER_CM))
+            Image.new("RGB", size, (255, 255, 255)).save(path)
+            self.renders += 1
+            self._slides[page_number] = path
+        return self._slides[page_number]
+
+    def close(self) -> None:
+        super().close()
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+
+def _peak_memory(func: Callable[[], object]) -> float:
+    """单独执行一次 func，返回期间 Python 分配的峰值内存（MB）；tracemalloc 会拖慢执行，不与计时混用"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+
+def _rss_high_water() -> Optional[float]:
+    """进程启动以来的常驻内存峰值（MB，含 lxml 等C扩展的分配）；只增不减，Windows 上不可用时为 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def _check_fields(fields: Dict, expected: Dict) -> List[str]:
+    return [f"{key}: {fields.get(key)!r} != {value!r}" for key, value in expected.items() if fields.get(key) != value]
+
+
+def _check_boxes(fields: Dict, boxes: Dict, tolerance: float = 0.02) -> List[str]:
+    """图片字段取到的形状位置（幻灯片坐标，cm）与语料预期一致（群组内形状经过坐标换算）"""
+    errors = []
+    for key, box in boxes.items():
+        shape = fields.get(key)
+        actual = shape.get("box") if isinstance(shape, dict) else None
+        if actual is None or any(abs(a - b) > tolerance for a, b in zip(actual, box)):
+            errors.append(f"{key} 位置: {actual!r} != {box!r}")
+    return errors
+
+
+def run_deck_scaling(processor, index, slide_counts: Sequence[int], decks: int, shapes: int,
+                     table_rows: int, repeat: int, work_dir: str) -> Tuple[List[Dict], List[str]]:
+    """每个页数规模生成一组PPT，逐个跑完整流程，返回各规模的统计与失败信息"""
+    from core.pipeline import ProcessingContext
+    context = ProcessingContext(data_list=index)
+    results, failures = [], []
+
+    for slides in slide_counts:
+        corpus_dir = os.path.join(work_dir, f"slides_{slides}")
+        output_dir = os.path.join(corpus_dir, "output")
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = build_corpus(corpus_dir, decks=decks, slides=slides, shapes=shapes,
+                                table_rows=table_rows, rows=0)
+        infos = manifest["decks"]
+
+        def process(info: Dict) -> Tuple[float, float]:
+            start = time.perf_counter()
+            result = processor.analyze(info["path"], context)
+            parsed = time.perf_counter()
+            with StubImageRenderCache(info["path"]) as cache:
+                reports = processor.render_reports(result, output_dir, context, cache)
+            done = time.perf_counter()
+            errors = _check_fields(result, info["expected"]) + _check_boxes(result, info.get("boxes", {}))
+            if not result.matched:
+                errors.append("未匹配到方案总表")
+            if not reports or not all(reports.values()):
+                errors.append(f"文档生成失败: {reports}")
+            for error in errors:
+                failures.append(f"{os.path.basename(info['path'])}（{slides}页）{error}")
+            return parsed - start, done - parsed
+
+        process(infos[0])  # 预热：导入模块、编译规则
+        parse_time = render_time = 0.0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for info in infos:
+                parse_seconds, render_seconds = process(info)
+                parse_time += parse_seconds
+                render_time += render_seconds
+        elapsed = time.perf_counter() - start
+        runs = repeat * len(infos)
+        total_slides = sum(info["slides"] for info in infos) * repeat
+        total_shapes = sum(info["shapes"] for info in infos) * repeat
+        results.append({
+            "slides": slides,
+            "shapes_per_deck": round(total_shapes / runs),
+            "deck_bytes": round(sum(info["size"] for info in infos) / len(infos)),
+            "decks_processed": runs,
+            "elapsed": round(elapsed, 3),
+            "decks_per_second": round(runs / elapsed, 3),
+            "slides_per_second": round(total_slides / elapsed, 1),
+            "shapes_per_second": round(total_shapes / elapsed, 1),
+            "parse_seconds_per_deck": round(parse_time / runs, 4),
+            "render_seconds_per_deck": round(render_time / runs, 4),
+            "peak_traced_mb": _peak_memory(lambda: process(infos[0])),
+            "rss_high_water_mb": _rss_high_water(),
+        })
+    return results, failures
+
+
+def run_workbook_scaling(config, row_counts: Sequence[int], work_dir: str) -> List[Dict]:
+    """每个行数规模生成一个方案总表，统计读取并建立 ProjectIndex 的耗时与峰值内存"""
+    from core.project_index import ProjectIndex
+    from extractors.extrator_发包规范 import ExtractorExcel
+    excel_cfg = config.get_all_projects_info()
+    results = []
+    for rows in row_counts:
+        path = os.path.join(work_dir, f"方案总表_{rows}.xlsx")
+        info = build_workbook(path, rows)
+        # 只修改本进程内已加载的配置，让 ExtractorExcel 读取合成总表
+        excel_cfg.update({"path": work_dir, "filename": os.path.basename(path)})
+
+        def load() -> int:
+            extractor = ExtractorExcel(config)
+            try:
+                return len(ProjectIndex(extractor.extract()))
+            finally:
+                extractor.close()
+
+        start = time.perf_counter()
+        loaded = load()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "rows": rows,
+            "rows_loaded": loaded,
+            "workbook_bytes": info["size"],
+            "elapsed": round(elapsed, 3),
+            "rows_per_second": round(loaded / elapsed, 1) if elapsed else None,
+            "peak_traced_mb": _peak_memory(load),
+            "rss_high_water_mb": _rss_high_water(),
+        })
+    return results
+
+
+def run_benchmark(slide_counts: Sequence[int], row_counts: Sequence[int], decks: int, shapes: int,
+                  table_rows: int, repeat: int, reports: Optional[List[str]], work_dir: str,
+                  log_level: str = "WARNING") -> Dict:
+    from config.loader import ConfigLoader
+    from core.packing_file_发包规范 import PackingFileProcessor
+    from core.project_index import ProjectIndex
+    from utils.logger import LoggerFactory
+
+    config = ConfigLoader(config_dir=os.path.join(ROOT_DIR, "config"))
+    LoggerFactory.apply_level(log_level)
+    # renderer 保持 "com" 使图片阶段照常执行，整页导出由 StubImageRenderCache 代替
+    processor = PackingFileProcessor(config, renderer="com", reports=reports)
+
+    # 语料的立项编码固定为 SYN000-xxxxx（每个规模的第 i 个PPT编码相同），总表索引在各规模之间共享
+    index = ProjectIndex([{"ProjectCode": f"SYN000-{i:05d}", "name": f"合成方案{i}", "Action": "大改",
+                           "type": "制成類"} for i in range(decks)])
+    deck_results, failures = run_deck_scaling(processor, index, slide_counts, decks, shapes,
+                                              table_rows, repeat, work_dir)
+    workbook_results = run_workbook_scaling(config, row_counts, work_dir) if row_counts else []
+    return {
+        "params": {"decks": decks, "shapes": shapes, "table_rows": table_rows, "repeat": repeat,
+                   "reports": [exporter.name for exporter in processor._report_exporters]},
+        "decks": deck_results,
+        "workbooks": workbook_results,
+        "failures": failures[:50],
+        "failure_count": len(failures),
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="合成语料端到端扩展性基准")
+    parser.add_argument("--slides", type=_int_list, default=[10, 40, 160], help="每个PPT的页数规模，逗号分隔（默认: 10,40,160）")
+    parser.add_argument("--rows", type=_int_list, default=[1000, 10000], help="方案总表行数规模，逗号分隔，空字符串跳过（默认: 1000,10000）")
+    parser.add_argument("--decks", type=int, default=4, help="每个规模的PPT数量（默认: 4）")
+    parser.add_argument("--shapes", type=int, default=20, help="每页的填充形状数（默认: 20）")
+    parser.add_argument("--table-rows", type=int, default=5, help="表格数据行数（默认: 5）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个规模重复处理的轮数（默认: 1）")
+    parser.add_argument("--report", action="append", help="导出的报表类型，可重复指定（默认使用配置中启用的报表）")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="运行期间的日志等级（默认: WARNING）")
+    parser.add_argument("--output", help="同时把JSON结果写入文件")
+    parser.add_argument("--keep", action="store_true", help="保留生成的语料与文档目录")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="e2e_scaling_")
+    try:
+        report = run_benchmark(args.slides, args.rows, max(1, args.decks), max(0, args.shapes),
+                               max(1, args.table_rows), max(1, args.repeat), args.report, work_dir,
+                               args.log_level)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report["work_dir"] = work_dir if args.keep else None
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if report["failure_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
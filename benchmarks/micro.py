@@ -0,0 +1,346 @@
+# 热点函数微基准：content_models 构造与 to_dict、calculate_iou、ExtractorA.extract、ExtractorExcel.extract、
+# DocxProcessor.process_content 以及 traditional_to_simplified / split_after_colon 逐项单独计时
+# 用法：python -m benchmarks.micro [--filter Slide] [--save-baseline] [--baseline FILE] [--threshold 0.25] [--output report.json]
+# 结果与基线（默认 benchmarks/micro_baseline.json，在发布用的机器上用 --save-baseline 生成）比较，
+# 任一项比基线慢超过阈值时返回非0
+import io
+import os
+import re
+import sys
+import json
+import shutil
+import random
+import timeit
+import argparse
+import platform
+import statistics
+import tempfile
+from functools import cached_property
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import DeckBuilder, build_deck, build_workbook
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "micro_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+SHAPES_PER_SLIDE = 20
+WORKBOOK_ROWS = 2000
+IOU_PAIRS = 1000
+TEXT_SAMPLES = 200
+
+
+class Fixtures:
+    """各基准项的输入，按需构造（--filter 只选部分项时不生成用不到的输入）"""
+
+    def __init__(self, work_dir: str):
+        self.work_dir = work_dir
+        self.rng = random.Random(0)
+
+    @cached_property
+    def config(self):
+        from config.loader import ConfigLoader
+        from utils.logger import LoggerFactory
+        config = ConfigLoader(config_dir=os.path.join(ROOT_DIR, "config"))
+        # 关闭调试日志，避免日志输出计入耗时
+        LoggerFactory.apply_level("WARNING")
+        return config
+
+    @cached_property
+    def shape_slides(self):
+        """每种形状类型一页（各 SHAPES_PER_SLIDE 个），返回 (presentation, {类型: slide})"""
+        from pptx import Presentation
+        builder = DeckBuilder(random.Random(0), 64)
+        boxes = [(1.0 + (i % 5) * 6.0, 3.0 + (i // 5) * 3.5, 5.0, 2.5) for i in range(SHAPES_PER_SLIDE)]
+        makers = {
+            "TextBox": lambda shapes, i, box: builder.add_text(shapes, f"{i}.說明文字：內容 {i}\n第二行", box),
+            "CustomShape": lambda shapes, i, box: builder.add_rectangle(shapes, f"模組 {i}", box),
+            "Image": lambda shapes, i, box: builder.add_picture(shapes, box),
+            "Table": lambda shapes, i, box: builder.add_table(
+                shapes, ("序號", "名稱", "數量"), [(str(r), f"項目{r}", str(r * i)) for r in range(1, 6)], box),
+            "GroupShape": lambda shapes, i, box: self._add_group(builder, shapes, i, box),
+        }
+        for name, make in makers.items():
+            slide = builder.add_slide(f"{name} 基準")
+            for i, box in enumerate(boxes):
+                make(slide.shapes, i, box)
+        # 保存后重新打开，与读取真实PPT时的对象状态一致
+        buffer = io.BytesIO()
+        builder.prs.save(buffer)
+        buffer.seek(0)
+        prs = Presentation(buffer)
+        return prs, dict(zip(makers, prs.slides))
+
+    @staticmethod
+    def _add_group(builder: DeckBuilder, shapes, i: int, box) -> None:
+        group = shapes.add_group_shape()
+        builder.add_text(group.shapes, f"群組說明 {i}", (box[0], box[1], box[2], box[3] / 2))
+        builder.add_picture(group.shapes, (box[0], box[1] + box[3] / 2, box[2], box[3] / 2))
+
+    @cached_property
+    def deck_path(self) -> str:
+        path = os.path.join(self.work_dir, "micro_V3.pptx")
+        build_deck(path, "MICRO-00001", slides=12, shapes=SHAPES_PER_SLIDE, table_rows=5, seed=0)
+        return path
+
+    @cached_property
+    def deck_slides(self):
+        """合成PPT的 Slide 对象列表"""
+        from pptx import Presentation
+        from content_models import Slide
+        prs = Presentation(self.deck_path)
+        return prs, [Slide(slide, prs.slide_master, page, self.config, "v1")
+                     for page, slide in enumerate(prs.slides, start=1)]
+
+    @cached_property
+    def slide_dicts(self) -> List[Dict]:
+        return [slide.to_dict(include_formatting=False) for slide in self.deck_slides[1]]
+
+    @cached_property
+    def workbook_config(self):
+        path = os.path.join(self.work_dir, "方案总表.xlsx")
+        build_workbook(path, WORKBOOK_ROWS)
+        # 只修改本进程内已加载的配置，让 ExtractorExcel 读取合成总表
+        self.config.get_all_projects_info().update({"path": self.work_dir, "filename": os.path.basename(path)})
+        return self.config
+
+    @cached_property
+    def docx_replacements(self) -> Dict:
+        """示例PPT经完整分析后的文本字段（与 ExporterA 传给 DocxProcessor 的替换内容相同）"""
+        from core.packing_file_发包规范 import PackingFileProcessor
+        from exporters.registry import is_image_field
+        processor = PackingFileProcessor(self.config, renderer="none")
+        result = processor.analyze(os.path.join(ROOT_DIR, "examples", "templates", "26xdemo1.pptx"))
+        return {key: value for key, value in result.to_dict().items() if not is_image_field(value)}
+
+    @cached_property
+    def iou_pairs(self):
+        def box():
+            return (self.rng.uniform(0, 30), self.rng.uniform(0, 17), self.rng.uniform(0.5, 10), self.rng.uniform(0.5, 6))
+        return [(box(), box()) for _ in range(IOU_PAIRS)]
+
+    @cached_property
+    def traditional_texts(self) -> List[str]:
+        words = ["大改", "小改造", "中改", "新制", "設備規格及參數", "製成類", "檢測類", "組裝類",
+                 "方案版本變更記錄", "工藝流程介紹", "長寬高尺寸", "佔地面積", "機台操作人力"]
+        return [" ".join(self.rng.sample(words, 3)) for _ in range(TEXT_SAMPLES)]
+
+    @cached_property
+    def colon_texts(self) -> List[str]:
+        labels = ["場地佔用", "故障率", "綜合CT", "UPH", "機台操作人力", "備註"]
+        return [f"{i}.{self.rng.choice(labels)}{self.rng.choice([':', '：', ' ： '])}{self.rng.randint(1, 999)}"
+                + ("：附註" if i % 5 == 0 else "") for i in range(TEXT_SAMPLES)]
+
+
+def _slide_init(shape_type: str) -> Callable[[Fixtures], Callable[[], object]]:
+    def setup(fx: Fixtures):
+        from content_models import Slide
+        prs, slides = fx.shape_slides
+        slide, config = slides[shape_type], fx.config
+        return lambda: Slide(slide, prs.slide_master, 2, config, "v1")
+    return setup
+
+
+def _slide_to_dict(fx: Fixtures):
+    slides = fx.deck_slides[1]
+    return lambda: [slide.to_dict(include_formatting=False) for slide in slides]
+
+
+def _slide_to_dict_formatting(fx: Fixtures):
+    # 格式明细在形状对象上缓存，重复调用只会命中缓存：每次重新构造 Slide（耗时包含构造）
+    from content_models import Slide
+    prs, _ = fx.deck_slides
+    config = fx.config
+    return lambda: [Slide(slide, prs.slide_master, page, config, "v1").to_dict(include_formatting=True)
+                    for page, slide in enumerate(prs.slides, start=1)]
+
+
+def _calculate_iou(fx: Fixtures):
+    from content_models import calculate_iou
+    pairs = fx.iou_pairs
+    return lambda: [calculate_iou(a, b) for a, b in pairs]
+
+
+def _extractor_a(fx: Fixtures):
+    from extractors.extrator_发包规范 import ExtractorA
+    slides, config = fx.slide_dicts, fx.config
+    return lambda: ExtractorA(list(slides), config).extract()
+
+
+def _extractor_excel(fx: Fixtures):
+    from extractors.extrator_发包规范 import ExtractorExcel
+    config = fx.workbook_config
+
+    def run():
+        extractor = ExtractorExcel(config)
+        try:
+            return extractor.extract()
+        finally:
+            extractor.close()
+    return run
+
+
+def _docx_process_content(fx: Fixtures):
+    from exporters.exporter_发包规范 import DocxProcessor
+    template = os.path.join(ROOT_DIR, "examples", "templates", "26xdemo1.docx")
+    replacements = fx.docx_replacements
+    output_path = os.path.join(fx.work_dir, "micro_output.docx")
+    return lambda: DocxProcessor(template, output_path).process_content(replacements)
+
+
+def _traditional_to_simplified(fx: Fixtures):
+    from utils.text_utils import traditional_to_simplified
+    texts = fx.traditional_texts
+    traditional_to_simplified(texts[0])  # 词典在首次调用时加载，不计入
+    convert = traditional_to_simplified.__wrapped__  # 不经缓存，计转换本身的耗时
+    return lambda: [convert(text) for text in texts]
+
+
+def _traditional_to_simplified_cached(fx: Fixtures):
+    from utils.text_utils import traditional_to_simplified
+    texts = fx.traditional_texts
+    for text in texts:
+        traditional_to_simplified(text)
+    return lambda: [traditional_to_simplified(text) for text in texts]
+
+
+def _split_after_colon(fx: Fixtures):
+    from utils.text_utils import split_after_colon
+    texts = fx.colon_texts
+    return lambda: [split_after_colon(text) for text in texts]
+
+
+# 基准项：名称 → setup(fixtures) 返回被计时的无参函数；名称写入基线，修改名称等同于新增一项
+CASES: Dict[str, Callable[[Fixtures], Callable[[], object]]] = {
+    "Slide.__init__[TextBox x20]": _slide_init("TextBox"),
+    "Slide.__init__[CustomShape x20]": _slide_init("CustomShape"),
+    "Slide.__init__[Image x20]": _slide_init("Image"),
+    "Slide.__init__[Table x20]": _slide_init("Table"),
+    "Slide.__init__[GroupShape x20]": _slide_init("GroupShape"),
+    "Slide.to_dict[12 slides]": _slide_to_dict,
+    "Slide.to_dict[12 slides, formatting, incl. init]": _slide_to_dict_formatting,
+    f"calculate_iou[x{IOU_PAIRS}]": _calculate_iou,
+    "ExtractorA.extract[12 slides]": _extractor_a,
+    f"ExtractorExcel.extract[{WORKBOOK_ROWS} rows]": _extractor_excel,
+    "DocxProcessor.process_content[26xdemo1]": _docx_process_content,
+    f"traditional_to_simplified[x{TEXT_SAMPLES}]": _traditional_to_simplified,
+    f"traditional_to_simplified[cached x{TEXT_SAMPLES}]": _traditional_to_simplified_cached,
+    f"split_after_colon[x{TEXT_SAMPLES}]": _split_after_colon,
+}
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    """先确定每轮循环次数（单轮至少 min_time 秒），再重复 repeat 轮，返回单次调用耗时（微秒）"""
+    func()  # 预热
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(samples), 2),
+        "median_us": round(statistics.median(samples), 2),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Dict[str, Dict]:
+    """
+    按最小耗时与基线比较（最小值受系统抖动影响最小）
+
+    Returns:
+        dict: {名称: {"status": ok/regressed/improved/new, "ratio": 当前/基线}}
+    """
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("min_us"):
+            comparison[name] = {"status": "new", "ratio": None}
+            continue
+        ratio = result["min_us"] / base["min_us"]
+        if ratio > 1 + threshold:
+            status = "regressed"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        comparison[name] = {"status": status, "ratio": round(ratio, 3), "baseline_min_us": base["min_us"]}
+    return comparison
+
+
+def run_benchmark(names: List[str], repeat: int, min_time: float, work_dir: str) -> Dict[str, Dict]:
+    fixtures = Fixtures(work_dir)
+    results = {}
+    for name in names:
+        func = CASES[name](fixtures)
+        results[name] = measure(func, repeat, min_time)
+        print(f"{name}: {results[name]['min_us']:.1f}us", file=sys.stderr)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="热点函数微基准与基线回归检查")
+    parser.add_argument("--filter", help="只运行名称匹配该正则的项")
+    parser.add_argument("--list", action="store_true", help="列出全部基准项后退出")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复轮数（默认: 5）")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少耗时秒数（默认: 0.2）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件（只更新本次运行的项）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="回归阈值，比基线慢超过该比例即判定回归（默认: 0.25）")
+    parser.add_argument("--output", help="将报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if not args.filter or re.search(args.filter, name)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        print(f"没有匹配的基准项: {args.filter}", file=sys.stderr)
+        return 2
+
+    work_dir = tempfile.mkdtemp(prefix="micro_bench_")
+    try:
+        results = run_benchmark(names, max(1, args.repeat), max(0.01, args.min_time), work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "baseline": args.baseline if baseline else None,
+        "baseline_platform": baseline.get("platform"),
+        "threshold": args.threshold,
+        "results": results,
+        "comparison": compare(results, baseline.get("results", {}), args.threshold) if baseline else {},
+    }
+    regressions = [name for name, item in report["comparison"].items() if item["status"] == "regressed"]
+    report["regressions"] = regressions
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        saved = dict(baseline.get("results", {}))
+        saved.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": report["python"], "platform": report["platform"], "results": saved},
+                      f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"基线已保存: {args.baseline}", file=sys.stderr)
+        return 0
+    for name in regressions:
+        item = report["comparison"][name]
+        print(f"[性能回归] {name}: {results[name]['min_us']}us，基线 {item['baseline_min_us']}us "
+              f"（{item['ratio']}x）", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
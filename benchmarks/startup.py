@@ -0,0 +1,140 @@
+# 启动耗时基准：基于 -X importtime 统计模块导入耗时，并测量 CLI --help 与 GUI 首个窗口出现的时间
+# 用法：python -m benchmarks.startup [--runs 5] [--budget benchmarks/startup_budget.json] [--output report.json]
+# 超出预算（耗时或导入了禁止的重量级依赖）时返回非0，可直接用于回归检查
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import importlib.util
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(ROOT_DIR, "benchmarks", "startup_budget.json")
+
+
+def _run(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    run_env = dict(os.environ)
+    if env:
+        run_env.update(env)
+    return subprocess.run([sys.executable] + args, cwd=ROOT_DIR, env=run_env,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 -X importtime 输出，返回 [{name, self_us, cumulative_us, depth}]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append({
+            "name": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": depth,
+        })
+    return entries
+
+
+def measure_import(module: str, forbidden: List[str], runs: int) -> Dict:
+    """测量导入指定模块的累计耗时（取中位数），并列出导入过程中加载的禁止模块"""
+    totals = []
+    imported = set()
+    for _ in range(runs):
+        proc = _run(["-X", "importtime", "-c", f"import {module}"])
+        if proc.returncode != 0:
+            return {"module": module, "error": proc.stderr.strip().splitlines()[-1:]}
+        entries = parse_importtime(proc.stderr)
+        target = [e for e in entries if e["name"] == module and e["depth"] == 0]
+        totals.append(target[-1]["cumulative_us"] if target else sum(e["self_us"] for e in entries))
+        imported.update(e["name"] for e in entries)
+    hits = sorted(name for name in imported
+                  if any(name == f or name.startswith(f + ".") for f in forbidden))
+    return {
+        "module": module,
+        "cumulative_ms": round(statistics.median(totals) / 1000, 2),
+        "forbidden_imported": hits,
+    }
+
+
+def measure_wall(args: List[str], runs: int, env: Optional[Dict[str, str]] = None,
+                 marker: Optional[str] = None) -> Dict:
+    """测量子进程从启动到结束（或输出标记）的墙钟时间，取中位数"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = _run(args, env=env)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0 or (marker and marker not in proc.stdout):
+            return {"error": (proc.stderr.strip().splitlines() or ["无输出"])[-1]}
+        samples.append(elapsed)
+    return {"seconds": round(statistics.median(samples), 3), "samples": [round(s, 3) for s in samples]}
+
+
+def run_benchmark(budget: Dict, runs: int) -> Dict:
+    report = {"python": sys.version.split()[0], "imports": [], "violations": []}
+
+    for module, rule in budget.get("imports", {}).items():
+        result = measure_import(module, rule.get("forbidden", []), runs)
+        report["imports"].append(result)
+        if "error" in result:
+            report["violations"].append(f"导入 {module} 失败: {result['error']}")
+            continue
+        max_ms = rule.get("max_ms")
+        if max_ms is not None and result["cumulative_ms"] > max_ms:
+            report["violations"].append(f"导入 {module} 耗时 {result['cumulative_ms']}ms 超出预算 {max_ms}ms")
+        if result["forbidden_imported"]:
+            report["violations"].append(f"导入 {module} 时加载了重量级依赖: {', '.join(result['forbidden_imported'])}")
+
+    cli_help = measure_wall(["-m", "cli", "--help"], runs)
+    report["cli_help"] = cli_help
+    limit = budget.get("cli_help_seconds")
+    if "error" in cli_help:
+        report["violations"].append(f"CLI --help 运行失败: {cli_help['error']}")
+    elif limit is not None and cli_help["seconds"] > limit:
+        report["violations"].append(f"CLI --help 耗时 {cli_help['seconds']}s 超出预算 {limit}s")
+
+    if importlib.util.find_spec("PyQt5") is None:
+        report["first_window"] = {"skipped": "未安装 PyQt5"}
+    else:
+        # 与 main.STARTUP_PROBE_ENV 一致（此处不导入 main，避免在基准进程中加载 PyQt5）
+        env = {"PPT_PROCESSOR_STARTUP_PROBE": "1", "QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen")}
+        first_window = measure_wall(["main.py"], runs, env=env, marker="first-window")
+        report["first_window"] = first_window
+        limit = budget.get("first_window_seconds")
+        if "error" in first_window:
+            report["violations"].append(f"GUI 启动失败: {first_window['error']}")
+        elif limit is not None and first_window["seconds"] > limit:
+            report["violations"].append(f"首个窗口耗时 {first_window['seconds']}s 超出预算 {limit}s")
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="启动耗时基准与预算检查")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的重复次数（取中位数）")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="预算文件路径")
+    parser.add_argument("--output", help="将报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    report = run_benchmark(budget, max(1, args.runs))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    for violation in report["violations"]:
+        print(f"[超出预算] {violation}", file=sys.stderr)
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
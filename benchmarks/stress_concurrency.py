@@ -0,0 +1,129 @@
+# 并发压力测试：多个线程共享同一个 PackingFileProcessor，验证每次调用的结果、日志与输出互不串扰
+# 用法：python -m benchmarks.stress_concurrency [--threads 16] [--iterations 10] [--renderer none]
+# 任一调用结果与单线程参考结果不一致、日志串到其他线程或文档生成失败时返回非0
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DECKS = [
+    os.path.join(ROOT_DIR, "examples", "templates", "26xdemo1.pptx"),
+    os.path.join(ROOT_DIR, "examples", "templates", "26xdemo2_1.pptx"),
+]
+ACTIONS = ["大改", "小改造", "中改", "新制"]
+
+
+def build_variants(index, threads: int) -> List[Dict]:
+    """每个线程一组不同的输入：奇数线程使用共享总表索引，偶数线程使用各自的手动输入"""
+    return [{
+        "data_list": index if t % 2 else [],
+        "manual_proj_name_value": f"线程{t}",
+        "manual_proj_action_value": ACTIONS[t % len(ACTIONS)],
+    } for t in range(threads)]
+
+
+def run_stress(decks: List[str], threads: int, iterations: int, renderer: str, work_dir: str) -> Dict:
+    from config.loader import ConfigLoader
+    from core.packing_file_发包规范 import PackingFileProcessor
+    from core.pipeline import ProcessingContext
+    from core.project_index import ProjectIndex
+
+    config = ConfigLoader(config_dir=os.path.join(ROOT_DIR, "config"))
+    processor = PackingFileProcessor(config, renderer=renderer)
+
+    # 总表索引：示例PPT的 ProjectCode 匹配到同一行，所有线程共享
+    probe = processor.analyze(decks[0])
+    index = ProjectIndex([{"ProjectCode": probe.project_code, "name": "共享方案", "Action": "大改", "type": "制成类"}])
+    variants = build_variants(index, threads)
+
+    # 单线程参考结果
+    expected = {}
+    for t, variant in enumerate(variants):
+        for deck in decks:
+            expected[(t, deck)] = dict(processor.analyze(deck, ProcessingContext(**variant)))
+
+    failures: List[str] = []
+    failures_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def fail(message: str) -> None:
+        with failures_lock:
+            failures.append(message)
+
+    def worker(t: int) -> int:
+        logs: List[str] = []
+        context = ProcessingContext(log_callback=logs.append, log_level="DEBUG", **variants[t])
+        out_dir = os.path.join(work_dir, f"thread_{t}")
+        os.makedirs(out_dir)
+        barrier.wait()  # 所有线程同时开始，尽量制造交错
+        calls = 0
+        for i in range(iterations):
+            deck = decks[(t + i) % len(decks)]
+            output_path = os.path.join(out_dir, f"{i}.docx")
+            result = processor.analyze(deck, context)
+            if dict(result) != expected[(t, deck)]:
+                fail(f"线程{t} 第{i}次 结果不一致: {dict(result)}")
+            if not processor.render(result, output_path, context):
+                fail(f"线程{t} 第{i}次 文档生成失败")
+            elif not os.path.getsize(output_path):
+                fail(f"线程{t} 第{i}次 文档为空")
+            calls += 1
+        # 本线程回调只应收到本线程输出路径的日志
+        foreign = [line for line in logs if "文档已成功生成" in line and out_dir not in line]
+        if foreign:
+            fail(f"线程{t} 收到其他线程的日志: {foreign[:3]}")
+        generated = [line for line in logs if "文档已成功生成" in line]
+        if len(generated) != iterations:
+            fail(f"线程{t} 日志条数异常: 期望 {iterations}，实际 {len(generated)}")
+        return calls
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total_calls = sum(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    if dict(index.lookup(probe.project_code)) != {"ProjectCode": probe.project_code, "name": "共享方案",
+                                                  "Action": "大改", "type": "制成类"}:
+        fail("共享总表索引在并发处理后被修改")
+
+    return {
+        "threads": threads,
+        "iterations": iterations,
+        "renderer": renderer,
+        "calls": total_calls,
+        "elapsed": round(elapsed, 3),
+        "calls_per_second": round(total_calls / elapsed, 2) if elapsed else None,
+        "failures": failures,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PackingFileProcessor 多线程共享压力测试")
+    parser.add_argument("--threads", type=int, default=16, help="线程数（默认: 16）")
+    parser.add_argument("--iterations", type=int, default=10, help="每个线程处理次数（默认: 10）")
+    parser.add_argument("--renderer", choices=["com", "none"], default="none", help="图片渲染方式（默认: none）")
+    parser.add_argument("--deck", action="append", help="参与测试的PPT，可重复指定（默认使用 examples 中的示例）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的文档目录")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="stress_concurrency_")
+    try:
+        report = run_stress(args.deck or DEFAULT_DECKS, max(1, args.threads), max(1, args.iterations),
+                            args.renderer, work_dir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report["work_dir"] = work_dir if args.keep else None
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+# 命令行入口（无界面），用法：python -m cli {run,watch,rules,submit,work,status} [目录 ...] [选项]
+# 注意：本模块不导入 PyQt5；comtypes 仅在选择 COM 渲染且需要导出图片时才会导入
+import os
+import sys
+import json
+import argparse
+import threading
+from typing import Optional
+
+
+def _add_common_options(parser: argparse.ArgumentParser, default_layout: str) -> None:
+    """run / watch / submit 共用的选项"""
+    parser.add_argument("roots", nargs="*", help="待处理的根目录，缺省时使用配置中的 default_dirs")
+    parser.add_argument("--layout", choices=["numbered", "fixed", "flat"], default=default_layout,
+                        help="输出布局：numbered 每次新建 result_N，fixed 固定 result 目录，flat 输出到 --output-dir")
+    parser.add_argument("-o", "--output-dir", help="flat 布局下的输出目录")
+    _add_processing_options(parser)
+
+
+def _add_processing_options(parser: argparse.ArgumentParser) -> None:
+    """处理PPT的选项（work 的输出位置由任务清单决定，只使用这部分）"""
+    parser.add_argument("--config-dir", default="config", help="配置目录（默认: config）")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="不使用/不写入缓存（方案总表与目录扫描缓存）")
+    parser.add_argument("--cache-dir", help="缓存目录（默认: 配置中的 cache.dir）")
+    parser.add_argument("--renderer", choices=["com", "none"], default="com" if os.name == "nt" else "none",
+                        help="图片渲染方式：com 通过 PowerPoint 导出，none 跳过图片（非 Windows 默认 none）")
+    parser.add_argument("--no-excel", dest="use_excel", action="store_false", help="不读取方案总表")
+    parser.add_argument("--no-staging", dest="use_staging", action="store_false",
+                        help="不预读暂存PPT，直接从原位置解析（默认按配置 staging 预读）")
+    parser.add_argument("--name", help="未匹配到方案总表时使用的工程名字")
+    parser.add_argument("--action", help="未匹配到方案总表时使用的工程类型")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="日志等级（日志输出到 stderr，stdout 仅输出 JSON）")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="以 Prometheus 文本格式导出运行指标（run 结束时写入，watch 每处理完一个PPT更新）")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="在 127.0.0.1:PORT/metrics 提供运行指标的 HTTP 端点")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="一键生成发包规范工具（命令行批处理）"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="批量处理目录下的v3 PPT并生成发包规范文档")
+    _add_common_options(run, default_layout="numbered")
+    run.add_argument("-j", "--workers", type=int, default=1, help="并行处理的进程数（默认: 1）")
+    run.add_argument("--pipeline", action="store_true",
+                     help="流水线处理：预读、解析、渲染、写入重叠进行（-j 为解析进程数）")
+    run.add_argument("--incremental", action="store_true",
+                     help="跳过输出文档比PPT新的文件（需 fixed 或 flat 布局）")
+    run.add_argument("--indent", type=int, default=None, help="JSON 汇总缩进")
+    run.add_argument("--trace", metavar="PATH", help="记录各处理阶段耗时并写入追踪文件")
+    run.add_argument("--trace-format", choices=["json", "chrome"], default="json",
+                     help="追踪文件格式：json 为按PPT汇总的报告，chrome 可在 chrome://tracing / Perfetto 中查看（默认: json）")
+    run.add_argument("--resume", action="store_true",
+                     help="按检查点日志续跑：跳过上次同一批次中已完成且文档仍在的PPT")
+    run.add_argument("--journal", metavar="PATH",
+                     help="检查点日志路径（默认按根目录与输出位置放在缓存目录的 journals 下）")
+    run.add_argument("--no-journal", dest="use_journal", action="store_false", help="不记录检查点日志")
+    run.add_argument("--profile", nargs="?", const="", metavar="DIR",
+                     help="逐PPT用 cProfile 与 tracemalloc 剖析，输出 .pstats 与内存分配排行"
+                          "（缺省目录见配置 profiling.dir，不能与 --pipeline 同时使用）")
+
+    watch = subparsers.add_parser("watch", help="常驻监视目录，新增或修改的v3 PPT写入稳定后自动生成文档")
+    _add_common_options(watch, default_layout="fixed")
+    watch.add_argument("--backend", choices=["auto", "inotify", "poll"], default="auto",
+                       help="监视方式：auto 在 Linux 本地文件系统使用 inotify，其余情况轮询")
+    watch.add_argument("--interval", type=float, default=2.0, help="轮询/检查间隔秒数（默认: 2）")
+    watch.add_argument("--settle", type=float, default=5.0,
+                       help="文件大小与修改时间保持不变多少秒后才处理（默认: 5）")
+    watch.add_argument("-j", "--workers", type=int, default=1,
+                       help="同时处理的线程数（共享同一个处理器，默认: 1）")
+    watch.add_argument("--initial", action="store_true", help="启动时同时处理已存在的PPT")
+
+    submit = subparsers.add_parser("submit", help="分布式批处理：发现PPT并写入共享状态目录的任务清单，由各机器上的 work 认领处理")
+    _add_common_options(submit, default_layout="fixed")
+    submit.add_argument("--state-dir", required=True, help="共享状态目录（各 worker 都能访问）")
+    submit.add_argument("--reset", action="store_true",
+                        help="清除已有的租约与完成标记，全部PPT重新处理（需先停止 worker）")
+    submit.add_argument("--indent", type=int, default=None, help="JSON 输出缩进")
+
+    work = subparsers.add_parser("work", help="分布式批处理：从共享状态目录认领并处理PPT，直到任务清单全部完成")
+    _add_processing_options(work)
+    work.add_argument("--state-dir", required=True, help="共享状态目录（与 submit 相同）")
+    work.add_argument("-j", "--workers", type=int, default=1, help="本进程同时处理的线程数（默认: 1）")
+    work.add_argument("--worker-id", help="worker 标识（默认: 主机名:进程号）")
+    work.add_argument("--lease-seconds", type=float, help="租约过期秒数（默认见配置 distributed.lease_seconds）")
+    work.add_argument("--heartbeat-seconds", type=float, help="续约间隔秒数（默认见配置 distributed.heartbeat_seconds）")
+    work.add_argument("--indent", type=int, default=None, help="JSON 汇总缩进")
+
+    status = subparsers.add_parser("status", help="分布式批处理：输出任务清单的进度与已完成PPT的处理记录")
+    status.add_argument("--state-dir", required=True, help="共享状态目录")
+    status.add_argument("--config-dir", default="config", help="配置目录（默认: config）")
+    status.add_argument("--indent", type=int, default=None, help="JSON 输出缩进")
+
+    rules = subparsers.add_parser("rules", help="在一批PPT上诊断字段规则：逐条规则的耗时、命中率，标记慢规则与从未命中的规则")
+    rules.add_argument("roots", nargs="*", help="PPT文件或目录（目录下查找最大版本的v3 PPT），缺省时使用配置中的 default_dirs")
+    rules.add_argument("--config-dir", default="config", help="配置目录（默认: config）")
+    rules.add_argument("--slow-max-ms", type=float, default=10.0,
+                       help="单次评估超过该毫秒数的规则标记为 slow（默认: 10）")
+    rules.add_argument("--slow-mean-ms", type=float, default=1.0,
+                       help="平均每个形状的评估超过该毫秒数的规则标记为 slow（默认: 1）")
+    rules.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="WARNING",
+                       help="日志等级（默认: WARNING）")
+    rules.add_argument("--indent", type=int, default=2, help="JSON 报告缩进（默认: 2）")
+    return parser
+
+
+def _create_runner(args, workers: int = 1, incremental: bool = False, pipeline: bool = False,
+                   trace: bool = False, profile_dir: Optional[str] = None, journal: bool = False,
+                   journal_path: Optional[str] = None, resume: bool = False):
+    from config.loader import ConfigLoader
+    from utils.logger import LoggerFactory
+    from core.batch import BatchRunner
+
+    config = ConfigLoader(config_dir=args.config_dir)
+    if args.log_level:
+        LoggerFactory.apply_level(args.log_level)
+    profiler = None
+    if profile_dir is not None:
+        from utils.profiling import DeckProfiler
+        profiler = DeckProfiler.from_config(config, profile_dir or None)
+    return BatchRunner(
+        config,
+        workers=workers,
+        layout=getattr(args, "layout", "fixed"),
+        output_dir=getattr(args, "output_dir", None),
+        incremental=incremental,
+        use_cache=args.use_cache,
+        cache_dir=args.cache_dir,
+        renderer=args.renderer,
+        use_excel=args.use_excel,
+        manual_proj_name_value=args.name,
+        manual_proj_action_value=args.action,
+        log_level=args.log_level,
+        pipeline=pipeline,
+        staging=args.use_staging,
+        trace=trace,
+        profiler=profiler,
+        journal=journal,
+        journal_path=journal_path,
+        resume=resume,
+    )
+
+
+def _start_metrics(args):
+    """按 --metrics-port 启动本机指标端点，返回 HTTP 服务（未指定时为 None）"""
+    if args.metrics_port is None:
+        return None
+    from utils.metrics import REGISTRY
+    return REGISTRY.serve(args.metrics_port)
+
+
+def _write_metrics(args) -> None:
+    if args.metrics_file:
+        from utils.metrics import REGISTRY
+        try:
+            REGISTRY.write(args.metrics_file)
+        except OSError as e:
+            print(f"写入指标文件失败: {e}", file=sys.stderr)
+
+
+def cmd_run(args) -> int:
+    if args.resume and not args.use_journal:
+        print("参数错误: --resume 需要检查点日志，不能与 --no-journal 同时使用", file=sys.stderr)
+        return 2
+    try:
+        runner = _create_runner(args, workers=args.workers, incremental=args.incremental,
+                                pipeline=args.pipeline, trace=bool(args.trace), profile_dir=args.profile,
+                                journal=args.use_journal, journal_path=args.journal, resume=args.resume)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    server = _start_metrics(args)
+    try:
+        summary = runner.run(args.roots)
+    finally:
+        _write_metrics(args)
+        if server is not None:
+            server.shutdown()
+    if args.trace:
+        runner.trace_report.write(args.trace, args.trace_format)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 1 if summary["counts"]["failed"] else 0
+
+
+def cmd_watch(args) -> int:
+    from core.watcher import DeckWatcher
+
+    try:
+        runner = _create_runner(args)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    roots = args.roots or runner.get_default_roots()
+    invalid = [root for root in roots if not os.path.isdir(root)]
+    if not roots or invalid:
+        print(f"参数错误: 监视目录不存在: {invalid or '未指定'}", file=sys.stderr)
+        return 2
+    # 预先加载方案总表，首个PPT到达时无需等待
+    runner.get_project_index()
+
+    output_lock = threading.Lock()
+
+    def handle(pptx_path: str) -> None:
+        # 每处理完一个PPT输出一行 JSON（多线程处理时整行写出）
+        line = json.dumps(runner.process_deck(pptx_path), ensure_ascii=False) + "\n"
+        with output_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            _write_metrics(args)
+
+    watcher = DeckWatcher(roots, handle, catalog=runner.catalog, backend=args.backend,
+                          interval=args.interval, settle_seconds=args.settle,
+                          workers=args.workers, process_existing=args.initial)
+    server = _start_metrics(args)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+    return 0
+
+
+def cmd_submit(args) -> int:
+    from core.jobboard import Job, JobBoard
+
+    if args.layout == "numbered":
+        print("参数错误: 分布式批处理需要固定的输出位置，请使用 fixed 或 flat 布局", file=sys.stderr)
+        return 2
+    try:
+        runner = _create_runner(args)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    roots = args.roots or runner.get_default_roots()
+    jobs = [Job.for_deck(pptx_path, runner.get_output_path(pptx_path)) for pptx_path in runner.discover(roots)]
+    board = JobBoard.from_config(runner.config, args.state_dir)
+    board.publish(jobs, reset=args.reset)
+    json.dump(board.status(), sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 0
+
+
+def cmd_work(args) -> int:
+    import time
+    from core.jobboard import JobBoard, JobWorker
+
+    try:
+        runner = _create_runner(args)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    board = JobBoard.from_config(runner.config, args.state_dir)
+    if args.lease_seconds is not None:
+        board.lease_seconds = args.lease_seconds
+    options = {"worker_id": args.worker_id, "threads": args.workers}
+    if args.heartbeat_seconds is not None:
+        options["heartbeat_seconds"] = args.heartbeat_seconds
+    worker = JobWorker.from_config(runner.config, board, lambda job: runner.process_deck(job.pptx, job.output),
+                                   **options)
+    server = _start_metrics(args)
+    start = time.perf_counter()
+    try:
+        records = worker.run()
+    except FileNotFoundError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    finally:
+        _write_metrics(args)
+        if server is not None:
+            server.shutdown()
+    counts = {"total": len(records)}
+    for status in ("ok", "failed"):
+        counts[status] = sum(1 for r in records if r["status"] == status)
+    summary = {
+        "state_dir": args.state_dir,
+        "worker": worker.worker_id,
+        "decks": records,
+        "counts": counts,
+        "board": board.status()["counts"],
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 1 if counts["failed"] else 0
+
+
+def cmd_status(args) -> int:
+    from config.loader import ConfigLoader
+    from core.jobboard import JobBoard
+
+    board = JobBoard.from_config(ConfigLoader(config_dir=args.config_dir), args.state_dir)
+    try:
+        status = board.status()
+    except FileNotFoundError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    json.dump(status, sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 1 if status["counts"]["failed"] else 0
+
+
+def cmd_rules(args) -> int:
+    from config.loader import ConfigLoader
+    from utils.logger import LoggerFactory
+    from core.discovery import DeckDiscovery
+    from core.packing_file_发包规范 import PackingFileProcessor
+    from core.rule_profile import profile_rules
+
+    config = ConfigLoader(config_dir=args.config_dir)
+    LoggerFactory.apply_level(args.log_level)
+    roots = args.roots or [str(root) for root in (config.config.get("default_dirs") or [])]
+    files = [root for root in roots if os.path.isfile(root)]
+    dirs = [root for root in roots if os.path.isdir(root)]
+    pptx_paths = files + DeckDiscovery().discover(dirs)
+    if not pptx_paths:
+        print(f"参数错误: 未找到PPT: {roots or '未指定'}", file=sys.stderr)
+        return 2
+
+    def progress(count: int, pptx_path: str) -> None:
+        print(f"[{count}/{len(pptx_paths)}] {pptx_path}", file=sys.stderr)
+
+    report = profile_rules(PackingFileProcessor(config, renderer="none"), pptx_paths,
+                           slow_max_ms=args.slow_max_ms, slow_mean_ms=args.slow_mean_ms,
+                           progress_callback=progress)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=args.indent)
+    sys.stdout.write("\n")
+    return 1 if report["flagged"]["slow"] or report["flagged"]["rejected"] else 0
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return cmd_run(args)
+    if args.command == "watch":
+        return cmd_watch(args)
+    if args.command == "rules":
+        return cmd_rules(args)
+    if args.command == "submit":
+        return cmd_submit(args)
+    if args.command == "work":
+        return cmd_work(args)
+    if args.command == "status":
+        return cmd_status(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
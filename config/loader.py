@@ -1,5 +1,4 @@
 import os
-import yaml
 from typing import Dict, Any
 from utils.logger import LoggerFactory, LOG_LEVELS
 from pathlib import Path
@@ -28,6 +27,7 @@ class ConfigLoader:
 
     def _load_all_configs(self) -> Dict[str, Any]:
         """加载所有配置文件"""
+        import yaml
         configs = {}
         # 加载主配置文件
         main_config = os.path.join(self.config_dir, "app_settings.yaml")
@@ -54,6 +54,17 @@ class ConfigLoader:
         filename = docx_config.get('filename', '')
         return os.path.join(docx_path, filename)
 
+    def get_enabled_reports(self) -> list:
+        """获取启用的报表类型（默认只导出发包规范）"""
+        enabled = self.config.get('reports', {}).get('enabled') or ["发包规范"]
+        return [enabled] if isinstance(enabled, str) else list(enabled)
+
+    def get_report_template_path(self, report_name: str) -> str:
+        """获取报表模板路径，未配置时返回空字符串"""
+        if report_name == "发包规范":
+            return self.get_template_path()
+        return self.config.get('reports', {}).get('templates', {}).get(report_name) or ''
+
     def get_project_excel_path(self) -> str:
         """获取总表位置"""
         templates = self.config.get('templates', {})
@@ -67,6 +78,26 @@ class ConfigLoader:
         templates = self.config.get('templates', {})
         return templates.get('excel', {})
 
+    def get_cache_dir(self) -> str:
+        """获取缓存目录"""
+        return self.config.get('cache', {}).get('dir', '.cache')
+
+    def is_dir_catalog_enabled(self) -> bool:
+        """是否启用目录扫描缓存"""
+        return bool(self.config.get('cache', {}).get('dir_catalog', True))
+
+    def get_staging_config(self) -> Dict[str, Any]:
+        """获取PPT预读暂存配置"""
+        return self.config.get('staging', {}) or {}
+
+    def get_profiling_config(self) -> Dict[str, Any]:
+        """获取逐PPT性能剖析配置"""
+        return self.config.get('profiling', {}) or {}
+
+    def get_distributed_config(self) -> Dict[str, Any]:
+        """获取多机分布式批处理（租约）配置"""
+        return self.config.get('distributed', {}) or {}
+
     def get_log_config(self) -> Dict[str, Any]:
         """获取日志配置"""
         return self.config.get('logs', {})
@@ -75,6 +106,7 @@ class ConfigLoader:
         """保存当前配置到文件"""
         if not config_path:
             config_path = os.path.join(self.config_dir, "current_settings.yaml")
+        import yaml
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.safe_dump(self.config, f)
 
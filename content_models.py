@@ -1,8 +1,7 @@
 # src/office_ops/ppt_processor/content_models.py
 import re
-from pptx.enum.shapes import MSO_SHAPE_TYPE, MSO_AUTO_SHAPE_TYPE
-from pptx.dml.color import RGBColor
-from typing import List, Dict, Optional, Tuple
+from functools import cached_property
+from typing import List, Dict, Optional, Sequence, Tuple
 from config.loader import ConfigLoader
 from utils.logger import LoggerFactory, LOG_LEVELS
 
@@ -55,14 +54,78 @@ class UnitConverter:
     def emu_to_inch(emu: float) -> float:
         return round(emu / 914400, 2)  # 1英寸 = 914400 EMU
 
+class GroupTransform:
+    """
+    群组坐标变换：把群组子坐标系中的坐标（EMU）映射到幻灯片坐标（EMU）
+
+    群组的 a:off/a:ext 位于其父级坐标系，子形状的坐标位于 a:chOff/a:chExt 描述的子坐标系，
+    嵌套群组逐层叠加。旋转与翻转不参与计算（与原先直接使用 shape.left/top 一致）。
+    """
+    IDENTITY: "GroupTransform"
+
+    def __init__(self, scale_x: float = 1.0, scale_y: float = 1.0, offset_x: float = 0.0, offset_y: float = 0.0):
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    def apply(self, left, top, width, height) -> Tuple[float, float, float, float]:
+        return (left * self.scale_x + self.offset_x, top * self.scale_y + self.offset_y,
+                width * self.scale_x, height * self.scale_y)
+
+    def enter_group(self, group_shape) -> "GroupTransform":
+        """返回群组内子形状坐标到幻灯片坐标的变换"""
+        xfrm = group_shape._element.xfrm
+        if xfrm is None or xfrm.off is None or xfrm.ext is None or xfrm.chOff is None or xfrm.chExt is None:
+            return self
+        off, ext, ch_off, ch_ext = xfrm.off, xfrm.ext, xfrm.chOff, xfrm.chExt
+        kx = ext.cx / ch_ext.cx if ch_ext.cx else 1.0
+        ky = ext.cy / ch_ext.cy if ch_ext.cy else 1.0
+        # 子坐标 c → 父坐标 off + (c - chOff) * k → 再经父级变换到幻灯片坐标
+        return GroupTransform(
+            self.scale_x * kx,
+            self.scale_y * ky,
+            self.scale_x * (off.x - ch_off.x * kx) + self.offset_x,
+            self.scale_y * (off.y - ch_off.y * ky) + self.offset_y,
+        )
+
+
+GroupTransform.IDENTITY = GroupTransform()
+
+
 class BaseShape:
-    """形状基类（封装位置、大小等通用属性）"""
+    """
+    形状基类（封装位置、大小等通用属性）
+
+    left/top/width/height 均为幻灯片绝对坐标（cm）；群组内的形状由所属 GroupShape 换算。
+    index/parent/depth 由 Slide 在解析后展开形状树时设置。
+    """
     def __init__(self, shape):
         self.shape = shape
-        self.left = UnitConverter.emu_to_cm(shape.left)
-        self.top = UnitConverter.emu_to_cm(shape.top)
-        self.width = UnitConverter.emu_to_cm(shape.width)
-        self.height = UnitConverter.emu_to_cm(shape.height)
+        self.index: Optional[int] = None  # 在所在幻灯片展开列表中的位置
+        self.parent: Optional["GroupShape"] = None  # 所属群组，顶层为 None
+        self.depth = 0  # 群组嵌套深度，顶层为 0
+        self._set_box(shape.left, shape.top, shape.width, shape.height)
+
+    def _set_box(self, left, top, width, height) -> None:
+        self.left = UnitConverter.emu_to_cm(left)
+        self.top = UnitConverter.emu_to_cm(top)
+        self.width = UnitConverter.emu_to_cm(width)
+        self.height = UnitConverter.emu_to_cm(height)
+
+    def _place_in_group(self, group: "GroupShape", transform: GroupTransform) -> None:
+        """作为群组子形状：记录父级并把子坐标系中的位置换算为幻灯片坐标"""
+        self.parent = group
+        self.depth = group.depth + 1
+        self._set_box(*transform.apply(self.shape.left, self.shape.top, self.shape.width, self.shape.height))
+
+    def get_links(self) -> Dict:
+        """展开列表中的链接信息（父级以 index 表示，便于序列化）"""
+        return {
+            "index": self.index,
+            "parent": self.parent.index if self.parent is not None else None,
+            "depth": self.depth,
+        }
 
     def get_position(self) -> tuple[float, float]:
         return (self.left, self.top)
@@ -80,12 +143,15 @@ class BaseShape:
         return f"({self.width},{self.height})"
 
 class TextBox(BaseShape):
-    """文本框解析类"""
+    """文本框解析类（构造时只提取文本，字体等格式在首次访问 paragraph_details 时解析并缓存）"""
     def __init__(self, shape):
         super().__init__(shape)
         self.text_frame = shape.text_frame
         self.text_content = self._extract_text()
-        self.paragraph_details = self._extract_paragraph_details()
+
+    @cached_property
+    def paragraph_details(self) -> List[Dict]:
+        return self._extract_paragraph_details()
 
     def _extract_text(self) -> str:
         return self.text_frame.text.strip() if self.text_frame else ""
@@ -112,6 +178,7 @@ class TextBox(BaseShape):
 
     @staticmethod
     def _get_font_color(color) -> str:
+        from pptx.dml.color import RGBColor
         if not color:
             return "无颜色"
         if isinstance(color, RGBColor):
@@ -120,44 +187,76 @@ class TextBox(BaseShape):
             return f"主题色: {color.theme_color.name}"
         return "未知颜色"
 
-    def to_dict(self) -> Dict:
-        return {
+    def to_dict(self, include_formatting: bool = True) -> Dict:
+        data = {
             "type": "文本框",
             "text": self.text_content,
             "position": self.get_position_str(),
             "size": self.get_size_str(),
             "box": self.get_box(),
-            "paragraphs": self.paragraph_details
         }
+        if include_formatting:
+            data["paragraphs"] = self.paragraph_details
+        data.update(self.get_links())
+        return data
 
 class Table(BaseShape):
-    """表格解析类"""
+    """
+    表格解析类
+
+    构造时只从XML读取一次单元格文本（紧凑的文本网格），段落/字体明细在首次访问 cell_details 时才计算；
+    版本记录类表格常有数百行，而提取器只使用最后一行数据。
+    """
     def __init__(self, shape):
         super().__init__(shape)
         self.table = shape.table
-        self.rows = len(self.table.rows)
+        self.grid = self._read_text_grid(self.table._tbl)
+        self.rows = len(self.grid)
         self.cols = len(self.table.columns)
-        self.cell_details = self._extract_cell_details()
         self.last_row_data = self._extract_last_cell_details()
 
+    @cached_property
+    def cell_details(self) -> List[List[Dict]]:
+        """每个单元格的文本与段落格式明细（按需计算）"""
+        return self._extract_cell_details()
+
     @staticmethod
-    def _is_row_empty(row, row_idx=0) -> bool:
-        """判断表格行是否为空（所有单元格无有效内容）"""
-        if row_idx > 0:
-            col_idx = 0
-            for cell in row.cells:
-                stripped_text = cell.text.strip()
-                if col_idx > 0:
-                    if stripped_text:  # 存在非空白内容
-                        return False
-                col_idx += 1
-            return True
-        else:
-            for cell in row.cells:
-                stripped_text = cell.text.strip()
-                if stripped_text:  # 存在非空白内容
-                    return False
-            return True
+    def _read_text_grid(tbl) -> Tuple[Tuple[str, ...], ...]:
+        """
+        单次遍历 a:tbl，返回每行每个单元格的文本
+
+        与 python-pptx 的 cell.text 一致：段落之间以 "\n" 连接，段内换行 <a:br> 记为 "\v"，
+        且不会像 cell.text_frame 那样为无文本的单元格补建 txBody。
+        """
+        from pptx.oxml.ns import qn
+        tag_tr, tag_tc, tag_txbody, tag_p = qn("a:tr"), qn("a:tc"), qn("a:txBody"), qn("a:p")
+        tag_r, tag_br, tag_fld, tag_t = qn("a:r"), qn("a:br"), qn("a:fld"), qn("a:t")
+
+        def paragraph_text(p) -> str:
+            parts = []
+            for child in p.iterchildren(tag_r, tag_br, tag_fld):
+                if child.tag == tag_br:
+                    parts.append("\v")
+                else:
+                    t = child.find(tag_t)
+                    parts.append(t.text or "" if t is not None else "")
+            return "".join(parts)
+
+        grid = []
+        for tr in tbl.iterchildren(tag_tr):
+            row = []
+            for tc in tr.iterchildren(tag_tc):
+                tx_body = tc.find(tag_txbody)
+                row.append("" if tx_body is None else
+                           "\n".join(paragraph_text(p) for p in tx_body.iterchildren(tag_p)))
+            grid.append(tuple(row))
+        return tuple(grid)
+
+    @staticmethod
+    def _is_row_empty(cells: Sequence[str], row_idx=0) -> bool:
+        """判断表格行是否为空（所有单元格无有效内容；数据行不看第一列的序号）"""
+        start = 1 if row_idx > 0 else 0
+        return not any(text.strip() for text in cells[start:])
 
     def _extract_cell_details(self) -> List[List[Dict]]:
         details = []
@@ -174,34 +273,24 @@ class Table(BaseShape):
             details.append(row_details)
         return details
 
-    def _extract_last_cell_details(self) -> list:
-        """处理单张表格，返回字典列表（键为标题行，值为数据行）"""
-        if len(self.table.rows) < 1:
+    def _extract_last_cell_details(self) -> Optional[Dict]:
+        """返回最后一个有效数据行（键为标题行，值为数据行）；无数据行时值均为 None"""
+        if not self.grid:
             return None  # 无行，跳过
 
         # 提取标题行（首行）
-        header_cells = self.table.rows[0].cells
-        headers = [cell.text.strip() for cell in header_cells]
+        headers = [text.strip() for text in self.grid[0]]
         if not any(headers):  # 标题行全为空，无效
             return None
 
-        # 遍历数据行（首行之后的行）
-        data = dict.fromkeys(headers)
-        for idx in range(1, len(self.table.rows)):
-            if self._is_row_empty(self.table.rows[idx], idx):
-                continue  # 跳过空行
-
-            # 检查单元格数量是否与标题一致（避免列错位）
-            if len(self.table.rows[idx].cells) != len(headers):
-                continue  # 列数不匹配，跳过（可根据需求调整）
+        # 从最后一行向前查找，遇到第一个非空且列数与标题一致的行即返回
+        for idx in range(len(self.grid) - 1, 0, -1):
+            cells = self.grid[idx]
+            if len(cells) != len(headers) or self._is_row_empty(cells, idx):
+                continue  # 列数不匹配（避免列错位）或空行，跳过
+            return {headers[i]: text.strip() for i, text in enumerate(cells)}
 
-            # 构建数据字典（标题为键，单元格内容为值）
-            row_data = {
-                headers[i]: cell.text.strip() for i, cell in enumerate(self.table.rows[idx].cells)
-            }
-            data = row_data
-
-        return data
+        return dict.fromkeys(headers)
 
     @staticmethod
     def _extract_cell_paragraphs(cell) -> List[Dict]:
@@ -217,17 +306,20 @@ class Table(BaseShape):
             })
         return paragraphs
 
-    def to_dict(self) -> Dict:
-        return {
+    def to_dict(self, include_formatting: bool = True) -> Dict:
+        data = {
             "type": "Table",
             "box": self.get_box(),
             "position": self.get_position_str(),
             "size": self.get_size_str(),
             "rows": self.rows,
             "cols": self.cols,
-            "cells": self.cell_details,
-            "last_row": self.last_row_data
         }
+        if include_formatting:
+            data["cells"] = self.cell_details
+        data["last_row"] = self.last_row_data
+        data.update(self.get_links())
+        return data
 
 class Image(BaseShape):
     """图片解析类"""
@@ -236,19 +328,20 @@ class Image(BaseShape):
         self.image = shape
         self.alt_text = self.image.name
 
-    def to_dict(self) -> Dict:
+    def to_dict(self, include_formatting: bool = True) -> Dict:
         return {
             "type": "Image",
             "box": self.get_box(),
             "alt_text": self.alt_text,
             "position": self.get_position_str(),
-            "size": self.get_size_str()
+            "size": self.get_size_str(),
+            **self.get_links(),
         }
 
 
 
 class CustomShape(BaseShape):
-    """AutoShape自定义形状解析类（矩形、圆形等）"""
+    """AutoShape自定义形状解析类（矩形、圆形等；填充/线条/字体格式按需解析并缓存）"""
 
     def __init__(self, shape):
         super().__init__(shape)
@@ -262,16 +355,32 @@ class CustomShape(BaseShape):
             self.shape_type = "矩形"
         else:
             self.shape_type = shape_type_str
-        self.fill_color = self._get_fill_color()
-        self.line_color = self._get_line_color()
-        self.line_width = UnitConverter.emu_to_cm(shape.line.width) if shape.line else "无"
         self.text_content = self._get_content()
-        self.text_content_font_sizes = []
-        self.paragraph_details = self._extract_paragraph_details()
+
+    @cached_property
+    def fill_color(self) -> str:
+        return self._get_fill_color()
+
+    @cached_property
+    def line_color(self) -> str:
+        return self._get_line_color()
+
+    @cached_property
+    def line_width(self):
+        return UnitConverter.emu_to_cm(self.shape.line.width) if self.shape.line else "无"
+
+    @cached_property
+    def paragraph_details(self) -> list:
+        return self._extract_paragraph_details()
+
+    @cached_property
+    def text_content_font_sizes(self) -> list:
+        """文本中出现的字体大小（按出现顺序去重）"""
+        return list(dict.fromkeys(item["font_size"] for item in self.paragraph_details))
 
     def _get_content(self):
         if self.shape.has_text_frame:
-            return self.shape.text.strip() if len(self.shape.text) > 0 else ""
+            return self.shape.text.strip()
         else:
             return ""
 
@@ -370,8 +479,6 @@ class CustomShape(BaseShape):
                     "color": self._get_font_color(run.font.color),
                     "alignment": str(para.alignment) if para.alignment else "LEFT (1)"
                 }
-                if run_info["font_size"] not in self.text_content_font_sizes:
-                    self.text_content_font_sizes.append(run_info["font_size"])
                 if prev_run_info and all(run_info[k] == prev_run_info[k] for k in run_info):
                     details[-1]["text"] += text
                 else:
@@ -399,17 +506,20 @@ class CustomShape(BaseShape):
         """结构化输出自定义形状信息"""
         return str(self.to_dict())
 
-    def to_dict(self) -> dict:
-        return {
+    def to_dict(self, include_formatting: bool = True) -> dict:
+        data = {
             "type": f"{self.shape_type}",
             "box": self.get_box(),
             "text": f"{self.text_content}",
             "position": f"{self.get_position_str()}",
             "size": f"{self.get_size_str()}",
-            "fill_color": f"{self.fill_color}",
-            "line_color": f"{self.line_color}",
-            "line_width": f"{self.line_width:.2f}cm"
         }
+        if include_formatting:
+            data["fill_color"] = f"{self.fill_color}"
+            data["line_color"] = f"{self.line_color}"
+            data["line_width"] = f"{self.line_width:.2f}cm"
+        data.update(self.get_links())
+        return data
 
 
 # ------------------------------ Slide 类 ------------------------------
@@ -424,6 +534,8 @@ class Slide:
         self.page_number = page_number  # 页码从1开始
         self.slide_master = slide_master
         self.shapes = self._parse_shapes()
+        # 解析时展开一次：所有形状（含各层群组内）按先序排列，坐标均为幻灯片绝对坐标
+        self.flat_shapes = flatten_shapes(self.shapes or [])
         self.master_shapes = self._parse_master_shapes()
 
         # 动态加载标题位置配置（从外部传入 config_loader）
@@ -440,7 +552,7 @@ class Slide:
     # ------------------------------ 标题提取方法 ------------------------------
     def extract_titles(self) -> None:
         self.logger.debug(f"开始提取第 {self.page_number} 页标题")
-        for shape in self.shapes:
+        for shape in self.flat_shapes:
             is_text_shape = (
                 isinstance(shape, TextBox) or
                 (isinstance(shape, CustomShape) and shape.shape_type == "矩形")
@@ -513,6 +625,8 @@ class Slide:
 
     # ------------------------------ 原有方法 ------------------------------
     def _parse_shapes(self) -> List[BaseShape]:
+        # pptx 仅在解析时导入（读取PPT前 python-pptx 必然已加载，此处不增加开销）
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
         self.logger.debug(f"开始解析第 {self.page_number} 页形状")
         shapes = []
         try:
@@ -533,6 +647,7 @@ class Slide:
             self.logger.error(f"解析形状时出错: {e}", exc_info=True)
 
     def _parse_master_shapes(self) -> List[BaseShape]:
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
         self.logger.debug("开始解析母版形状")
         master_shapes = []
         try:
@@ -545,50 +660,102 @@ class Slide:
         except Exception as e:
             self.logger.error(f"解析母版形状时出错: {e}", exc_info=True)
 
-    def to_dict(self) -> Dict:
-        """结构化输出（包含标题）"""
+    def to_dict(self, include_formatting: bool = True) -> Dict:
+        """
+        结构化输出（包含标题）
+
+        shapes 为原有的嵌套结构；flat_shapes 为同一批字典按先序展开的列表，
+        每个形状带 index/parent/depth，群组内形状的 box 为幻灯片绝对坐标。
+
+        Args:
+            include_formatting: 是否包含字体/填充/线条及表格单元格明细；只需要文本与位置时传 False，
+                这些格式不会被解析
+        """
+        shapes = [shape.to_dict(include_formatting) for shape in self.shapes]
         return {
             "page_number": self.page_number,
             "title": self.title,
             "second_title": self.second_title,
-            "shapes": [shape.to_dict() for shape in self.shapes],
-            "master_shapes": [shape.to_dict() for shape in self.master_shapes]
+            "shapes": shapes,
+            "flat_shapes": flatten_shape_dicts(shapes),
+            "master_shapes": [shape.to_dict(include_formatting) for shape in self.master_shapes]
         }
 
 class GroupShape(BaseShape):
-    """群组形状，包含多个子 shape"""
-    def __init__(self, shape):
+    """群组形状，包含多个子 shape（子形状坐标已换算为幻灯片绝对坐标）"""
+    def __init__(self, shape, transform: GroupTransform = GroupTransform.IDENTITY,
+                 parent: Optional["GroupShape"] = None):
+        """
+        Args:
+            transform: 本群组所在坐标系到幻灯片坐标的变换（顶层群组为恒等变换）
+            parent: 所属的上级群组
+        """
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
         super().__init__(shape)
+        if parent is not None:
+            self._place_in_group(parent, transform)
         self.logger = LoggerFactory.create_logger("GroupShape")
         self.logger.debug("初始化群组形状")
         self.type = "Group"
         self.shapes = []
 
         try:
+            child_transform = transform.enter_group(shape)
             for sub_shape in shape.shapes:
+                if sub_shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                    self.shapes.append(GroupShape(sub_shape, child_transform, parent=self))
+                    continue
                 if sub_shape.shape_type == MSO_SHAPE_TYPE.TEXT_BOX:
-                    self.shapes.append(TextBox(sub_shape))
+                    child = TextBox(sub_shape)
                 elif sub_shape.shape_type == MSO_SHAPE_TYPE.TABLE:
-                    self.shapes.append(Table(sub_shape))
+                    child = Table(sub_shape)
                 elif sub_shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    self.shapes.append(Image(sub_shape))
+                    child = Image(sub_shape)
                 elif sub_shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
-                    self.shapes.append(CustomShape(sub_shape))
-                elif sub_shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-                    self.shapes.append(GroupShape(sub_shape))
+                    child = CustomShape(sub_shape)
+                else:
+                    continue
+                child._place_in_group(self, child_transform)
+                self.shapes.append(child)
             self.logger.debug(f"群组形状解析完成，包含 {len(self.shapes)} 个子形状")
         except Exception as e:
             self.logger.error(f"解析群组形状时出错: {e}", exc_info=True)
     
-    def to_dict(self):
+    def to_dict(self, include_formatting: bool = True):
         return {
             "type": self.type,
             "box": self.get_box(),
             "position": self.get_position_str(),
             "size": self.get_size_str(),
-            "shapes": [s.to_dict() for s in self.shapes]
+            "shapes": [s.to_dict(include_formatting) for s in self.shapes],
+            **self.get_links(),
         }
 
+
+def flatten_shapes(shapes: Sequence[BaseShape]) -> List[BaseShape]:
+    """按先序（群组在前、其子形状紧随其后）展开形状树，并为每个形状设置 index"""
+    flat = []
+    stack = list(reversed(shapes))
+    while stack:
+        shape = stack.pop()
+        shape.index = len(flat)
+        flat.append(shape)
+        if isinstance(shape, GroupShape):
+            stack.extend(reversed(shape.shapes))
+    return flat
+
+
+def flatten_shape_dicts(shapes: Sequence[Dict]) -> List[Dict]:
+    """与 flatten_shapes 相同顺序展开 to_dict 的结果（返回同一批字典对象）"""
+    flat = []
+    stack = list(reversed(shapes))
+    while stack:
+        shape = stack.pop()
+        flat.append(shape)
+        if shape.get("type") == "Group":
+            stack.extend(reversed(shape.get("shapes", [])))
+    return flat
+
 if __name__ == "__main__":
     from config.loader import ConfigLoader
     from pptx import Presentation
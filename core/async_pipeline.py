@@ -0,0 +1,301 @@
+# 异步流水线批处理：预读暂存 → 解析与提取 → 图片渲染 → 写入文档
+# 各阶段之间是有界队列，每个阶段有独立的并发上限：网络共享读取慢时，解析阶段继续处理已预读的文件，
+# 渲染（COM）与写入也不再等待下一个PPT读完。阶段内的阻塞工作都放到执行器中，事件循环只负责调度。
+import os
+import time
+import asyncio
+import traceback
+from contextlib import nullcontext
+from dataclasses import replace
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from utils import metrics, tracing
+from utils.logger import LoggerFactory
+from core.pipeline import ExtractionResult, ProcessingContext
+from core.project_index import ProjectIndexLoader
+from core.staging import DeckStager, StagedDeck
+from exporters.registry import ImageRenderCache
+
+PIPELINE_STAGES = ("read", "parse", "render", "write")
+PARSE_MODES = ("thread", "process")
+
+_DONE = object()  # 队列结束标记
+
+# 进程模式下每个解析进程各自持有的处理器
+_worker_processor = None
+
+
+def _parse_worker_init(config_dir: str, renderer: str, log_level: Optional[str]) -> None:
+    """解析进程初始化：每个进程加载一次配置并创建处理器"""
+    global _worker_processor
+    from config.loader import ConfigLoader
+    from core.packing_file_发包规范 import PackingFileProcessor
+    from extractors import regex_guard
+    config = ConfigLoader(config_dir=config_dir)
+    if log_level:
+        LoggerFactory.apply_level(log_level)
+    _worker_processor = PackingFileProcessor(config, renderer=renderer)
+    # 每个解析进程最多一个限时匹配子进程
+    regex_guard.configure_workers(1)
+
+
+def _parse_in_worker(pptx_path: str, data: Optional[bytes], local_path: Optional[str],
+                     context: ProcessingContext, trace: bool = False) -> Tuple[ExtractionResult, Optional[Dict]]:
+    """子进程中解析；trace 为 True 时同时返回本阶段的追踪结果，由主进程并入该PPT的追踪"""
+    parse_trace = tracing.Trace(pptx_path) if trace else None
+    with parse_trace.activate() if parse_trace is not None else nullcontext():
+        if data is not None:
+            result = _worker_processor.analyze(pptx_path, context, data)
+        else:
+            # 超过内存预算的PPT已复制到本地临时文件
+            with open(local_path, "rb") as stream:
+                result = _worker_processor.analyze(pptx_path, context, stream)
+    return result, parse_trace.to_dict() if parse_trace is not None else None
+
+
+def _com_thread_init() -> None:
+    """渲染线程初始化 COM（非 Windows 或未安装 comtypes 时忽略）"""
+    try:
+        import comtypes
+        comtypes.CoInitialize()
+    except Exception:
+        pass
+
+
+class _Job:
+    """流水线中的一个PPT"""
+    __slots__ = ("order", "pptx_path", "output_path", "staged", "result", "image_cache", "record", "started",
+                 "trace")
+
+    def __init__(self, order: int, pptx_path: str, output_path: str, trace: bool = False):
+        self.order = order
+        self.pptx_path = pptx_path
+        self.output_path = output_path
+        self.staged: Optional[StagedDeck] = None
+        self.result: Optional[ExtractionResult] = None
+        self.image_cache: Optional[ImageRenderCache] = None
+        self.record = {"pptx": pptx_path, "output": output_path, "status": "failed", "error": None,
+                       "reports": {}, "stages": {}}
+        self.started = time.perf_counter()
+        self.trace = tracing.Trace(pptx_path, pipeline=True) if trace else None
+
+    @property
+    def failed(self) -> bool:
+        return self.record["error"] is not None
+
+    def bind(self, func):
+        """提交到执行器的函数：开启追踪时在工作线程中记录到本PPT的追踪"""
+        return self.trace.bind(func) if self.trace is not None else func
+
+
+class AsyncPipelineRunner:
+    """
+    按阶段流水线处理多个PPT
+
+    Args:
+        processor: PackingFileProcessor（多个阶段、多个PPT共享）
+        read_concurrency: 同时预读的文件数（网络共享读取慢时调大），总量受 stager 的字节预算限制
+        parse_workers: 解析执行器的工作线程/进程数，默认 CPU 核数
+        parse_mode: "thread" 在线程池解析；"process" 在进程池解析（不占用本进程GIL，
+            但 context.log_callback 不会在子进程中调用）
+        render_concurrency: 同时进行图片渲染的PPT数（PowerPoint COM 建议保持 1）
+        write_concurrency: 同时写入文档的PPT数
+        queue_size: 阶段之间的队列长度，限制已预读但尚未解析的文件数量（内存上限）
+        parse_executor: 外部提供的解析线程池（如服务已有的线程池），传入时忽略 parse_workers/parse_mode
+        stager: 预读暂存器，解析与图片渲染共用暂存内容；为 None 时使用默认预算
+        trace: 记录每个PPT各阶段的耗时，追踪结果放在处理记录的 "trace" 中
+    """
+
+    def __init__(self, processor, read_concurrency: int = 4, parse_workers: Optional[int] = None,
+                 parse_mode: str = "thread", render_concurrency: int = 1, write_concurrency: int = 2,
+                 queue_size: int = 4, parse_executor: Optional[Executor] = None,
+                 stager: Optional[DeckStager] = None, trace: bool = False):
+        if parse_mode not in PARSE_MODES:
+            raise ValueError(f"未知的解析方式: {parse_mode}，可选: {', '.join(PARSE_MODES)}")
+        self.processor = processor
+        self.read_concurrency = max(1, int(read_concurrency))
+        self.parse_workers = max(1, int(parse_workers or os.cpu_count() or 1))
+        self.parse_mode = parse_mode
+        self.render_concurrency = max(1, int(render_concurrency))
+        self.write_concurrency = max(1, int(write_concurrency))
+        self.queue_size = max(1, int(queue_size))
+        self.parse_executor = parse_executor
+        self.stager = stager or DeckStager()
+        self.trace = trace
+        self.logger = LoggerFactory.create_logger("AsyncPipeline")
+
+    async def run(self, jobs: Iterable[Tuple[str, str]],
+                  context: Optional[ProcessingContext] = None) -> List[Dict]:
+        """
+        处理全部PPT
+
+        Args:
+            jobs: (pptx_path, output_path) 序列，报表写入 output_path 所在目录
+            context: 所有PPT共用的调用上下文
+
+        Returns:
+            list[dict]: 与 jobs 顺序一致的处理记录
+        """
+        records = []
+        async for order, record in self._run(jobs, context):
+            records.append((order, record))
+        records.sort(key=lambda item: item[0])
+        return [record for _, record in records]
+
+    async def stream(self, jobs: Iterable[Tuple[str, str]],
+                     context: Optional[ProcessingContext] = None) -> AsyncIterator[Dict]:
+        """同 run，但按完成顺序逐个返回处理记录"""
+        async for _, record in self._run(jobs, context):
+            yield record
+
+    async def _run(self, jobs: Iterable[Tuple[str, str]],
+                   context: Optional[ProcessingContext]) -> AsyncIterator[Tuple[int, Dict]]:
+        context = context if context is not None else ProcessingContext()
+        loop = asyncio.get_running_loop()
+        in_process = self.parse_mode == "process" and self.parse_executor is None
+        if in_process:
+            # 总表可能仍在后台加载，等待放到线程中，不阻塞事件循环
+            worker_context = await loop.run_in_executor(None, self._picklable, context)
+        io_pool = ThreadPoolExecutor(self.read_concurrency, thread_name_prefix="pipeline-read")
+        parse_pool, owns_parse_pool = self._create_parse_executor()
+        render_pool = ThreadPoolExecutor(self.render_concurrency, thread_name_prefix="pipeline-render",
+                                         initializer=_com_thread_init)
+        write_pool = ThreadPoolExecutor(self.write_concurrency, thread_name_prefix="pipeline-write")
+
+        async def read(job: _Job) -> None:
+            job.staged = await loop.run_in_executor(io_pool, job.bind(self.stager.stage), job.pptx_path)
+
+        async def parse(job: _Job) -> None:
+            staged = job.staged
+            if in_process:
+                local_path = None if staged.in_memory else staged.local_path()
+                job.result, parse_trace = await loop.run_in_executor(
+                    parse_pool, _parse_in_worker, job.pptx_path, staged.data, local_path, worker_context,
+                    job.trace is not None)
+                if parse_trace is not None:
+                    job.trace.merge(parse_trace)
+            else:
+                job.result = await loop.run_in_executor(parse_pool, job.bind(self._analyze_staged), staged, context)
+
+        async def render(job: _Job) -> None:
+            if self.processor.renderer == "none":
+                return
+            job.image_cache = ImageRenderCache(job.pptx_path, staged=job.staged)
+            await loop.run_in_executor(render_pool, job.bind(job.image_cache.export_images), job.result)
+
+        async def write(job: _Job) -> None:
+            output_dir = os.path.dirname(job.output_path)
+            reports = await loop.run_in_executor(write_pool, job.bind(self._write), job.result, output_dir,
+                                                 context, job.image_cache)
+            job.record["reports"] = reports
+            failed = [name for name, path in reports.items() if not path]
+            if not reports:
+                job.record["error"] = "没有可导出的报表"
+            elif failed:
+                job.record["error"] = f"文档生成失败: {', '.join(failed)}"
+            else:
+                job.record["status"] = "ok"
+
+        handlers = (read, parse, render, write)
+        limits = (self.read_concurrency, self.parse_workers, self.render_concurrency, self.write_concurrency)
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in PIPELINE_STAGES]
+        done_queue: asyncio.Queue = asyncio.Queue()
+        outputs = queues[1:] + [done_queue]
+        # 指标中的队列与工作协程按阶段命名：queues[i] 是 pipeline.<阶段i> 等待处理的PPT
+        labels = [f"pipeline.{name}" for name in PIPELINE_STAGES] + ["pipeline.done"]
+        for label, limit in zip(labels, limits):
+            metrics.WORKERS.set(limit, pool=label)
+
+        async def feed() -> None:
+            for order, (pptx_path, output_path) in enumerate(jobs):
+                await queues[0].put(_Job(order, pptx_path, output_path, self.trace))
+                metrics.QUEUE_DEPTH.set(queues[0].qsize(), queue=labels[0])
+            for _ in range(limits[0]):
+                await queues[0].put(_DONE)
+
+        async def stage_worker(index: int) -> None:
+            name, handler = PIPELINE_STAGES[index], handlers[index]
+            in_queue, out_queue = queues[index], outputs[index]
+            while True:
+                job = await in_queue.get()
+                metrics.QUEUE_DEPTH.set(in_queue.qsize(), queue=labels[index])
+                if job is _DONE:
+                    return
+                if not job.failed:
+                    start = time.perf_counter()
+                    try:
+                        with job.trace.span(f"pipeline.{name}") if job.trace is not None else nullcontext(), \
+                                metrics.busy(labels[index]):
+                            await handler(job)
+                    except Exception as e:
+                        job.record["error"] = f"{name}: {e}\n{traceback.format_exc()}"
+                        self.logger.error(f"{job.pptx_path} 在 {name} 阶段失败: {e}")
+                    job.record["stages"][name] = round(time.perf_counter() - start, 3)
+                await out_queue.put(job)
+                metrics.QUEUE_DEPTH.set(out_queue.qsize(), queue=labels[index + 1])
+
+        async def run_stage(index: int) -> None:
+            await asyncio.gather(*(stage_worker(index) for _ in range(limits[index])))
+            # 本阶段全部完成后通知下一阶段的每个工作协程结束
+            for _ in range(limits[index + 1] if index + 1 < len(limits) else 1):
+                await outputs[index].put(_DONE)
+
+        tasks = [asyncio.ensure_future(feed())] + [asyncio.ensure_future(run_stage(i))
+                                                   for i in range(len(PIPELINE_STAGES))]
+        try:
+            while True:
+                job = await done_queue.get()
+                metrics.QUEUE_DEPTH.set(done_queue.qsize(), queue=labels[-1])
+                if job is _DONE:
+                    break
+                # 图片缓存与暂存内容在写入后（或前面阶段失败时）统一清理，归还暂存预算
+                if job.image_cache is not None:
+                    job.image_cache.close()
+                    job.image_cache = None
+                if job.staged is not None:
+                    job.staged.release()
+                    job.staged = None
+                job.result = None
+                job.record["elapsed"] = round(time.perf_counter() - job.started, 3)
+                if job.trace is not None:
+                    job.record["trace"] = job.trace.to_dict()
+                metrics.observe_deck(job.record)
+                yield job.order, job.record
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            io_pool.shutdown(wait=False)
+            render_pool.shutdown(wait=False)
+            write_pool.shutdown(wait=False)
+            if owns_parse_pool:
+                parse_pool.shutdown(wait=False)
+
+    def _create_parse_executor(self) -> Tuple[Executor, bool]:
+        if self.parse_executor is not None:
+            return self.parse_executor, False
+        if self.parse_mode == "process":
+            return ProcessPoolExecutor(self.parse_workers, initializer=_parse_worker_init,
+                                       initargs=(self.processor.config.config_dir, self.processor.renderer,
+                                                 LoggerFactory.get_global_log_level())), True
+        return ThreadPoolExecutor(self.parse_workers, thread_name_prefix="pipeline-parse"), True
+
+    @staticmethod
+    def _picklable(context: ProcessingContext) -> ProcessingContext:
+        """子进程中无法回调本进程的日志函数，也不能共享后台加载器：传递不含回调、总表已加载完成的上下文"""
+        changes = {}
+        if context.log_callback is not None:
+            changes["log_callback"] = None
+        if isinstance(context.data_list, ProjectIndexLoader):
+            changes["data_list"] = context.data_list.wait()
+        return replace(context, **changes) if changes else context
+
+    def _analyze_staged(self, staged: StagedDeck, context: ProcessingContext) -> ExtractionResult:
+        with staged.open() as stream:
+            return self.processor.analyze(staged.pptx_path, context, stream)
+
+    def _write(self, result: ExtractionResult, output_dir: str, context: ProcessingContext,
+               image_cache: Optional[ImageRenderCache]) -> Dict[str, Optional[str]]:
+        os.makedirs(output_dir, exist_ok=True)
+        return self.processor.render_reports(result, output_dir, context, image_cache)
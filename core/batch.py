@@ -0,0 +1,432 @@
+# 无界面批处理：发现PPT → 逐个（或多进程）生成发包规范 → 返回可序列化的汇总结果
+import os
+import json
+import time
+import threading
+import traceback
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
+
+from config.loader import ConfigLoader
+from utils import metrics, tracing
+from utils.logger import LoggerFactory
+from utils.profiling import DeckProfiler
+from core.packing_file_发包规范 import PackingFileProcessor
+from core.pipeline import ProcessingContext
+from core.project_index import ProjectIndex
+from core.discovery import DeckDiscovery
+from core.catalog import DirectoryCatalog
+from core.staging import DeckStager, StagedDeck
+from core.journal import BatchJournal
+from exporters.registry import ImageRenderCache
+from extractors import regex_guard
+
+OUTPUT_LAYOUTS = ("numbered", "fixed", "flat")
+
+# 多进程 worker 内的处理器（每个进程初始化一次）
+_worker_processor: Optional[PackingFileProcessor] = None
+_worker_options: Dict = {}
+
+
+def _worker_init(config_dir: str, renderer: str, log_level: Optional[str], options: Dict) -> None:
+    """进程池初始化：每个 worker 进程加载一次配置并创建处理器"""
+    global _worker_processor, _worker_options
+    config = ConfigLoader(config_dir=config_dir)
+    if log_level:
+        LoggerFactory.apply_level(log_level)
+    _worker_processor = PackingFileProcessor(config, renderer=renderer)
+    _worker_options = options
+    # 每个 worker 进程最多一个限时匹配子进程，整批不超过 worker 数
+    regex_guard.configure_workers(1)
+
+
+def _worker_process(pptx_path: str, output_path: str) -> Dict:
+    return _process_deck(_worker_processor, pptx_path, output_path, **_worker_options)
+
+
+def _process_deck(processor: PackingFileProcessor, pptx_path: str, output_path: str,
+                  data_list=None, manual_proj_name_value=None, manual_proj_action_value=None,
+                  staged: Optional[StagedDeck] = None, trace: bool = False,
+                  profiler: Optional[DeckProfiler] = None) -> Dict:
+    """处理单个PPT，返回该文件的汇总记录（异常不外抛）
+
+    PPT只分析一次，启用的各类报表由同一结果导出到 output_path 所在目录；
+    传入 staged 时解析与图片渲染都使用暂存内容，不再读取原文件；
+    trace 为 True 时记录各阶段耗时，追踪结果放在记录的 "trace" 中（由调用方取出汇总）；
+    传入 profiler 时剖析本PPT的处理，剖析文件路径、峰值内存与超出阈值的标记放在记录的 "profile" 中
+    """
+    start = time.perf_counter()
+    record = {"pptx": pptx_path, "output": output_path, "status": "failed", "error": None, "reports": {}}
+    deck_trace = tracing.Trace(pptx_path, staged=staged is not None) if trace else None
+    profiling = profiler.profile(pptx_path) if profiler is not None else nullcontext()
+    with deck_trace.activate() if deck_trace is not None else nullcontext(), profiling as profile_report:
+        try:
+            output_dir = os.path.dirname(output_path)
+            os.makedirs(output_dir, exist_ok=True)
+            context = ProcessingContext(data_list=data_list,
+                                        manual_proj_name_value=manual_proj_name_value,
+                                        manual_proj_action_value=manual_proj_action_value)
+            if staged is None:
+                result = processor.analyze(pptx_path, context)
+                record["reports"] = processor.render_reports(result, output_dir, context)
+            else:
+                with staged.open() as stream:
+                    result = processor.analyze(pptx_path, context, stream)
+                with ImageRenderCache(pptx_path, staged=staged) as cache:
+                    record["reports"] = processor.render_reports(result, output_dir, context, cache)
+            failed = [name for name, path in record["reports"].items() if not path]
+            if not record["reports"]:
+                record["error"] = "没有可导出的报表"
+            elif failed:
+                record["error"] = f"文档生成失败: {', '.join(failed)}"
+            else:
+                record["status"] = "ok"
+        except Exception as e:
+            record["error"] = f"{e}\n{traceback.format_exc()}"
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    if deck_trace is not None:
+        record["trace"] = deck_trace.to_dict()
+    if profile_report is not None:
+        record["profile"] = profile_report
+    return record
+
+
+class BatchRunner:
+    """
+    无界面批处理运行器，直接驱动 PackingFileProcessor
+
+    输出布局:
+        numbered: 与GUI一致，每次运行在PPT目录下新建 result / result_1 / ...
+        fixed: 固定输出到PPT目录下的 result 目录（覆盖旧文件）
+        flat: 全部输出到 output_dir 目录
+    """
+
+    def __init__(self, config: ConfigLoader, workers: int = 1, layout: str = "numbered",
+                 output_dir: Optional[str] = None, incremental: bool = False,
+                 use_cache: bool = True, cache_dir: Optional[str] = None, renderer: str = "com",
+                 use_excel: bool = True, manual_proj_name_value: Optional[str] = None,
+                 manual_proj_action_value: Optional[str] = None, log_level: Optional[str] = None,
+                 pipeline: bool = False, staging: bool = True, trace: bool = False,
+                 profiler: Optional[DeckProfiler] = None, journal: bool = False,
+                 journal_path: Optional[str] = None, resume: bool = False):
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"未知的输出布局: {layout}，可选: {', '.join(OUTPUT_LAYOUTS)}")
+        if layout == "flat" and not output_dir:
+            raise ValueError("flat 输出布局需要指定 output_dir")
+        if incremental and layout == "numbered":
+            raise ValueError("增量模式需要固定的输出位置，请使用 fixed 或 flat 布局")
+        if profiler is not None and pipeline:
+            raise ValueError("性能剖析需要逐个处理PPT，不能与流水线模式同时使用")
+        self.config = config
+        self.workers = max(1, int(workers))
+        self.layout = layout
+        self.output_dir = output_dir
+        self.incremental = incremental
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or config.get_cache_dir()
+        self.renderer = renderer
+        self.use_excel = use_excel
+        self.manual_proj_name_value = manual_proj_name_value
+        self.manual_proj_action_value = manual_proj_action_value
+        self.log_level = log_level
+        self.pipeline = pipeline
+        # 分阶段耗时追踪：开启时每次 run() 的结果保存在 trace_report（可导出 JSON / Chrome trace）
+        self.trace = trace
+        self.trace_report: Optional[tracing.TraceReport] = None
+        # 逐PPT性能剖析：多进程模式下各 worker 进程分别剖析自己处理的PPT
+        self.profiler = profiler
+        # 检查点日志：逐PPT记录状态变化，resume 时跳过上次已完成的PPT（日志缺省放在缓存目录的 journals 下）
+        self.journal = journal or resume or bool(journal_path)
+        self.journal_path = journal_path
+        self.resume = resume
+        self._journal_summary: Optional[Dict] = None
+        # 预读暂存（网络共享上的PPT只顺序读取一次）；多进程模式下各进程直接读取文件
+        self.stager = DeckStager.from_config(config) if staging else None
+        self.logger = LoggerFactory.create_logger("BatchRunner")
+        self.processor = PackingFileProcessor(config, renderer=renderer)
+        self._project_index: Optional[ProjectIndex] = None
+        self._project_index_signature = None
+        self._project_index_lock = threading.Lock()
+        self.catalog = None
+        if use_cache and config.is_dir_catalog_enabled():
+            self.catalog = DirectoryCatalog.from_config(config, self.cache_dir)
+
+    def get_default_roots(self) -> List[str]:
+        """获取配置中的 default_dirs"""
+        roots = self.config.config.get("default_dirs") or []
+        return [str(r) for r in roots] if isinstance(roots, list) else [str(roots)]
+
+    def discover(self, roots: List[str]) -> List[str]:
+        """在所有根目录下并发查找最大版本的v3 PPT（去重，按路径排序）"""
+        valid_roots = []
+        for root in roots:
+            if os.path.isdir(root):
+                valid_roots.append(root)
+            else:
+                self.logger.warning(f"目录不存在，跳过: {root}")
+        with tracing.span("discover", roots=len(valid_roots)) as span:
+            pptx_paths = DeckDiscovery(catalog=self.catalog).discover(valid_roots)
+            span.set(decks=len(pptx_paths))
+        return pptx_paths
+
+    def load_data_list(self) -> List[Dict]:
+        """读取方案总表；开启缓存时，总表未变化（路径/大小/修改时间一致）则直接复用上次结果"""
+        if not self.use_excel:
+            return []
+        excel_path = str(os.path.abspath(self.config.get_project_excel_path()))
+        cache_file = os.path.join(self.cache_dir, "excel_rows.json")
+        try:
+            stat = os.stat(excel_path)
+        except OSError:
+            self.logger.warning(f"方案总表不存在: {excel_path}")
+            return []
+        key = {
+            "path": excel_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "excel": self.config.get_all_projects_info(),
+        }
+        if self.use_cache and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("key") == key:
+                    metrics.cache_hit("excel_rows", True)
+                    self.logger.info(f"使用缓存的方案总表数据，共{len(cached['rows'])}行")
+                    return cached["rows"]
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取方案总表缓存失败，重新读取: {e}")
+
+        metrics.cache_hit("excel_rows", False)
+        from extractors.extrator_发包规范 import ExtractorExcel
+        extractor = ExtractorExcel(self.config)
+        try:
+            with tracing.span("load_excel", path=excel_path):
+                data_list = extractor.extract()
+        finally:
+            extractor.close()
+        self.logger.info(f"成功读取Excel数据，共{len(data_list)}行")
+        if self.use_cache:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_file, "w", encoding="utf-8") as f:
+                    json.dump({"key": key, "rows": data_list}, f, ensure_ascii=False, default=str)
+            except OSError as e:
+                self.logger.warning(f"写入方案总表缓存失败: {e}")
+        return data_list
+
+    def get_project_index(self) -> ProjectIndex:
+        """方案总表索引；常驻进程（监视模式）中复用，仅在总表文件变化后重新读取（线程安全）"""
+        signature = None
+        if self.use_excel:
+            try:
+                stat = os.stat(self.config.get_project_excel_path())
+                signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                pass
+        with self._project_index_lock:
+            reload = self._project_index is None or signature != self._project_index_signature
+            metrics.cache_hit("excel_index", not reload)
+            if reload:
+                self._project_index = ProjectIndex(self.load_data_list())
+                self._project_index_signature = signature
+            return self._project_index
+
+    def process_deck(self, pptx_path: str, output_path: Optional[str] = None) -> Dict:
+        """处理单个PPT（使用已加载的配置与总表索引），返回汇总记录；output_path 缺省时按输出布局计算"""
+        output_path = output_path or self.get_output_path(pptx_path)
+        options = {
+            "data_list": self.get_project_index(),
+            "manual_proj_name_value": self.manual_proj_name_value,
+            "manual_proj_action_value": self.manual_proj_action_value,
+        }
+        staged = None
+        if self.stager is not None:
+            try:
+                staged = self.stager.stage(pptx_path)
+            except OSError:
+                pass  # 暂存失败时直接处理原文件，错误体现在处理记录中
+        with staged if staged is not None else nullcontext():
+            record = _process_deck(self.processor, pptx_path, output_path, staged=staged, trace=self.trace,
+                                   **options)
+        metrics.observe_deck(record)
+        return record
+
+    def get_output_path(self, pptx_path: str) -> str:
+        """按输出布局计算PPT对应的文档路径"""
+        filename = self.processor.get_output_filename(pptx_path)
+        if self.layout == "flat":
+            return os.path.join(self.output_dir, filename)
+        dir_path = os.path.dirname(pptx_path)
+        if self.layout == "fixed":
+            return os.path.join(dir_path, "result", filename)
+        return os.path.join(self.processor._create_result_dir(dir_path), filename)
+
+    def _is_up_to_date(self, pptx_path: str, output_path: str) -> bool:
+        try:
+            return os.path.getmtime(output_path) >= os.path.getmtime(pptx_path)
+        except OSError:
+            return False
+
+    def run(self, roots: Optional[List[str]] = None) -> Dict:
+        """
+        执行批处理
+
+        Args:
+            roots: 根目录列表，为空时使用配置中的 default_dirs
+
+        Returns:
+            dict: 可直接 JSON 序列化的汇总结果
+        """
+        start = time.perf_counter()
+        roots = list(roots) if roots else self.get_default_roots()
+        # 发现文件、读取总表等公共阶段记录在批处理级的追踪中，各PPT的追踪在处理时分别记录
+        run_trace = tracing.Trace("batch", roots=roots) if self.trace else None
+        with run_trace.activate() if run_trace is not None else nullcontext():
+            records, pptx_paths = self._run(roots)
+        if run_trace is not None:
+            self.trace_report = tracing.TraceReport(run_trace.to_dict(),
+                                                    [r.pop("trace") for r in records if "trace" in r])
+
+        counts = {"total": len(records)}
+        for status in ("ok", "failed", "skipped"):
+            counts[status] = sum(1 for r in records if r["status"] == status)
+        summary = {
+            "roots": roots,
+            "layout": self.layout,
+            "renderer": self.renderer,
+            "workers": self.workers,
+            "pipeline": self.pipeline,
+            "decks": records,
+            "counts": counts,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
+        if self._journal_summary is not None:
+            summary["journal"] = self._journal_summary
+        if self.profiler is not None:
+            summary["profile"] = {
+                "dir": self.profiler.directory,
+                "flagged": [r["pptx"] for r in records if r.get("profile", {}).get("flags")],
+            }
+        return summary
+
+    def _open_journal(self, roots: List[str]) -> Optional[BatchJournal]:
+        if not self.journal:
+            return None
+        path = self.journal_path or BatchJournal.default_path(self.cache_dir, roots, self.layout, self.output_dir)
+        return BatchJournal(path, resume=self.resume)
+
+    def _run(self, roots: List[str]) -> Tuple[List[Dict], List[str]]:
+        """发现并处理全部PPT，返回（按发现顺序排列的处理记录, 发现的PPT列表）"""
+        self._journal_summary = None
+        journal = self._open_journal(roots)
+        try:
+            return self._run_batch(roots, journal)
+        finally:
+            if journal is not None:
+                journal.close()
+            regex_guard.shutdown_workers()
+
+    def _run_batch(self, roots: List[str], journal: Optional[BatchJournal]) -> Tuple[List[Dict], List[str]]:
+        pptx_paths = self.discover(roots)
+        self.logger.info(f"共发现 {len(pptx_paths)} 个v3 PPT文件")
+
+        records = []
+        jobs = []
+        resumed = 0
+        interrupted = journal.pending() if journal is not None else []
+        for pptx_path in pptx_paths:
+            if journal is not None:
+                record = journal.completed(pptx_path)
+                if record is not None:
+                    # 上次运行已完成且文档仍在，沿用当时的处理记录
+                    records.append(dict(record, resumed=True))
+                    resumed += 1
+                    continue
+                output_path = journal.planned_output(pptx_path) or self.get_output_path(pptx_path)
+            else:
+                output_path = self.get_output_path(pptx_path)
+            if self.incremental and self._is_up_to_date(pptx_path, output_path):
+                records.append({"pptx": pptx_path, "output": output_path, "status": "skipped",
+                                "error": None, "elapsed": 0.0})
+                continue
+            jobs.append((pptx_path, output_path))
+        if journal is not None:
+            if self.resume:
+                self.logger.info(f"续跑: 跳过上次已完成的 {resumed} 个PPT，处理 {len(jobs)} 个"
+                                 + (f"（上次中断时正在处理 {len(interrupted)} 个）" if interrupted else ""))
+            journal.plan(jobs)
+            self._journal_summary = {"path": journal.path, "resumed": resumed, "interrupted": interrupted}
+
+        def process(pptx_path: str, output_path: str, **kwargs) -> Dict:
+            if journal is not None:
+                journal.start(pptx_path)
+            record = _process_deck(self.processor, pptx_path, output_path, **kwargs)
+            if journal is not None:
+                journal.finish(record)
+            return record
+
+        options = {
+            "data_list": self.get_project_index() if jobs else ProjectIndex(),
+            "manual_proj_name_value": self.manual_proj_name_value,
+            "manual_proj_action_value": self.manual_proj_action_value,
+        }
+        deck_options = dict(options, trace=self.trace, profiler=self.profiler)
+        if self.pipeline and jobs:
+            # 流水线：预读、解析、渲染、写入重叠进行；workers > 1 时在进程池中解析
+            import asyncio
+
+            async def stream() -> List[Dict]:
+                # 按完成顺序取回记录，每完成一个PPT就写入检查点日志
+                if journal is not None:
+                    journal.start(*(pptx_path for pptx_path, _ in jobs))
+                completed = []
+                async for record in self.processor.stream_decks(
+                        jobs, ProcessingContext(**options), parse_workers=self.workers,
+                        parse_mode="process" if self.workers > 1 else "thread", stager=self.stager,
+                        trace=self.trace):
+                    if journal is not None:
+                        journal.finish(record)
+                    completed.append(record)
+                return completed
+
+            records.extend(asyncio.run(stream()))
+        elif self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                     initializer=_worker_init,
+                                     initargs=(self.config.config_dir, self.renderer,
+                                               self.log_level, deck_options)) as pool:
+                futures = []
+                for job in jobs:
+                    if journal is not None:
+                        journal.start(job[0])
+                    futures.append(pool.submit(_worker_process, *job))
+                for future in as_completed(futures):
+                    record = future.result()
+                    if journal is not None:
+                        journal.finish(record)
+                    records.append(record)
+        elif self.stager is not None and self.profiler is None:
+            # 后台线程提前暂存后续的PPT，处理当前PPT时下一个已在读取
+            # （剖析时不预读，避免后续PPT的暂存内存计入当前PPT的峰值）
+            outputs = dict(jobs)
+            for pptx_path, staged, _ in self.stager.prefetch(path for path, _ in jobs):
+                if staged is None:
+                    records.append(process(pptx_path, outputs[pptx_path], **deck_options))
+                    continue
+                with staged:
+                    records.append(process(pptx_path, outputs[pptx_path], staged=staged, **deck_options))
+        else:
+            for pptx_path, output_path in jobs:
+                records.append(process(pptx_path, output_path, **deck_options))
+
+        for record in records:
+            # 流水线模式下处理过的PPT已由 AsyncPipelineRunner 在完成时计数，续跑沿用的记录不重复计数
+            if record.get("resumed"):
+                continue
+            if not self.pipeline or record["status"] == "skipped":
+                metrics.observe_deck(record)
+        order = {path: idx for idx, path in enumerate(pptx_paths)}
+        records.sort(key=lambda r: order[r["pptx"]])
+        return records, pptx_paths
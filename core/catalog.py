@@ -0,0 +1,142 @@
+# 目录目录（catalog）缓存：目录 → (目录修改时间, 子目录, 候选PPT, 版本)，重复扫描时仅重新列出修改过的目录
+import os
+import json
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.loader import ConfigLoader
+from utils import metrics
+from utils.logger import LoggerFactory
+from core.discovery import scan_directory
+
+CATALOG_FORMAT = 1
+CATALOG_FILENAME = "dir_catalog.json"
+# 目录修改时间精度有限（SMB/FAT 可达 2 秒）：列出时间距修改时间过近的条目下次仍重新列出
+MTIME_SAFETY_NS = 2 * 1_000_000_000
+# 仅根目录的最近扫描时间变化时，最多每隔该秒数写一次缓存文件（轮询模式每个周期都会扫描）
+ROOT_TOUCH_INTERVAL = 3600
+
+
+class DirectoryCatalog:
+    """
+    持久化的目录扫描缓存
+
+    新增/删除/重命名文件或子目录都会更新所在目录的修改时间，而候选PPT只取决于文件名，
+    因此目录修改时间未变时可直接复用上次列出的结果，扫描退化为仅 stat 的遍历。
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.logger = LoggerFactory.create_logger("DirectoryCatalog")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._roots: Dict[str, float] = {}
+        # 缓存文件中的根目录扫描时间；自上次读取/写入后缓存内容是否有变化，没有变化时 save() 不写文件
+        self._saved_roots: Dict[str, float] = {}
+        self._dirty = False
+        self.stats = {"listed": 0, "reused": 0}
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: ConfigLoader, cache_dir: Optional[str] = None) -> "DirectoryCatalog":
+        return cls(os.path.join(cache_dir or config.get_cache_dir(), CATALOG_FILENAME))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == CATALOG_FORMAT:
+                self._entries = data.get("entries", {})
+                self._roots = data.get("roots", {})
+                self._saved_roots = dict(self._roots)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"读取目录缓存失败，将重新扫描: {e}")
+
+    def save(self) -> None:
+        """缓存有变化时原子写入缓存文件（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"format": CATALOG_FORMAT, "roots": dict(self._roots), "entries": dict(self._entries)}
+            self._saved_roots = dict(self._roots)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            with self._lock:
+                self._dirty = True
+            self.logger.warning(f"写入目录缓存失败: {e}")
+
+    def scan(self, path: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+        """
+        扫描单个目录：修改时间未变时复用缓存，否则重新列出并更新缓存
+
+        Returns:
+            (子目录路径, 最高版本PPT文件名, 版本号)，与 discovery.scan_directory 一致
+        """
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry["mtime_ns"] == mtime_ns and entry["listed_ns"] - mtime_ns > MTIME_SAFETY_NS:
+            with self._lock:
+                self.stats["reused"] += 1
+            metrics.cache_hit("dir_catalog", True)
+            return list(entry["subdirs"]), entry["deck"], entry["deck_version"]
+
+        listed_ns = time.time_ns()
+        subdirs, deck, deck_version = scan_directory(path)
+        with self._lock:
+            self._entries[path] = {
+                "mtime_ns": mtime_ns,
+                "listed_ns": listed_ns,
+                "subdirs": subdirs,
+                "deck": deck,
+                "deck_version": deck_version,
+            }
+            self._dirty = True
+            self.stats["listed"] += 1
+        metrics.cache_hit("dir_catalog", False)
+        return subdirs, deck, deck_version
+
+    def retain(self, roots: Iterable[str], visited: Iterable[str]) -> None:
+        """
+        扫描结束后删除各根目录下本次未访问到的条目（已删除或已被剪枝的目录），并记录根目录
+
+        根目录的最近扫描时间只用于排序：新的根目录立即记为有变化，已写入缓存文件的根目录距写入时间超过
+        ROOT_TOUCH_INTERVAL 秒才记为有变化（内存中的时间每次都更新）
+        """
+        roots = [os.path.normpath(r) for r in roots]
+        visited = set(visited)
+        now = time.time()
+        with self._lock:
+            for path in list(self._entries):
+                if path not in visited and any(_is_under(path, root) for root in roots):
+                    del self._entries[path]
+                    self._dirty = True
+            for root in roots:
+                if now - self._saved_roots.get(root, float("-inf")) >= ROOT_TOUCH_INTERVAL:
+                    self._dirty = True
+                self._roots[root] = now
+
+    def known_decks(self, root: str) -> List[str]:
+        """返回缓存中根目录下已知的候选PPT路径（不访问磁盘，供界面快速预览）"""
+        root = os.path.normpath(root)
+        with self._lock:
+            return sorted(os.path.join(path, entry["deck"]) for path, entry in self._entries.items()
+                          if entry["deck"] and _is_under(path, root))
+
+    def recent_roots(self) -> List[str]:
+        """按最近扫描时间倒序返回扫描过的根目录"""
+        with self._lock:
+            return [root for root, _ in sorted(self._roots.items(), key=lambda kv: kv[1], reverse=True)]
+
+
+def _is_under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
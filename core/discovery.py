@@ -0,0 +1,125 @@
+# v3 PPT 发现引擎：单次 os.scandir 遍历，进入子目录前剪枝，同一遍内选出每个目录的最高版本
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from utils.logger import LoggerFactory
+
+if TYPE_CHECKING:
+    from core.catalog import DirectoryCatalog
+
+# 不进入的目录（result 及 result_1、result_2 … 均为本工具的输出目录）
+EXCLUDE_DIR_NAMES = {"temp", "config", "__pycache__"}
+RESULT_DIR_PATTERN = re.compile(r"^result(_\d+)?$")
+VERSION_PATTERN = re.compile(r'[vV](\d+\.?\d?)')
+
+
+def is_excluded_dir(name: str) -> bool:
+    """判断目录名是否需要剪枝（隐藏目录、输出目录、临时/配置目录）"""
+    lower = name.lower()
+    return lower.startswith(".") or lower in EXCLUDE_DIR_NAMES or bool(RESULT_DIR_PATTERN.match(lower))
+
+
+def is_candidate_deck(name: str) -> bool:
+    """判断文件名是否为候选 v3 PPT（排除 Office 锁文件 ~$xxx.pptx 与隐藏文件）"""
+    lower = name.lower()
+    return lower.endswith(".pptx") and "v3" in lower and not name.startswith(("~$", "."))
+
+
+def get_ppt_version(filename: str) -> Optional[float]:
+    """从PPT文件名中提取版本号（如 xxx_v3.2.pptx → 3.2）"""
+    match = VERSION_PATTERN.search(filename)
+    return float(match.group(1)) if match else None
+
+
+def pick_best_deck(names: Iterable[str]) -> Tuple[Optional[str], Optional[float]]:
+    """从文件名中选出最高版本的候选PPT；版本相同时取文件名排序靠前者，保证结果稳定"""
+    best_name, best_version = None, None
+    for name in names:
+        if not is_candidate_deck(name):
+            continue
+        version = get_ppt_version(name)
+        if version is None:
+            continue
+        if best_version is None or version > best_version or (version == best_version and name < best_name):
+            best_name, best_version = name, version
+    return best_name, best_version
+
+
+def scan_directory(path: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+    """
+    单次列出目录：返回 (未被剪枝的子目录路径, 最高版本PPT文件名, 版本号)
+
+    不跟随符号链接/目录联接，避免循环遍历。
+    """
+    subdirs = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_excluded_dir(entry.name):
+                        subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    best_name, best_version = pick_best_deck(files)
+    return subdirs, best_name, best_version
+
+
+class DeckDiscovery:
+    """
+    v3 PPT 发现引擎
+
+    以目录为单位并发扫描（网络共享上列目录的延迟远大于CPU开销），多个根目录共用同一线程池；
+    结果按路径排序去重，与扫描完成顺序无关。
+    传入 catalog 时，修改时间未变的目录直接复用缓存，扫描结束后刷新缓存，有变化时写入缓存文件。
+    """
+
+    def __init__(self, max_workers: int = 8, catalog: Optional["DirectoryCatalog"] = None):
+        self.max_workers = max(1, max_workers)
+        self.catalog = catalog
+        self.logger = LoggerFactory.create_logger("DeckDiscovery")
+
+    def discover(self, roots: Iterable[str]) -> List[str]:
+        """
+        查找所有根目录下每个目录中最高版本的 v3 PPT
+
+        Args:
+            roots: 根目录列表（根目录本身不做排除判断）
+
+        Returns:
+            list[str]: PPT 文件完整路径，按路径排序
+        """
+        roots = list(dict.fromkeys(os.path.normpath(r) for r in roots))
+        scan = scan_directory
+        if self.catalog:
+            scan = self.catalog.scan
+            self.catalog.stats = {"listed": 0, "reused": 0}
+        results = set()
+        visited = set()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="discovery") as pool:
+            for root in roots:
+                pending[pool.submit(scan, root)] = root
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        subdirs, best_name, _ = future.result()
+                    except OSError as e:
+                        self.logger.warning(f"无法读取目录，跳过: {path} ({e})")
+                        continue
+                    visited.add(path)
+                    if best_name:
+                        results.add(os.path.join(path, best_name))
+                    for subdir in subdirs:
+                        pending[pool.submit(scan, subdir)] = subdir
+        if self.catalog:
+            self.catalog.retain(roots, visited)
+            self.catalog.save()
+            self.logger.debug(f"目录缓存：重新列出 {self.catalog.stats['listed']} 个，复用 {self.catalog.stats['reused']} 个")
+        return sorted(results)
@@ -0,0 +1,402 @@
+# 多机分布式批处理：提交方把发现结果写成任务清单，各机器上的 worker 通过共享状态目录中的租约文件认领PPT
+# 状态目录（放在所有 worker 都能挂载的共享目录上，各机器上的PPT与输出路径需一致）:
+#   jobs.json          任务清单 {"created", "jobs": [{"id", "pptx", "output"}]}
+#   leases/<id>.lease  租约：独占创建（O_CREAT | O_EXCL）即认领，持有期间定期更新修改时间（心跳）
+#   done/<id>.json     完成标记：处理记录（成功或失败），存在即不再认领
+# 租约的修改时间在 lease_seconds 内没有变化视为持有者已崩溃（按观察方自己的时钟计时，不受各机器时钟偏差影响），
+# 其他 worker 先把它改名移走再重新认领；同一PPT被认领超过 max_attempts 次仍未完成时记为失败，
+# 避免导致进程崩溃的PPT反复拖垮 worker。任务 id 含PPT的大小与修改时间，PPT修改后重新提交即成为新任务。
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils import metrics
+from utils.logger import LoggerFactory
+
+JOBS_FILE = "jobs.json"
+LEASES_DIR = "leases"
+DONE_DIR = "done"
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    pptx: str
+    output: str
+
+    @classmethod
+    def for_deck(cls, pptx_path: str, output_path: str) -> "Job":
+        """按PPT路径、输出路径与PPT的大小/修改时间生成任务"""
+        try:
+            stat = os.stat(pptx_path)
+            version = f"{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            version = ""
+        key = "\0".join((os.path.abspath(pptx_path), os.path.abspath(output_path), version))
+        return cls(hashlib.sha1(key.encode("utf-8")).hexdigest()[:16], pptx_path, output_path)
+
+
+def _write_json(path: str, data) -> None:
+    """先写临时文件再替换，其他机器不会读到半个文件"""
+    temp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(temp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    """读取 JSON 文件；文件不存在或正在写入（内容不完整）时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Lease:
+    """
+    一个任务的租约；start() 后在后台线程定期续约，release() 停止续约并删除租约文件
+
+    续约时发现租约已不属于自己（被判定过期并由其他 worker 回收）时 lost 置为 True，
+    此时处理结果仍会写入，但不再删除他人的租约。
+    """
+
+    def __init__(self, board: "JobBoard", job: Job, token: str, attempt: int):
+        self.board = board
+        self.job = job
+        self.token = token
+        self.attempt = attempt
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        return self.board.lease_path(self.job.id)
+
+    def owned(self) -> bool:
+        info = _read_json(self.path)
+        return info is not None and info.get("token") == self.token
+
+    def renew(self) -> bool:
+        """续约一次（更新租约文件的修改时间），返回租约是否仍属于自己"""
+        if not self.owned():
+            if not self.lost:
+                self.lost = True
+                metrics.LEASES.inc(event="lost")
+                self.board.logger.warning(f"租约已被回收，结果仍会写入: {self.job.pptx}")
+            return False
+        try:
+            os.utime(self.path, None)
+        except OSError as e:
+            self.board.logger.warning(f"续约失败: {self.job.pptx}: {e}")
+        return True
+
+    def start(self, interval: float) -> "Lease":
+        def beat():
+            while not self._stop.wait(interval):
+                self.renew()
+
+        self._thread = threading.Thread(target=beat, name=f"lease-{self.job.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if not self.lost and self.owned():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class JobBoard:
+    """
+    共享状态目录上的任务清单、租约与完成标记
+
+    Args:
+        state_dir: 状态目录（各 worker 挂载到的路径可以不同，但任务中的PPT与输出路径需在各机器上有效）
+        lease_seconds: 租约的修改时间超过该秒数未变化即视为过期
+        max_attempts: 同一任务最多被认领的次数（含过期后的回收）
+    """
+
+    def __init__(self, state_dir: str, lease_seconds: float = 120.0, max_attempts: int = 3):
+        self.state_dir = state_dir
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = max(1, int(max_attempts))
+        self.logger = LoggerFactory.create_logger("JobBoard")
+        # 租约 → (上次看到的修改时间, 本机首次看到该修改时间的时刻)
+        self._seen: Dict[str, Tuple[int, float]] = {}
+        self._seen_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, state_dir: str) -> "JobBoard":
+        """按 app_settings.yaml 的 distributed 配置创建"""
+        cfg = config.get_distributed_config()
+        return cls(state_dir, lease_seconds=cfg.get("lease_seconds", 120), max_attempts=cfg.get("max_attempts", 3))
+
+    def lease_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, LEASES_DIR, f"{job_id}.lease")
+
+    def done_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, DONE_DIR, f"{job_id}.json")
+
+    # ---------------- 提交 ----------------
+
+    def publish(self, jobs: List[Job], reset: bool = False) -> None:
+        """
+        写入任务清单（替换旧清单）；已完成的任务保留完成标记，重新提交时不会再处理
+
+        Args:
+            reset: 同时清除全部租约与完成标记，所有任务重新处理（需先停止 worker）
+        """
+        for name in (LEASES_DIR, DONE_DIR):
+            directory = os.path.join(self.state_dir, name)
+            os.makedirs(directory, exist_ok=True)
+            if reset:
+                for entry in os.scandir(directory):
+                    try:
+                        os.remove(entry.path)
+                    except OSError as e:
+                        self.logger.warning(f"清除状态文件失败: {entry.path}: {e}")
+        _write_json(os.path.join(self.state_dir, JOBS_FILE),
+                    {"created": time.time(), "jobs": [asdict(job) for job in jobs]})
+        self.logger.info(f"已提交 {len(jobs)} 个任务: {self.state_dir}")
+
+    def load_jobs(self) -> List[Job]:
+        """
+        Raises:
+            FileNotFoundError: 状态目录中还没有任务清单
+        """
+        path = os.path.join(self.state_dir, JOBS_FILE)
+        data = _read_json(path)
+        if data is None:
+            raise FileNotFoundError(f"任务清单不存在或无法读取: {path}")
+        return [Job(**item) for item in data.get("jobs", [])]
+
+    # ---------------- 认领与完成 ----------------
+
+    def is_done(self, job: Job) -> bool:
+        return os.path.exists(self.done_path(job.id))
+
+    def _expired(self, job_id: str, mtime_ns: int) -> bool:
+        """租约的修改时间在本机观察到的 lease_seconds 内没有变化"""
+        now = time.monotonic()
+        with self._seen_lock:
+            seen = self._seen.get(job_id)
+            if seen is None or seen[0] != mtime_ns:
+                self._seen[job_id] = (mtime_ns, now)
+                return False
+            return now - seen[1] >= self.lease_seconds
+
+    def _create_lease(self, job: Job, worker_id: str, attempt: int) -> Optional[Lease]:
+        token = uuid.uuid4().hex
+        info = {"token": token, "worker": worker_id, "host": socket.gethostname(), "pid": os.getpid(),
+                "attempt": attempt, "claimed": time.time()}
+        try:
+            fd = os.open(self.lease_path(job.id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        return Lease(self, job, token, attempt)
+
+    def _reclaim(self, job: Job, worker_id: str) -> Optional[int]:
+        """
+        回收过期的租约，返回上一次认领的次数；租约仍有效或已被其他 worker 回收时返回 None
+
+        先把租约改名为本 worker 专属的文件（同一时刻只有一个 worker 能改名成功），再按 inode 与修改时间
+        确认移走的是刚才判定过期的那份；若期间已被其他 worker 回收并重新认领，把新租约放回原处。
+        持有者在写入租约内容前崩溃（租约为空）时同样按修改时间过期回收。
+        """
+        path = self.lease_path(job.id)
+        try:
+            before = os.stat(path)
+        except OSError:
+            return None
+        if not self._expired(job.id, before.st_mtime_ns):
+            return None
+        info = _read_json(path) or {}
+        stale_path = f"{path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return None
+        try:
+            moved = os.stat(stale_path)
+            if (moved.st_ino, moved.st_mtime_ns) != (before.st_ino, before.st_mtime_ns):
+                try:
+                    os.link(stale_path, path)
+                except FileExistsError:
+                    pass
+                return None
+        finally:
+            os.remove(stale_path)
+        with self._seen_lock:
+            self._seen.pop(job.id, None)
+        metrics.LEASES.inc(event="reclaimed")
+        self.logger.warning(f"回收过期租约（{info.get('host')} 上的 {info.get('worker')}，"
+                            f"第 {info.get('attempt', 1)} 次认领）: {job.pptx}")
+        return int(info.get("attempt", 1))
+
+    def claim(self, job: Job, worker_id: str) -> Optional[Lease]:
+        """
+        认领任务（未启动续约）；任务已完成、被其他 worker 持有或超过认领次数时返回 None
+        """
+        if self.is_done(job):
+            return None
+        attempt = 1
+        lease = self._create_lease(job, worker_id, attempt)
+        if lease is None:
+            previous = self._reclaim(job, worker_id)
+            if previous is None:
+                return None
+            attempt = previous + 1
+            if attempt > self.max_attempts:
+                self.complete(job, {"pptx": job.pptx, "output": job.output, "status": "failed",
+                                    "error": f"已认领 {previous} 次仍未完成（处理该PPT时 worker 可能崩溃）",
+                                    "reports": {}, "elapsed": None}, worker_id, previous)
+                self.logger.error(f"超过最大认领次数，记为失败: {job.pptx}")
+                return None
+            lease = self._create_lease(job, worker_id, attempt)
+            if lease is None:
+                return None
+        if self.is_done(job):
+            # 认领前的瞬间被（租约刚过期的）原持有者完成
+            lease.release()
+            return None
+        metrics.LEASES.inc(event="claimed")
+        return lease
+
+    def complete(self, job: Job, record: Dict, worker_id: str, attempt: int = 1) -> None:
+        """写入完成标记（处理记录）"""
+        _write_json(self.done_path(job.id), dict(record, job=job.id, worker=worker_id,
+                                                 host=socket.gethostname(), attempt=attempt))
+
+    # ---------------- 汇总 ----------------
+
+    def status(self) -> Dict:
+        """任务清单的进度：完成（成功/失败）、处理中与等待中的数量，以及已完成任务的处理记录"""
+        jobs = self.load_jobs()
+        records, leased = [], 0
+        for job in jobs:
+            record = _read_json(self.done_path(job.id))
+            if record is not None:
+                records.append(record)
+            elif os.path.exists(self.lease_path(job.id)):
+                leased += 1
+        counts = {"total": len(jobs), "leased": leased, "pending": len(jobs) - len(records) - leased}
+        for status in ("ok", "failed"):
+            counts[status] = sum(1 for r in records if r.get("status") == status)
+        return {"state_dir": self.state_dir, "counts": counts, "decks": records}
+
+
+class JobWorker:
+    """
+    从任务清单中循环认领并处理PPT，直到所有任务都有完成标记
+
+    其他 worker 仍持有租约时继续等待：租约过期（持有者崩溃）后由本 worker 回收并处理。
+
+    Args:
+        board: 共享状态
+        handle: 处理函数 (job) -> 处理记录
+        worker_id: worker 标识（缺省为 主机名:进程号）
+        threads: 同时处理的线程数（共享 handle）
+        heartbeat_seconds: 续约间隔，需明显小于 lease_seconds
+        poll_seconds: 没有可认领的任务时的等待间隔
+    """
+
+    def __init__(self, board: JobBoard, handle: Callable[[Job], Dict], worker_id: Optional[str] = None,
+                 threads: int = 1, heartbeat_seconds: float = 30.0, poll_seconds: float = 5.0):
+        self.board = board
+        self.handle = handle
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = max(1, int(threads))
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.records: List[Dict] = []
+        self._records_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.logger = LoggerFactory.create_logger("JobWorker")
+
+    @classmethod
+    def from_config(cls, config, board: JobBoard, handle: Callable[[Job], Dict], **kwargs) -> "JobWorker":
+        cfg = config.get_distributed_config()
+        kwargs.setdefault("heartbeat_seconds", cfg.get("heartbeat_seconds", 30))
+        kwargs.setdefault("poll_seconds", cfg.get("poll_seconds", 5))
+        return cls(board, handle, **kwargs)
+
+    def stop(self) -> None:
+        """处理完当前PPT后退出"""
+        self._stop.set()
+
+    def run(self) -> List[Dict]:
+        """
+        Returns:
+            本 worker 处理的PPT的记录
+
+        Raises:
+            FileNotFoundError: 状态目录中还没有任务清单
+        """
+        jobs = self.board.load_jobs()
+        if not jobs:
+            return []
+        # 各 worker 从清单中不同的位置开始认领，减少同时争抢同一个PPT
+        offset = int(hashlib.sha1(self.worker_id.encode("utf-8")).hexdigest(), 16) % len(jobs)
+        jobs = jobs[offset:] + jobs[:offset]
+        metrics.WORKERS.set(self.threads, pool="jobboard")
+        if self.threads == 1:
+            self._loop(jobs)
+        else:
+            threads = [threading.Thread(target=self._loop, args=(jobs,), name=f"jobboard-{i}")
+                       for i in range(self.threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.records
+
+    def _loop(self, jobs: List[Job]) -> None:
+        while not self._stop.is_set():
+            processed, waiting = False, False
+            for job in jobs:
+                if self._stop.is_set():
+                    return
+                if self.board.is_done(job):
+                    continue
+                lease = self.board.claim(job, self.worker_id)
+                if lease is None:
+                    waiting = not self.board.is_done(job) or waiting
+                    continue
+                self._process(job, lease)
+                processed = True
+            if not waiting and not processed:
+                return
+            if not processed:
+                self._stop.wait(self.poll_seconds)
+
+    def _process(self, job: Job, lease: Lease) -> None:
+        with lease.start(self.heartbeat_seconds), metrics.busy("jobboard"):
+            self.logger.info(f"认领（第 {lease.attempt} 次）: {job.pptx}")
+            try:
+                record = self.handle(job)
+            except Exception as e:
+                record = {"pptx": job.pptx, "output": job.output, "status": "failed", "error": str(e),
+                          "reports": {}, "elapsed": None}
+            self.board.complete(job, record, self.worker_id, lease.attempt)
+        with self._records_lock:
+            self.records.append(record)
@@ -0,0 +1,151 @@
+# 批处理检查点日志：每个PPT的状态变化（planned → started → done / failed）逐行追加到 JSON Lines 文件，
+# 每行写入后立即落盘；进程中途退出（COM 卡死、内存不足、重启）后以 resume 方式重新运行同一批次时，
+# 已完成且输出文档仍在的PPT直接沿用日志中的处理记录，只处理其余的PPT。
+# 文档本身先写入临时文件再替换（见 DocxProcessor），日志中的 done 只在全部报表写完后记录。
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import LoggerFactory
+
+# 不写入日志的记录字段（体积大且续跑时用不到）
+_TRANSIENT_KEYS = ("trace", "profile")
+
+
+class BatchJournal:
+    """
+    单个批次的检查点日志
+
+    Args:
+        path: 日志文件路径（JSON Lines）
+        resume: 为 True 时读取已有日志并在其后追加；否则清空后重新记录
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.logger = LoggerFactory.create_logger("BatchJournal")
+        # PPT → 最后一次的状态 / 计划的输出路径 / 完成时的处理记录
+        self._states: Dict[str, str] = {}
+        self._outputs: Dict[str, str] = {}
+        self._records: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() and not self._ends_with_newline(path):
+            # 上次退出时最后一行只写了一半，从新行开始追加，避免与之拼接
+            self._file.write("\n")
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def default_path(directory: str, roots: Iterable[str], layout: str, output_dir: Optional[str] = None) -> str:
+        """按根目录与输出位置确定批次的日志路径（同一批参数重新运行时得到同一个文件）"""
+        key = json.dumps([sorted(os.path.abspath(root) for root in roots), layout,
+                          os.path.abspath(output_dir) if output_dir else None], ensure_ascii=False)
+        return os.path.join(directory, "journals", f"batch_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.jsonl")
+
+    @staticmethod
+    def _entries(path: str, logger=None) -> Iterable[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for number, line in enumerate(lines, 1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 进程在写入最后一行时退出，该行不完整
+                if logger:
+                    logger.warning(f"跳过不完整的日志行: {path}:{number}")
+                continue
+            if entry.get("pptx") and entry.get("state"):
+                yield entry
+
+    @classmethod
+    def interrupted(cls, path: str) -> bool:
+        """日志中有计划处理但没有结果的PPT（上次运行中途退出）"""
+        states: Dict[str, str] = {}
+        for entry in cls._entries(path):
+            states[entry["pptx"]] = entry["state"]
+        return any(state in ("planned", "started") for state in states.values())
+
+    def _load(self) -> None:
+        for entry in self._entries(self.path, self.logger):
+            pptx, state = entry["pptx"], entry["state"]
+            self._states[pptx] = state
+            if state == "planned":
+                self._outputs[pptx] = entry.get("output")
+            elif state in ("done", "failed"):
+                self._records[pptx] = entry.get("record") or {}
+        done = sum(1 for state in self._states.values() if state == "done")
+        self.logger.info(f"读取检查点日志 {self.path}: {len(self._states)} 个PPT，已完成 {done} 个")
+
+    def _append(self, entries: List[Dict]) -> None:
+        """追加若干条状态变化（pptx / state / 其他字段），写完后落盘一次"""
+        now = round(time.time(), 3)
+        lines = "".join(json.dumps(dict(entry, t=now), ensure_ascii=False, default=str) + "\n" for entry in entries)
+        with self._lock:
+            for entry in entries:
+                self._states[entry["pptx"]] = entry["state"]
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def planned_output(self, pptx_path: str) -> Optional[str]:
+        """上次运行中为该PPT计划的输出路径（续跑时沿用，numbered 布局不再新建结果目录）"""
+        return self._outputs.get(pptx_path)
+
+    def completed(self, pptx_path: str) -> Optional[Dict]:
+        """已成功完成且报表文件都还在时返回当时的处理记录，否则返回 None（需要重新处理）"""
+        if self._states.get(pptx_path) != "done":
+            return None
+        record = self._records.get(pptx_path) or {}
+        outputs = [path for path in (record.get("reports") or {}).values() if path]
+        if not outputs or not all(os.path.isfile(path) for path in outputs):
+            return None
+        return record
+
+    def plan(self, jobs: Iterable[Tuple[str, str]]) -> None:
+        """记录本次要处理的PPT及其输出路径"""
+        entries = []
+        for pptx_path, output_path in jobs:
+            self._outputs[pptx_path] = output_path
+            entries.append({"pptx": pptx_path, "state": "planned", "output": output_path})
+        if entries:
+            self._append(entries)
+
+    def start(self, *pptx_paths: str) -> None:
+        if pptx_paths:
+            self._append([{"pptx": pptx_path, "state": "started"} for pptx_path in pptx_paths])
+
+    def finish(self, record: Dict) -> None:
+        """记录一个PPT的处理结果（status 为 ok 时记为 done，其余记为 failed）"""
+        record = {key: value for key, value in record.items() if key not in _TRANSIENT_KEYS}
+        self._records[record["pptx"]] = record
+        self._append([{"pptx": record["pptx"], "state": "done" if record.get("status") == "ok" else "failed",
+                       "record": record}])
+
+    def pending(self) -> List[str]:
+        """已开始但没有结果的PPT（上次运行中断时正在处理）"""
+        return [pptx for pptx, state in self._states.items() if state == "started"]
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> "BatchJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,29 +1,51 @@
+import io
 import os
-import re
-import glob
-from pptx import Presentation
-from content_models import Slide
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Sequence, TYPE_CHECKING
 from config.loader import ConfigLoader
-from utils.logger import LoggerFactory, LOG_LEVELS
+from utils import metrics, tracing
+from utils.logger import LoggerFactory
 from utils.text_utils import traditional_to_simplified
 from extractors.extrator_发包规范 import ExtractorA
-from exporters.exporter_发包规范 import ExporterA
+from exporters.registry import ImageRenderCache, get_exporter_class, report_filename
+from core.project_index import ProjectIndex, ProjectIndexLoader
+from core.discovery import DeckDiscovery, get_ppt_version
+from core.pipeline import ExtractionResult, ProcessingContext, freeze
 import traceback
 
+if TYPE_CHECKING:
+    from content_models import Slide
 
 
 class PackingFileProcessor:
-    def set_log_callback(self, callback):
-        self._external_log_callback = callback
-    """发包规范 处理核心类"""
+    """
+    发包规范 处理核心类
+
+    实例可被多个线程同时使用：构造后只持有只读资源（配置快照、模板路径），
+    日志回调、总表、手动输入等逐次调用的状态通过 ProcessingContext 传入。
+    """
     
-    def __init__(self, config: ConfigLoader, log_level: str = "INFO"):
+    def __init__(self, config: ConfigLoader, renderer: str = "com", reports: Optional[Sequence[str]] = None):
+        """
+        Args:
+            config: 配置加载器（构造后视为只读）
+            renderer: 图片渲染方式，"com" 通过 PowerPoint COM 导出，"none" 跳过图片字段
+            reports: render_reports 导出的报表类型，为 None 时使用配置 reports.enabled
+        """
         self.config = config
         self.logger = LoggerFactory.create_logger("PackingFile（发包规范）Processor")
-        self.log_level = log_level
-        
-    def _log(self, message: str, level: str = "INFO"):
+        self.renderer = renderer
+        # 补全阶段使用的字段配置与模板路径在构造时固定，多线程共享时只读
+        self._fields_config = freeze(config.config.get("FIELDS_CONFIG", {}))
+        self._template_path = config.get_template_path()
+        render_images = renderer != "none"
+        self._primary_exporter = get_exporter_class("发包规范")(config, render_images=render_images)
+        self._report_exporters = tuple(
+            get_exporter_class(name)(config, render_images=render_images)
+            for name in (reports if reports is not None else config.get_enabled_reports())
+        )
+
+    def _log(self, message: str, level: str = "INFO", context: Optional[ProcessingContext] = None):
         # 记录到logger
         if level == "DEBUG":
             self.logger.debug(message)
@@ -33,58 +55,34 @@ class PackingFileProcessor:
             self.logger.warning(message)
         elif level == "ERROR":
             self.logger.error(message)
-        # 只在等级大于等于当前设置时输出到UI
-        if hasattr(self, '_external_log_callback') and self._external_log_callback:
-            if LOG_LEVELS[level] >= LOG_LEVELS.get(self.log_level, 20):
-                self._external_log_callback(f"[{level}] {message}")
-
-    def change_log_level(self, log_level: str):
-        self.log_level = log_level
+        # 只转发给本次调用的回调（等级过滤由 context 决定）
+        if context is not None:
+            context.emit(message, level)
+
+    @staticmethod
+    def _context(context: Optional[ProcessingContext], **values) -> ProcessingContext:
+        """未传入上下文时，用旧式参数构造本次调用的上下文"""
+        return context if context is not None else ProcessingContext(**values)
         
 
-    def get_v3_pptx_directories(self, root_dir: str) -> list[str]:
+    def get_v3_pptx_directories(self, root_dir: str, catalog=None) -> list[str]:
         """
         处理指定根目录下的所有目录，查找包含pptx文件的目录，并返回包含最大版本v3 PPT文件的目录列表。
 
         Args:
         root_dir (str): 根目录路径。
+        catalog (DirectoryCatalog, optional): 目录扫描缓存，未修改的目录不再重新列出。
 
         Returns:
-        list[str]: 包含最大版本v3 PPT文件的目录列表。
+        list[str]: 包含最大版本v3 PPT文件的目录列表（按路径排序）。
 
         """
-        results = []
-        exclude_dirs = {"result", "temp", "config", "__pycache__"}
-        # 1. 用glob递归查找所有pptx文件
-        pptx_files = glob.glob(os.path.join(root_dir, "**", "*.pptx"), recursive=True)
-        # 2. 收集所有包含pptx的目录
-        all_dirs = set()
-        for pptx_file in pptx_files:
-            dir_path = os.path.dirname(pptx_file)
-            # 检查是否包含排除目录
-            parts = set(os.path.normpath(dir_path).split(os.sep))
-            if not (parts & exclude_dirs):
-                all_dirs.add(dir_path)
-        # 3. 对每个目录，查找最大版本的v3 PPT
-        for dir_path in all_dirs:
-            v3_ppt_files = [f for f in os.listdir(dir_path) if f.lower().endswith('.pptx') and 'v3' in f.lower()]
-            if not v3_ppt_files:
-                continue
-            max_version = float('-inf')
-            max_file = None
-            for file in v3_ppt_files:
-                version = self._get_ppt_version(file)
-                if version is not None and version > max_version:
-                    max_version = version
-                    max_file = file
-            if max_file:
-                ppt_file = os.path.join(dir_path, max_file)
-                results.append(ppt_file)
-        return results
+        # 单次 scandir 遍历，result*/temp/config/__pycache__ 在进入前剪枝，详见 core/discovery.py
+        return DeckDiscovery(catalog=catalog).discover([root_dir])
     
 
     def process_generate_reports(self, selected_dir: str, data_list=None, manual_proj_name_value=None,
-                                 manual_proj_action_value=None):
+                                 manual_proj_action_value=None, context: Optional[ProcessingContext] = None):
         """
         UI - 调用接口处理多个PPT文件，生成对应的发包规范文档。
 
@@ -93,115 +91,32 @@ class PackingFileProcessor:
         data_list (list[dict], optional): 从Excel读取的结构化数据，默认为None。
         manual_proj_name_value (str, optional): 手动输入的工程名字，默认为None。
         manual_proj_action_value (str, optional): 手动输入的工程类型，默认为None。
+        context (ProcessingContext, optional): 本次调用的上下文，传入时忽略上面三个参数。
 
         Returns:
         dict: 包含每个PPT文件的处理结果，键为PPT文件路径，值为生成的发包规范文档路径。
 
         """
+        context = self._context(context, data_list=data_list,
+                                manual_proj_name_value=manual_proj_name_value,
+                                manual_proj_action_value=manual_proj_action_value)
         result_dirs = {}
         pptx_paths = self.get_v3_pptx_directories(selected_dir)
 
         for pptx_path in pptx_paths:
+            output_path = None
             try:
                 dir_path = os.path.dirname(pptx_path)
-                result_dir = self._create_result_dir(dir_path)
-                output_path = self._process_single_ppt(
-                    pptx_path, result_dir,
-                    data_list=data_list,
-                    manual_proj_name_value=manual_proj_name_value,
-                    manual_proj_action_value=manual_proj_action_value
-                )
+                result_dir = self._create_result_dir(dir_path, context)
+                output_path = self._process_single_ppt(pptx_path, result_dir, context=context)
             except Exception as e:
-                self._log(f"处理文件 {pptx_path} 失败: {str(e)}\n{traceback.format_exc()}", level="ERROR")
+                self._log(f"处理文件 {pptx_path} 失败: {str(e)}\n{traceback.format_exc()}", level="ERROR",
+                          context=context)
             result_dirs[pptx_path] = output_path
         return result_dirs
 
-    def process_ppt_to_docx(self, pptx_path: str, output_path: str, version: str = "v1",
-                           data_list=None, manual_proj_name_value=None, manual_proj_action_value=None):
-        """
-        应用层统一入口：处理PPT，提取信息并生成文档
-        :param pptx_path: PPTX文件路径
-        :param output_path: 输出DOCX路径
-        :param version: 版本号
-        :param data_list: Excel结构化数据
-        :param manual_proj_name_value: 手动工程名字
-        :param manual_proj_action_value: 手动工程类型
-        """
-        # 读取PPT并结构化
-        slides = self._read_pptx(pptx_path, version)
-        slides_dicts = [slide.to_dict() for slide in slides]
-        # 提取需要的信息
-        extractor = ExtractorA(slides_dicts, self.config)
-        result = extractor.extract()
-        self.logger.debug("\n发包规范字段提取结果:")
-        self.logger.debug(str(result))
-
-        # Excel数据匹配逻辑
-        project_code = result.get("ProjectCode")
-        matched_scheme_name = None
-        matched_scheme_type = ""
-        matched_scheme_action = ""
-        if data_list and project_code:
-            for item in data_list:
-                if str(item.get("ProjectCode", "")).strip() == str(project_code).strip():
-                    matched_scheme_name = item.get("name")
-                    matched_scheme_action = item.get("Action")
-                    matched_scheme_type = item.get("type")
-                    break
-
-        # 匹配成功
-        if matched_scheme_name:
-            self.logger.debug(f"{project_code} 匹配到 方案總表的方案代碼\n")
-            result["name"] = matched_scheme_name
-            result["Action"] = matched_scheme_action
-            self.last_matched_name = matched_scheme_name
-            self.last_matched_action = matched_scheme_action
-        else:
-            # 未匹配到
-            self.logger.debug(f"{project_code} 采用 手動的名稱和Action\n")
-            result["name"], result["Action"] = "", ""
-            self.last_matched_name = "未匹配到"
-            self.last_matched_action = "未匹配到"
-            # 手动输入覆盖
-            if manual_proj_name_value:
-                result["name"] = manual_proj_name_value
-            if manual_proj_action_value:
-                result["Action"] = manual_proj_action_value
-
-        # 读取配置
-        config_dict = self.config.config.get("FIELDS_CONFIG", {})
-        install_days_config = config_dict.get("发包规范V1_InstalledDate", {})
-        lq_days_config = config_dict.get("发包规范V1_LQStartDate", {})
-
-        action_value = traditional_to_simplified(result.get("Action", ""))
-        action_value = self.normalize_action(action_value)
-        scheme_type_value = traditional_to_simplified(matched_scheme_type or "")
-
-        # InstalledDate
-        result["InstalledDate"] = str(install_days_config.get(action_value, ""))
-
-        # LQStartDate
-        lq_days = ""
-        if scheme_type_value and scheme_type_value in lq_days_config:
-            lq_type_dict = lq_days_config[scheme_type_value]
-            lq_days = lq_type_dict.get(action_value, "")
-        else:
-            # 若无类型，直接用Action对应的默认LQStartDate
-            lq_days = install_days_config.get(action_value, "")
-        result["LQStartDate"] = str(lq_days)
-
-        # OSSDate 固定为0
-        result["OSSDate"] = "0"
-
-        exporter = ExporterA(pptx_path, self.get_template_path(), output_path)
-        success = exporter.process(result)
-        if success:
-            self._log(f"\n文档已成功生成: {output_path}", level="INFO")
-        else:
-            self._log("\n文档生成失败", level="INFO")
-
-    def _create_result_dir(self, base_dir: str) -> str:
-        """创建结果目录"""
+    def _create_result_dir(self, base_dir: str, context: Optional[ProcessingContext] = None) -> str:
+        """创建结果目录（多个线程同时创建时各自得到不同的目录）"""
         result_base = "result"
         counter = 0
         
@@ -212,17 +127,20 @@ class PackingFileProcessor:
                 result_dir = os.path.join(base_dir, f"{result_base}_{counter}")
                 
             if not os.path.exists(result_dir):
-                os.makedirs(result_dir)
-                self._log(f"创建结果目录: {result_dir}", level="INFO")
+                try:
+                    os.makedirs(result_dir)
+                except FileExistsError:
+                    # 其他线程刚刚创建了同名目录，继续尝试下一个编号
+                    counter += 1
+                    continue
+                self._log(f"创建结果目录: {result_dir}", level="INFO", context=context)
                 return result_dir
                 
             counter += 1
     
     def _get_ppt_version(self, filename: str) -> Optional[float]:
         """从PPT文件名中提取并验证版本号"""
-        v3_pattern = re.compile(r'[vV](\d+\.?\d?)')
-        match = v3_pattern.search(filename)
-        return float(match.group(1)) if match else None
+        return get_ppt_version(filename)
 
     def _find_v3_ppt_files(self, dir_path: str) -> str:
         """查找V3版本的PPT文件并返回最大版本号的文件路径"""
@@ -244,53 +162,79 @@ class PackingFileProcessor:
                     
         return max_version_file
 
-    def _read_pptx(self, pptx_path: str, version: Optional[str] = None) -> List[Slide]:
+    def _read_pptx(self, pptx_path: str, version: Optional[str] = None,
+                   context: Optional[ProcessingContext] = None, data: Optional[bytes] = None) -> List["Slide"]:
         """
         读取PPT文件，返回结构化Slide对象列表
+
+        Args:
+            data: 已预读的文件内容（bytes 或已打开的二进制文件对象），传入时不再从 pptx_path 读取
         """
-        self._log(f"开始读取PPT文件: {pptx_path}", level="INFO")
+        # python-pptx 及内容模型在首次读取时才导入，缩短GUI/CLI启动时间
+        from pptx import Presentation
+        from content_models import Slide
+        self._log(f"开始读取PPT文件: {pptx_path}", level="INFO", context=context)
         try:
-            prs = Presentation(pptx_path)
+            if data is None:
+                source = pptx_path
+            elif isinstance(data, (bytes, bytearray, memoryview)):
+                source = io.BytesIO(data)
+            else:
+                source = data
+            with tracing.span("read.open"):
+                prs = Presentation(source)
             slides = []
             for page_number, slide in enumerate(prs.slides, start=1):
-                self._log(f"处理第 {page_number} 页", level="DEBUG")
-                slide_obj = Slide(slide, prs.slide_master, page_number, self.config, version)
+                self._log(f"处理第 {page_number} 页", level="DEBUG", context=context)
+                with tracing.span("read.slide", page=page_number):
+                    slide_obj = Slide(slide, prs.slide_master, page_number, self.config, version)
                 slides.append(slide_obj)
-            self._log(f"成功读取 {len(slides)} 页", level="DEBUG")
+            self._log(f"成功读取 {len(slides)} 页", level="DEBUG", context=context)
             return slides
         except Exception as e:
-            self._log(f"读取PPT文件时出错: {str(e)}\n{traceback.format_exc()}", level="ERROR")
+            self._log(f"读取PPT文件时出错: {str(e)}\n{traceback.format_exc()}", level="ERROR", context=context)
             raise
     
-    def _process_single_ppt(self, ppt_path: str, output_dir: str, data_list=None, manual_proj_name_value=None, manual_proj_action_value=None) -> str:
+    def _process_single_ppt(self, ppt_path: str, output_dir: str, data_list=None, manual_proj_name_value=None,
+                            manual_proj_action_value=None, context: Optional[ProcessingContext] = None) -> str:
         """处理单个PPT文件"""
-        self._log(f"开始处理文件: {ppt_path}", level="INFO")
-        
-        # 提取文件名（不含扩展名）
-        filename = os.path.basename(ppt_path)
-        base_name = os.path.splitext(filename)[0]
+        context = self._context(context, data_list=data_list,
+                                manual_proj_name_value=manual_proj_name_value,
+                                manual_proj_action_value=manual_proj_action_value)
+        self._log(f"开始处理文件: {ppt_path}", level="INFO", context=context)
         
-        # 提取 V3 前面的字符串
-        v3_pattern = re.compile(r'^(.*?)[vV]3')
-        match = v3_pattern.search(base_name)
-        prefix = match.group(1).strip('_') if match else base_name
-        
-        # 生成输出文件名
-        output_filename = f"{prefix}_v1_发包规范.docx"
-        output_path = os.path.join(output_dir, output_filename)
-        self.process_ppt_to_docx(
-            ppt_path, output_path, version="v1",
-            data_list=data_list,
-            manual_proj_name_value=manual_proj_name_value,
-            manual_proj_action_value=manual_proj_action_value
-        )
+        output_path = os.path.join(output_dir, self.get_output_filename(ppt_path))
+        self.process_ppt_to_docx(ppt_path, output_path, context=context)
        
-        self._log(f"处理完成，输出到: {output_path}", level="INFO")
+        self._log(f"处理完成，输出到: {output_path}", level="INFO", context=context)
         return output_path
 
+    @staticmethod
+    def get_output_filename(ppt_path: str) -> str:
+        """根据PPT文件名生成发包规范文档名（取 V3 前面的字符串作为前缀）"""
+        return report_filename(ppt_path, "发包规范")
+
     def get_template_path(self) -> str:
         """获取模板文件路径"""
-        return self.config.get_template_path()
+        return self._template_path
+
+    def _match_project(self, data_list, project_code) -> Optional[Dict]:
+        """
+        在方案总表中查找 ProjectCode 对应的行
+
+        data_list 可以是行字典列表、ProjectIndex，或 ProjectIndexLoader（此时仅在此处等待总表加载完成）
+        """
+        if not project_code or data_list is None:
+            return None
+        if isinstance(data_list, ProjectIndexLoader):
+            data_list = data_list.wait()
+        self.logger.debug(f"开始进行Excel匹配，ProjectCode: {project_code} & data_list 长度: {len(data_list)}")
+        if isinstance(data_list, ProjectIndex):
+            return data_list.lookup(project_code)
+        for item in data_list:
+            if str(item.get("ProjectCode", "")).strip() == str(project_code).strip():
+                return item
+        return None
 
     def normalize_action(self, action: str) -> str:
         """
@@ -305,134 +249,227 @@ class PackingFileProcessor:
             return "中改造"
         return action
     
-    def get_matching_info(self, pptx_path, data_list, manual_proj_name_value, manual_proj_action_value):
+    def get_matching_info(self, pptx_path, data_list, manual_proj_name_value, manual_proj_action_value,
+                          result: Optional[ExtractionResult] = None, context: Optional[ProcessingContext] = None):
         """
         返回匹配的工程名称和类型（安全用于前端线程）
-        """
-        slides = self._read_pptx(pptx_path)
-        slides_dicts = [slide.to_dict() for slide in slides]
-        extractor = ExtractorA(slides_dicts, self.config)
-        result = extractor.extract()
-        project_code = result.get("ProjectCode")
-        matched_scheme_name = None
-        matched_scheme_action = None
-        if data_list and project_code:
-            for item in data_list:
-                if str(item.get("ProjectCode", "")).strip() == str(project_code).strip():
-                    matched_scheme_name = item.get("name")
-                    matched_scheme_action = item.get("Action")
-                    matched_scheme_type = item.get("type")
-                    break
-        # 优先返回匹配到的，否则用手动输入
-        name = matched_scheme_name if matched_scheme_name else manual_proj_name_value or "未匹配到"
-        action = matched_scheme_action if matched_scheme_action else manual_proj_action_value or "未匹配到"
-        return name, action, matched_scheme_type
 
-    def extract_ppt_data(self, pptx_path: str, version: str = "v1",
-                        data_list=None, manual_proj_name_value=None, manual_proj_action_value=None) -> dict:
-        """
-        新增函数：提取PPT数据并匹配Excel信息
+        已有流水线结果时直接读取，不再重新解析PPT
         """
-        return self.process_ppt_to_docx(
-            pptx_path, "", version, 
-            data_list, manual_proj_name_value, manual_proj_action_value,
-            export=False
-        )
+        if result is None or not result.has_reached("match"):
+            result = self.analyze(pptx_path, self._context(context, data_list=data_list,
+                                                           manual_proj_name_value=manual_proj_name_value,
+                                                           manual_proj_action_value=manual_proj_action_value))
+        return result.display_name, result.display_action, result.scheme_type
+
+    # ---------------- 流水线阶段：read → extract → match → enrich → render ----------------
+
+    def read(self, pptx_path: str, context: Optional[ProcessingContext] = None,
+             data=None) -> ExtractionResult:
+        """读取阶段：解析PPT为页面字典（每个PPT只解析这一次；data 为已预读的文件内容）"""
+        context = self._context(context)
+        with tracing.span("read", pptx=pptx_path) as span, metrics.timed(metrics.STAGE_SECONDS, stage="read"):
+            slides = self._read_pptx(pptx_path, context.version, context, data)
+            span.set(slides=len(slides))
+            with tracing.span("read.to_dict"):
+                slide_dicts = tuple(slide.to_dict(include_formatting=False) for slide in slides)
+        return ExtractionResult(pptx_path, version=context.version, stage="read", slides=slide_dicts)
+
+    def extract(self, result: ExtractionResult, context: Optional[ProcessingContext] = None) -> ExtractionResult:
+        """提取阶段：从页面字典中提取发包规范字段"""
+        with tracing.span("extract"), metrics.timed(metrics.STAGE_SECONDS, stage="extract"):
+            fields = ExtractorA(list(result.slides), self.config).extract()
+        self.logger.debug("\n发包规范字段提取结果:")
+        self.logger.debug(str(fields))
+        return result.advance("extract", fields=fields)
+
+    def match(self, result: ExtractionResult, context: Optional[ProcessingContext] = None) -> ExtractionResult:
+        """匹配阶段：按 ProjectCode 匹配方案总表，未匹配时使用手动输入的名字和类型"""
+        context = self._context(context)
+        project_code = result.project_code
+        fields = result.to_dict()
+        with tracing.span("match", project_code=project_code) as span, \
+                metrics.timed(metrics.STAGE_SECONDS, stage="match"):
+            matched_item = self._match_project(context.data_list, project_code)
+            span.set(matched=matched_item is not None)
+        if matched_item and matched_item.get("name"):
+            self.logger.debug(f"{project_code} 匹配到 方案總表的方案代碼\n")
+            fields["name"] = matched_item.get("name")
+            fields["Action"] = matched_item.get("Action")
+        else:
+            self.logger.debug(f"{project_code} 采用 手動的名稱和Action\n")
+            fields["name"] = context.manual_proj_name_value or ""
+            fields["Action"] = context.manual_proj_action_value or ""
+        return result.advance("match", fields=fields, matched_row=matched_item)
 
-    def export_to_docx(self, pptx_path: str, output_path: str, extracted_data: dict) -> bool:
-        """
-        新增函数：将提取的数据导出为docx文档
-        """
-        return self.process_ppt_to_docx(
-            pptx_path, output_path, "v1",
-            None, None, None,
-            extracted_data=extracted_data
-        )
+    def enrich(self, result: ExtractionResult, context: Optional[ProcessingContext] = None) -> ExtractionResult:
+        """补全阶段：根据工程类型与方案类型计算 InstalledDate / LQStartDate / OSSDate"""
+        with tracing.span("enrich"), metrics.timed(metrics.STAGE_SECONDS, stage="enrich"):
+            fields = result.to_dict()
+            install_days_config = self._fields_config.get("发包规范V1_InstalledDate", {})
+            lq_days_config = self._fields_config.get("发包规范V1_LQStartDate", {})
 
-    def process_ppt_to_docx(self, pptx_path: str, output_path: str, version: str = "v1",
-                           data_list=None, manual_proj_name_value=None, manual_proj_action_value=None,
-                           export=True, extracted_data=None):
-        """
-        修改原函数：添加export和extracted_data参数，支持分步操作
-        """
-        if extracted_data is None:
-            # 读取PPT并结构化
-            slides = self._read_pptx(pptx_path, version)
-            slides_dicts = [slide.to_dict() for slide in slides]
-            # 提取需要的信息
-            extractor = ExtractorA(slides_dicts, self.config)
-            result = extractor.extract()
-            self.logger.debug("\n发包规范字段提取结果:")
-            self.logger.debug(str(result))
-
-            # Excel数据匹配逻辑
-            project_code = result.get("ProjectCode")
-            matched_scheme_name = None
-            matched_scheme_type = ""
-            matched_scheme_action = ""
-            self.logger.debug(f"开始进行Excel匹配，ProjectCode: {project_code} & data_list 长度: {len(data_list) if data_list else 0}")
-            if data_list and project_code:
-                for item in data_list:
-                    self.logger.debug(f"正在检查Excel项: {item.get('ProjectCode', '')}")
-                    if str(item.get("ProjectCode", "")).strip() == str(project_code).strip():
-                        matched_scheme_name = item.get("name")
-                        matched_scheme_action = item.get("Action")
-                        matched_scheme_type = item.get("type")
-                        break
-
-            # 匹配成功
-            if matched_scheme_name:
-                self.logger.debug(f"{project_code} 匹配到 方案總表的方案代碼\n")
-                result["name"] = matched_scheme_name
-                result["Action"] = matched_scheme_action
-                self.last_matched_name = matched_scheme_name
-                self.last_matched_action = matched_scheme_action
-            else:
-                # 未匹配到
-                self.logger.debug(f"{project_code} 采用 手動的名稱和Action\n")
-                result["name"], result["Action"] = "", ""
-                self.last_matched_name = "未匹配到"
-                self.last_matched_action = "未匹配到"
-                # 手动输入覆盖
-                if manual_proj_name_value:
-                    result["name"] = manual_proj_name_value
-                if manual_proj_action_value:
-                    result["Action"] = manual_proj_action_value
-
-            # 读取配置
-            config_dict = self.config.config.get("FIELDS_CONFIG", {})
-            install_days_config = config_dict.get("发包规范V1_InstalledDate", {})
-            lq_days_config = config_dict.get("发包规范V1_LQStartDate", {})
-
-            action_value = traditional_to_simplified(result.get("Action", ""))
-            action_value = self.normalize_action(action_value)
-            scheme_type_value = traditional_to_simplified(matched_scheme_type or "")
+            action_value = self.normalize_action(fields.get("Action", ""))
+            scheme_type_value = traditional_to_simplified(result.scheme_type or "")
 
             # InstalledDate
-            result["InstalledDate"] = str(install_days_config.get(action_value, ""))
+            fields["InstalledDate"] = str(install_days_config.get(action_value, ""))
 
             # LQStartDate
-            lq_days = ""
             if scheme_type_value and scheme_type_value in lq_days_config:
-                lq_type_dict = lq_days_config[scheme_type_value]
-                lq_days = lq_type_dict.get(action_value, "")
+                lq_days = lq_days_config[scheme_type_value].get(action_value, "")
             else:
                 # 若无类型，直接用Action对应的默认LQStartDate
                 lq_days = install_days_config.get(action_value, "")
-            result["LQStartDate"] = str(lq_days)
+            fields["LQStartDate"] = str(lq_days)
 
             # OSSDate 固定为0
-            result["OSSDate"] = "0"
+            fields["OSSDate"] = "0"
+        return result.advance("enrich", fields=fields)
+
+    def render(self, result: ExtractionResult, output_path: str,
+               context: Optional[ProcessingContext] = None) -> bool:
+        """渲染阶段：将补全后的字段写入发包规范模板"""
+        return self._render_report(self._primary_exporter, result, output_path, None, context)
+
+    def render_reports(self, result: ExtractionResult, output_dir: str,
+                       context: Optional[ProcessingContext] = None,
+                       image_cache: Optional[ImageRenderCache] = None) -> Dict[str, Optional[str]]:
+        """
+        渲染阶段（多报表）：由同一个分析结果导出所有启用的报表
 
-            if not export:
-                return result
+        图片字段先在当前线程通过共享缓存导出一次（每页一次 COM 导出），
+        随后各报表并行写入各自的模板，不再重新读取或解析PPT。
 
-            extracted_data = result
+        Args:
+            result: analyze 返回的结果
+            output_dir: 报表输出目录，文件名见各导出器的 get_output_filename
+            image_cache: 已渲染好图片的缓存（由调用方关闭），为 None 时在本次调用内创建并清理
 
-        exporter = ExporterA(pptx_path, self.get_template_path(), output_path)
-        success = exporter.process(extracted_data)
+        Returns:
+            dict: {报表类型: 输出路径}，生成失败的报表值为 None；未配置模板的报表被跳过，不在结果中
+        """
+        exporters = []
+        for exporter in self._report_exporters:
+            if exporter.is_available():
+                exporters.append(exporter)
+            else:
+                self._log(f"报表 {exporter.name} 未配置模板，跳过", level="WARNING", context=context)
+        if not exporters:
+            return {}
+
+        owns_cache = image_cache is None
+        cache = ImageRenderCache(result.pptx_path) if owns_cache else image_cache
+        try:
+            if any(exporter.render_images for exporter in exporters):
+                with tracing.span("images"), metrics.timed(metrics.STAGE_SECONDS, stage="images"):
+                    cache.export_images(result)
+
+            def render_one(exporter) -> Optional[str]:
+                output_path = os.path.join(output_dir, exporter.get_output_filename(result.pptx_path))
+                return output_path if self._render_report(exporter, result, output_path, cache, context) else None
+
+            if len(exporters) == 1:
+                outputs = [render_one(exporters[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(exporters)) as pool:
+                    outputs = list(pool.map(tracing.bind_current(render_one), exporters))
+        finally:
+            if owns_cache:
+                cache.close()
+        return {exporter.name: output for exporter, output in zip(exporters, outputs)}
+
+    def _render_report(self, exporter, result: ExtractionResult, output_path: str,
+                       image_cache: Optional[ImageRenderCache], context: Optional[ProcessingContext]) -> bool:
+        with tracing.span("write", report=exporter.name) as span, \
+                metrics.timed(metrics.STAGE_SECONDS, stage="write"):
+            success = exporter.render(result, output_path, image_cache)
+            span.set(ok=bool(success))
+        metrics.REPORTS.inc(report=exporter.name, status="ok" if success else "failed")
         if success:
-            self._log(f"\n文档已成功生成: {output_path}", level="INFO")
+            self._log(f"\n文档已成功生成: {output_path}", level="INFO", context=context)
         else:
-            self._log("\n文档生成失败", level="INFO")
-        return success
\ No newline at end of file
+            self._log(f"\n文档生成失败: {output_path}", level="INFO", context=context)
+        return success
+
+    def analyze(self, pptx_path: str, context: Optional[ProcessingContext] = None,
+                data=None) -> ExtractionResult:
+        """执行 read → extract → match → enrich，返回可直接用于导出的结果"""
+        context = self._context(context)
+        result = self.extract(self.read(pptx_path, context, data), context)
+        result = self.match(result, context)
+        return self.enrich(result, context)
+
+    # ---------------- 异步接口（供服务内嵌使用） ----------------
+
+    async def analyze_async(self, pptx_path: str, context: Optional[ProcessingContext] = None,
+                            executor=None) -> ExtractionResult:
+        """在执行器中运行 analyze（executor 为 None 时使用事件循环默认线程池）"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.analyze, pptx_path, context)
+
+    async def process_decks_async(self, jobs, context: Optional[ProcessingContext] = None,
+                                  **options) -> List[Dict]:
+        """
+        流水线处理多个PPT：预读、解析、渲染、写入各阶段并发进行
+
+        Args:
+            jobs: (pptx_path, output_path) 序列，报表写入 output_path 所在目录
+            context: 所有PPT共用的调用上下文
+            options: 传给 AsyncPipelineRunner 的并发参数（read_concurrency / parse_workers 等）
+
+        Returns:
+            list[dict]: 与 jobs 顺序一致的处理记录
+        """
+        from core.async_pipeline import AsyncPipelineRunner
+        return await AsyncPipelineRunner(self, **options).run(jobs, context)
+
+    def stream_decks(self, jobs, context: Optional[ProcessingContext] = None, **options):
+        """同 process_decks_async，但以异步迭代器按完成顺序逐个返回记录"""
+        from core.async_pipeline import AsyncPipelineRunner
+        return AsyncPipelineRunner(self, **options).stream(jobs, context)
+
+    def extract_ppt_data(self, pptx_path: str, version: str = "v1",
+                        data_list=None, manual_proj_name_value=None, manual_proj_action_value=None,
+                        context: Optional[ProcessingContext] = None) -> ExtractionResult:
+        """
+        提取PPT数据并匹配Excel信息（等同于 analyze），结果可直接传给 export_to_docx
+        """
+        return self.analyze(pptx_path, self._context(context, version=version, data_list=data_list,
+                                                     manual_proj_name_value=manual_proj_name_value,
+                                                     manual_proj_action_value=manual_proj_action_value))
+
+    def export_to_docx(self, pptx_path: str, output_path: str, extracted_data,
+                       context: Optional[ProcessingContext] = None) -> bool:
+        """
+        将提取结果导出为docx文档
+
+        Args:
+            extracted_data: extract_ppt_data 返回的 ExtractionResult（也兼容字段字典）
+        """
+        if not isinstance(extracted_data, ExtractionResult):
+            extracted_data = ExtractionResult(pptx_path, stage="enrich").advance("enrich", fields=extracted_data)
+        return self.render(extracted_data, output_path, context)
+
+    def process_ppt_to_docx(self, pptx_path: str, output_path: str, version: str = "v1",
+                           data_list=None, manual_proj_name_value=None, manual_proj_action_value=None,
+                           export=True, extracted_data=None, context: Optional[ProcessingContext] = None):
+        """
+        应用层统一入口：处理PPT，提取信息并生成文档
+
+        Args:
+            export: 为 False 时只返回分析结果，不生成文档
+            extracted_data: 已有的分析结果，传入时跳过读取与提取
+            context: 本次调用的上下文，传入时忽略 version/data_list/手动输入参数
+
+        Returns:
+            bool: 文档是否生成成功（export=False 时返回 ExtractionResult）
+        """
+        if extracted_data is not None:
+            return self.export_to_docx(pptx_path, output_path, extracted_data, context)
+        result = self.extract_ppt_data(pptx_path, version, data_list, manual_proj_name_value,
+                                       manual_proj_action_value, context=context)
+        if not export:
+            return result
+        return self.render(result, output_path, context)
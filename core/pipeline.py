@@ -0,0 +1,130 @@
+# 单次解析流水线的结果对象：read → extract → match → enrich → render
+# 每个阶段返回新的 ExtractionResult，后续阶段只消费上一阶段的结果，不再重新打开或解析PPT
+# 每次调用的状态（日志回调、总表、手动输入）放在 ProcessingContext 中，处理器本身不保存任何逐文件状态
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from collections.abc import Mapping as MappingABC
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from utils.logger import LOG_LEVELS
+
+STAGES = ("read", "extract", "match", "enrich", "render")
+UNMATCHED = "未匹配到"
+
+
+def _freeze(data: Optional[Mapping]) -> Mapping:
+    return MappingProxyType(dict(data or {}))
+
+
+def freeze(value: Any) -> Any:
+    """递归转换为只读结构：dict → MappingProxyType，list → tuple（用于多线程共享的配置）"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ProcessingContext:
+    """
+    单次处理调用的上下文（每个线程/请求各自创建，处理器实例可被多个线程共享）
+
+    Attributes:
+        data_list: 方案总表（行字典列表、ProjectIndex 或 ProjectIndexLoader）
+        manual_proj_name_value: 未匹配到总表时使用的工程名字
+        manual_proj_action_value: 未匹配到总表时使用的工程类型
+        version: 标题位置配置版本
+        log_callback: 接收日志文本的回调（如界面日志框），为 None 时只写日志文件
+        log_level: 输出到 log_callback 的最低日志等级
+    """
+    data_list: Any = None
+    manual_proj_name_value: Optional[str] = None
+    manual_proj_action_value: Optional[str] = None
+    version: str = "v1"
+    log_callback: Optional[Callable[[str], None]] = None
+    log_level: str = "INFO"
+
+    def emit(self, message: str, level: str = "INFO") -> None:
+        """按等级把日志转发给本次调用的回调"""
+        if self.log_callback and LOG_LEVELS[level] >= LOG_LEVELS.get(self.log_level, 20):
+            self.log_callback(f"[{level}] {message}")
+
+
+@dataclass(frozen=True, eq=False)
+class ExtractionResult(MappingABC):
+    """
+    一个PPT在流水线中的不可变结果
+
+    同时是 fields 的只读映射，兼容原先按字典使用提取结果的调用方（result.get("name") 等）。
+
+    Attributes:
+        pptx_path: PPT文件路径
+        version: 标题位置配置版本（如 "v1"）
+        stage: 已完成的阶段，取值见 STAGES
+        slides: read 阶段得到的页面字典（只读使用，不会被重新解析）
+        fields: 提取/匹配/补全后的字段，按写入顺序排列，即导出时使用的替换数据
+        matched_row: match 阶段在方案总表中匹配到的行，未匹配为 None
+    """
+    pptx_path: str
+    version: str = "v1"
+    stage: str = "read"
+    slides: Tuple[Dict, ...] = ()
+    fields: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    matched_row: Optional[Mapping[str, Any]] = None
+
+    def advance(self, stage: str, fields: Optional[Mapping] = None, **changes) -> "ExtractionResult":
+        """返回进入下一阶段的新结果（原对象不变）"""
+        if fields is not None:
+            changes["fields"] = _freeze(fields)
+        if changes.get("matched_row") is not None:
+            changes["matched_row"] = _freeze(changes["matched_row"])
+        return replace(self, stage=stage, **changes)
+
+    def __reduce__(self):
+        # MappingProxyType 不能直接序列化，跨进程传递时按普通字典重建
+        return (_restore_result, (self.pptx_path, self.version, self.stage, self.slides, dict(self.fields),
+                                  dict(self.matched_row) if self.matched_row is not None else None))
+
+    def has_reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """字段的可修改副本（导出器会在其中补充图片信息）"""
+        return dict(self.fields)
+
+    @property
+    def project_code(self) -> Optional[str]:
+        return self.fields.get("ProjectCode")
+
+    @property
+    def matched(self) -> bool:
+        return self.matched_row is not None and bool(self.matched_row.get("name"))
+
+    @property
+    def scheme_type(self) -> Optional[str]:
+        return self.matched_row.get("type") if self.matched_row else None
+
+    @property
+    def display_name(self) -> str:
+        """界面显示用的工程名字：匹配值，其次手动输入，否则“未匹配到”"""
+        return self.fields.get("name") or UNMATCHED
+
+    @property
+    def display_action(self) -> str:
+        """界面显示用的工程类型：匹配值，其次手动输入，否则“未匹配到”"""
+        return self.fields.get("Action") or UNMATCHED
+
+
+def _restore_result(pptx_path, version, stage, slides, fields, matched_row) -> ExtractionResult:
+    return ExtractionResult(pptx_path, version=version, stage=stage, slides=slides,
+                            fields=_freeze(fields), matched_row=_freeze(matched_row) if matched_row is not None else None)
@@ -0,0 +1,115 @@
+# 方案总表索引：ProjectCode → 行数据，支持后台加载与按需等待
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from config.loader import ConfigLoader
+from utils.logger import LoggerFactory
+
+
+class ProjectIndex:
+    """
+    方案总表索引（按 ProjectCode 建立，查找为 O(1)）
+
+    与原先逐行遍历 data_list 的匹配语义一致：ProjectCode 去除首尾空白后比较，重复时取第一行。
+    同时保留原始行列表，可迭代、可取长度，兼容仍按列表使用 data_list 的调用方。
+    构造后不可修改（行数据为只读映射），可在多个处理线程间直接共享。
+    """
+
+    def __init__(self, rows: Optional[List[Dict]] = None):
+        self._rows: Tuple[Mapping, ...] = tuple(MappingProxyType(dict(row)) for row in rows or [])
+        by_code: Dict[str, Mapping] = {}
+        for row in self._rows:
+            code = str(row.get("ProjectCode", "")).strip()
+            if code and code not in by_code:
+                by_code[code] = row
+        self._by_code = MappingProxyType(by_code)
+
+    def __reduce__(self):
+        # 只读映射不能直接序列化，传给子进程时按行字典重建索引
+        return (ProjectIndex, ([dict(row) for row in self._rows],))
+
+    def lookup(self, project_code) -> Optional[Mapping]:
+        """按 ProjectCode 查找行数据，未找到返回 None"""
+        if project_code is None:
+            return None
+        return self._by_code.get(str(project_code).strip())
+
+    @property
+    def rows(self) -> Tuple[Mapping, ...]:
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Mapping]:
+        return iter(self._rows)
+
+
+class ProjectIndexLoader:
+    """
+    方案总表加载器：在工作线程中读取总表，调用方只在真正需要匹配时才等待结果
+
+    典型用法（GUI）：
+        loader.begin()                        # 主线程标记为“加载中”
+        worker 线程中 loader.load(callback)   # 读取总表并发布索引
+        处理线程中 loader.wait()              # 仅在匹配时阻塞等待
+    """
+
+    IDLE, LOADING, READY, FAILED = "idle", "loading", "ready", "failed"
+
+    def __init__(self, config: ConfigLoader):
+        self.config = config
+        self.logger = LoggerFactory.create_logger("ProjectIndexLoader")
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._index = ProjectIndex()
+        self._state = self.IDLE
+        self._error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def begin(self) -> None:
+        """标记开始（重新）加载，此后 wait() 将阻塞到 load() 结束"""
+        with self._lock:
+            self._ready.clear()
+            self._state = self.LOADING
+            self._error = None
+
+    def load(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> ProjectIndex:
+        """
+        同步读取总表并发布索引（在工作线程中调用）；失败时发布空索引，不抛出异常
+
+        Args:
+            progress_callback: 进度回调 (已读取行数, 预计总行数)
+        """
+        from extractors.extrator_发包规范 import ExtractorExcel
+        if self._state != self.LOADING:
+            self.begin()
+        try:
+            extractor = ExtractorExcel(self.config)
+            try:
+                rows = extractor.extract(progress_callback=progress_callback)
+            finally:
+                extractor.close()
+            index, state, error = ProjectIndex(rows), self.READY, None
+            self.logger.info(f"成功读取Excel数据，共{len(rows)}行")
+        except Exception as e:
+            index, state, error = ProjectIndex(), self.FAILED, str(e)
+            self.logger.error(f"读取Excel失败: {e}")
+        with self._lock:
+            self._index, self._state, self._error = index, state, error
+            self._ready.set()
+        return index
+
+    def wait(self, timeout: Optional[float] = None) -> ProjectIndex:
+        """等待加载完成并返回索引；未开始加载时直接返回当前索引（可能为空）"""
+        if self._state != self.IDLE:
+            self._ready.wait(timeout)
+        return self._index
@@ -0,0 +1,105 @@
+# 字段规则诊断：在一批PPT上执行提取计划，逐条规则统计评估耗时、测试/命中的形状数与命中率，
+# 标记耗时过长、从未命中或所在页面从未找到的规则，供修改 filelds_config.yaml 前评估对批处理的影响
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from extractors.rule_engine import RulePlan, RuleStats
+from utils.logger import LoggerFactory
+
+RULE_FLAGS = ("slow", "never_matched", "page_not_found", "rejected")
+
+
+def _rule_report(entry: Dict, decks: int, slow_max_ms: float, slow_mean_ms: float,
+                 rejected: Optional[str] = None) -> Dict:
+    tests = entry["tests"]
+    mean_ms = entry["total_s"] * 1000 / tests if tests else 0.0
+    max_ms = entry["max_s"] * 1000
+    flags = []
+    if max_ms >= slow_max_ms or mean_ms >= slow_mean_ms:
+        flags.append("slow")
+    if rejected:
+        flags.append("rejected")
+    elif not entry["decks"]:
+        flags.append("page_not_found")
+    elif not entry["decks_matched"]:
+        flags.append("never_matched")
+    return {
+        "field": entry["field"],
+        "kind": entry["kind"],
+        "pattern": entry["pattern"],
+        "total_ms": round(entry["total_s"] * 1000, 3),
+        "max_ms": round(max_ms, 3),
+        "mean_us": round(mean_ms * 1000, 2),
+        "shapes_tested": tests,
+        "shapes_matched": entry["matches"],
+        "decks": entry["decks"],
+        "decks_matched": entry["decks_matched"],
+        "hit_rate": round(entry["decks_matched"] / entry["decks"], 3) if entry["decks"] else None,
+        "page_rate": round(entry["decks"] / decks, 3) if decks else None,
+        "flags": flags,
+        "rejected": rejected,
+    }
+
+
+def build_report(plan: RulePlan, stats: RuleStats, slow_max_ms: float = 10.0,
+                 slow_mean_ms: float = 1.0) -> Dict:
+    """
+    按规则汇总诊断结果（累计耗时从高到低排列）
+
+    Args:
+        plan: 提取计划，配置中的每条规则都会出现在报告中（从未评估过的规则标记为 page_not_found，
+              编译时因可能灾难性回溯而停用的规则标记为 rejected）
+        stats: RuleEngine 收集的统计
+        slow_max_ms: 单次评估超过该耗时的规则标记为 slow
+        slow_mean_ms: 平均每个形状的评估耗时超过该值的规则标记为 slow
+
+    Returns:
+        dict: {"decks", "rules": [...], "flagged": {标记: [字段名]}}
+    """
+    rules = [_rule_report(stats.get(rule), stats.decks, slow_max_ms, slow_mean_ms, plan.rejected.get(rule.field))
+             for rule in plan.rules()]
+    rules.sort(key=lambda item: item["total_ms"], reverse=True)
+    return {
+        "decks": stats.decks,
+        "thresholds": {"slow_max_ms": slow_max_ms, "slow_mean_ms": slow_mean_ms},
+        "rules": rules,
+        "flagged": {flag: [item["field"] for item in rules if flag in item["flags"]] for flag in RULE_FLAGS},
+    }
+
+
+def profile_rules(processor, pptx_paths: Iterable[str], slow_max_ms: float = 10.0, slow_mean_ms: float = 1.0,
+                  progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict:
+    """
+    逐个读取PPT并执行字段提取，返回规则诊断报告
+
+    只执行读取与提取阶段，不匹配总表、不导出图片与文档；计时包含每条规则对每个形状的完整匹配回调。
+
+    Args:
+        processor: PackingFileProcessor（使用其配置与读取阶段）
+        pptx_paths: 待诊断的PPT
+        progress_callback: 每处理完一个PPT调用一次 (已处理数, 路径)
+
+    Returns:
+        dict: build_report 的结果，另含 failures（读取失败的PPT）与 elapsed
+    """
+    from extractors.extrator_发包规范 import ExtractorA
+    logger = LoggerFactory.create_logger("RuleProfile")
+    stats = RuleStats()
+    failures: List[Dict] = []
+    start = time.perf_counter()
+    for count, pptx_path in enumerate(pptx_paths, 1):
+        try:
+            result = processor.read(pptx_path)
+        except Exception as e:
+            logger.warning(f"读取失败，跳过: {pptx_path}: {e}")
+            failures.append({"pptx": pptx_path, "error": str(e)})
+            continue
+        ExtractorA(list(result.slides), processor.config, rule_stats=stats).extract()
+        if progress_callback:
+            progress_callback(count, pptx_path)
+
+    fields_config = processor.config.config.get("FIELDS_CONFIG", {}).get("发包规范V1_PPT", {})
+    report = build_report(RulePlan.for_config(fields_config), stats, slow_max_ms, slow_mean_ms)
+    report["failures"] = failures
+    report["elapsed"] = round(time.perf_counter() - start, 3)
+    return report
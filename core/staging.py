@@ -0,0 +1,215 @@
+# PPT预读暂存：把网络共享上的PPT以大块顺序读取一次，解析与图片渲染都使用暂存的副本
+# python-pptx 通过 zipfile 对文件做大量小的随机读取，直接作用在 SMB 共享上很慢；
+# 暂存后解析从内存读取，COM 渲染使用本地临时文件，共享上的每个PPT只读一次。
+import io
+import os
+import uuid
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from utils.logger import LoggerFactory
+
+main_dir = Path(__file__).resolve().parent.parent  # 项目根目录
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class StagedDeck:
+    """
+    一个已暂存的PPT
+
+    小于字节预算的PPT保存在内存（data），超过预算的直接复制到本地临时文件；
+    local_path() 在首次需要文件路径（如 PowerPoint COM）时才把内存内容写到本地。
+    用完后必须调用 release()（或使用 with 语句）归还预算并删除临时文件。
+    """
+
+    def __init__(self, stager: "DeckStager", pptx_path: str, size: int,
+                 data: Optional[bytes] = None, scratch_path: Optional[str] = None):
+        self.pptx_path = pptx_path
+        self.size = size
+        self.data = data
+        self._stager = stager
+        self._scratch_path = scratch_path
+        self._lock = threading.Lock()
+        self._released = False
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+    def open(self):
+        """以二进制文件对象读取暂存内容（内存或本地临时文件）"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self._scratch_path, "rb")
+
+    def local_path(self) -> str:
+        """本地文件路径（内存暂存的PPT首次调用时写出到临时目录）"""
+        with self._lock:
+            if self._scratch_path is None:
+                self._scratch_path = self._stager._scratch_file(self.pptx_path)
+                with open(self._scratch_path, "wb") as f:
+                    f.write(self.data)
+            return self._scratch_path
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+            if self.data is not None:
+                self._stager._release(self.size)
+                self.data = None
+            if self._scratch_path:
+                try:
+                    os.remove(self._scratch_path)
+                except OSError:
+                    pass
+                self._scratch_path = None
+
+    def __enter__(self) -> "StagedDeck":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class DeckStager:
+    """
+    PPT预读器：按字节预算把即将处理的PPT读入内存
+
+    Args:
+        byte_budget: 同时暂存在内存中的PPT总字节数上限；单个PPT超过上限时改为复制到本地临时文件
+        lookahead: prefetch 时最多提前暂存的PPT数
+        scratch_dir: 本地临时目录（默认 <root>/.temp/staging）
+        chunk_size: 每次顺序读取的块大小
+    """
+
+    def __init__(self, byte_budget: int = 512 * 1024 * 1024, lookahead: int = 3,
+                 scratch_dir: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.byte_budget = max(1, int(byte_budget))
+        self.lookahead = max(1, int(lookahead))
+        self.scratch_dir = scratch_dir or os.path.join(main_dir, ".temp", "staging")
+        self.chunk_size = max(64 * 1024, int(chunk_size))
+        self.logger = LoggerFactory.create_logger("DeckStager")
+        self._used = 0
+        self._budget = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["DeckStager"]:
+        """按 app_settings.yaml 的 staging 配置创建，未启用时返回 None"""
+        cfg = config.get_staging_config()
+        if not cfg.get("enabled", True):
+            return None
+        scratch_dir = cfg.get("scratch_dir")
+        return cls(byte_budget=int(cfg.get("byte_budget_mb", 512)) * 1024 * 1024,
+                   lookahead=cfg.get("lookahead", 3),
+                   scratch_dir=os.path.join(main_dir, scratch_dir) if scratch_dir else None)
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used
+
+    def _acquire(self, size: int) -> None:
+        # 预算已被占满时等待前面的PPT处理完成；预算为空时总允许暂存一个，避免单个大文件永远等待
+        with self._budget:
+            while self._used and self._used + size > self.byte_budget:
+                self._budget.wait()
+            self._used += size
+
+    def _release(self, size: int) -> None:
+        with self._budget:
+            self._used -= size
+            self._budget.notify_all()
+
+    def _scratch_file(self, pptx_path: str) -> str:
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        return os.path.join(self.scratch_dir, f"{uuid.uuid4().hex}_{os.path.basename(pptx_path)}")
+
+    def stage(self, pptx_path: str) -> StagedDeck:
+        """
+        顺序读取一个PPT（预算不足时阻塞等待）
+
+        Returns:
+            StagedDeck: 调用方负责 release
+        """
+        size = os.path.getsize(pptx_path)
+        if size > self.byte_budget:
+            scratch_path = self._scratch_file(pptx_path)
+            with open(pptx_path, "rb") as src, open(scratch_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, self.chunk_size)
+            self.logger.debug(f"PPT超过暂存预算，复制到本地: {pptx_path} ({size} 字节)")
+            return StagedDeck(self, pptx_path, size, scratch_path=scratch_path)
+
+        self._acquire(size)
+        try:
+            chunks = []
+            with open(pptx_path, "rb", buffering=0) as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            data = b"".join(chunks)
+        except BaseException:
+            self._release(size)
+            raise
+        if len(data) != size:
+            # 读取期间文件大小变化（仍在写入），按实际读到的大小记账
+            with self._budget:
+                self._used += len(data) - size
+            size = len(data)
+        return StagedDeck(self, pptx_path, size, data=data)
+
+    def prefetch(self, pptx_paths: Iterable[str]) -> Iterator[Tuple[str, Optional[StagedDeck], Optional[Exception]]]:
+        """
+        后台线程按顺序提前暂存后续的PPT，最多领先 lookahead 个
+
+        Yields:
+            (pptx_path, staged, error)：暂存失败时 staged 为 None、error 为异常；
+            staged 由调用方在处理完后 release
+        """
+        pending: "queue.Queue" = queue.Queue(maxsize=self.lookahead)
+        stop = threading.Event()
+
+        def producer() -> None:
+            for path in pptx_paths:
+                if stop.is_set():
+                    break
+                try:
+                    item = (path, self.stage(path), None)
+                except Exception as e:
+                    item = (path, None, e)
+                while not stop.is_set():
+                    try:
+                        pending.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                else:
+                    if item[1] is not None:
+                        item[1].release()
+                    break
+            pending.put(None)
+
+        thread = threading.Thread(target=producer, name="deck-prefetch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            # 提前结束时释放已暂存但未取走的PPT
+            stop.set()
+            while thread.is_alive() or not pending.empty():
+                try:
+                    item = pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is not None and item[1] is not None:
+                    item[1].release()
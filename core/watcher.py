@@ -0,0 +1,326 @@
+# 监视模式：监控根目录下新增/修改的 v3 PPT，等待写入稳定后自动排队生成发包规范
+# Linux 本地文件系统使用 inotify，其余情况（Windows、网络共享挂载）退化为轮询
+import os
+import sys
+import time
+import queue
+import struct
+import select
+import zipfile
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import metrics
+from utils.logger import LoggerFactory
+from core.discovery import DeckDiscovery, scan_directory, is_excluded_dir
+from core.catalog import DirectoryCatalog
+
+# 网络文件系统上 inotify 收不到其他客户端的写入，必须轮询
+NETWORK_FS_TYPES = {"cifs", "smb3", "smbfs", "nfs", "nfs4", "fuse.sshfs", "9p", "afs"}
+FULL_RESCAN = None  # 后端返回该值表示需要全量重新扫描
+
+
+def _fs_type(path: str) -> Optional[str]:
+    """读取 /proc/mounts，返回路径所在挂载点的文件系统类型（非 Linux 返回 None）"""
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, best_type = "", None
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+            best, best_type = mount_point, fs_type
+    return best_type
+
+
+class PollingBackend:
+    """轮询后端：每个周期请求一次全量扫描（配合目录缓存，未变化目录仅 stat）"""
+    name = "poll"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def add_tree(self, root: str) -> None:
+        pass
+
+    def poll(self, stop_event: threading.Event):
+        stop_event.wait(self.interval)
+        return FULL_RESCAN
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyBackend:
+    """inotify 后端（ctypes 调用 libc，无第三方依赖），返回发生变化的目录集合"""
+    name = "inotify"
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, interval: float):
+        import ctypes
+        import ctypes.util
+        self.interval = interval
+        self.logger = LoggerFactory.create_logger("InotifyBackend")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._ctypes = ctypes
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._wd_to_dir: Dict[int, str] = {}
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            self.logger.warning(f"无法监视目录: {path} (errno {self._ctypes.get_errno()})")
+            return
+        self._wd_to_dir[wd] = path
+
+    def add_tree(self, root: str) -> None:
+        """为根目录及其所有未被剪枝的子目录添加监视"""
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            self._add_watch(path)
+            try:
+                subdirs, _, _ = scan_directory(path)
+            except OSError:
+                continue
+            stack.extend(subdirs)
+
+    def poll(self, stop_event: threading.Event):
+        """等待事件（最长一个周期），返回变化的目录集合；队列溢出时返回 FULL_RESCAN"""
+        readable, _, _ = select.select([self._fd], [], [], self.interval)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        dirty: Set[str] = set()
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0").decode(sys.getfilesystemencoding(), "replace")
+            offset += name_len
+            if mask & self.IN_Q_OVERFLOW:
+                return FULL_RESCAN
+            directory = self._wd_to_dir.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                continue
+            dirty.add(directory)
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO) and not is_excluded_dir(name):
+                # 新建/移入的子目录：添加监视，并把其中已存在的内容标记为变化
+                new_dir = os.path.join(directory, name)
+                self.add_tree(new_dir)
+                dirty.update(path for path in self._wd_to_dir.values()
+                             if path == new_dir or path.startswith(new_dir + os.sep))
+        return dirty
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_backend(roots: Iterable[str], backend: str, interval: float, logger=None):
+    """
+    创建监视后端
+
+    Args:
+        backend: "auto"（Linux 本地文件系统用 inotify，否则轮询）/ "inotify" / "poll"
+    """
+    if backend == "poll":
+        return PollingBackend(interval)
+    if backend == "auto":
+        if not sys.platform.startswith("linux"):
+            return PollingBackend(interval)
+        network = [r for r in roots if _fs_type(r) in NETWORK_FS_TYPES]
+        if network:
+            if logger:
+                logger.info(f"以下目录位于网络文件系统，使用轮询模式: {network}")
+            return PollingBackend(interval)
+    try:
+        return InotifyBackend(interval)
+    except (OSError, AttributeError) as e:
+        if backend == "inotify":
+            raise
+        if logger:
+            logger.warning(f"inotify 不可用，使用轮询模式: {e}")
+        return PollingBackend(interval)
+
+
+def is_deck_ready(pptx_path: str) -> bool:
+    """判断PPT是否已写完且未被占用：无 Office 锁文件、可以打开、zip 中央目录完整"""
+    directory, name = os.path.split(pptx_path)
+    for lock_name in ("~$" + name, "~$" + name[2:]):
+        if os.path.exists(os.path.join(directory, lock_name)):
+            return False
+    try:
+        # Windows 上文件仍被独占写入时打开会失败
+        with open(pptx_path, "rb"):
+            pass
+        return zipfile.is_zipfile(pptx_path)
+    except OSError:
+        return False
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DeckWatcher:
+    """
+    监视根目录，把新增或修改后稳定下来的 v3 PPT 交给 handler 处理
+
+    - 启动时记录现有PPT作为基线（process_existing=True 时同时排队处理）
+    - 文件大小/修改时间在 settle_seconds 内保持不变、且未被锁定时才排队，避免处理上传中的文件
+    - 同一PPT在排队或处理中再次变化时，处理结束后重新判断，不会并发处理同一文件
+    """
+
+    def __init__(self, roots: List[str], handler: Callable[[str], None], catalog: Optional[DirectoryCatalog] = None,
+                 backend: str = "auto", interval: float = 2.0, settle_seconds: float = 5.0,
+                 workers: int = 1, process_existing: bool = False):
+        self.roots = [os.path.normpath(r) for r in roots]
+        self.handler = handler
+        self.discovery = DeckDiscovery(catalog=catalog)
+        self.backend_name = backend
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.workers = max(1, workers)
+        self.process_existing = process_existing
+        self.logger = LoggerFactory.create_logger("DeckWatcher")
+        self._stop = threading.Event()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._best_by_dir: Dict[str, str] = {}
+        self._known: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._busy: Set[str] = set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _full_scan(self) -> None:
+        decks = self.discovery.discover(self.roots)
+        self._best_by_dir = {os.path.dirname(p): p for p in decks}
+
+    def _rescan_dirs(self, dirs: Set[str]) -> None:
+        for directory in dirs:
+            try:
+                _, best_name, _ = scan_directory(directory)
+            except OSError:
+                best_name = None
+            if best_name:
+                self._best_by_dir[directory] = os.path.join(directory, best_name)
+            else:
+                self._best_by_dir.pop(directory, None)
+
+    def _detect_changes(self, now: float) -> None:
+        """比较每个目录当前最高版本PPT的签名，变化的加入待稳定列表"""
+        for deck in self._best_by_dir.values():
+            signature = _signature(deck)
+            if signature is None or signature == self._known.get(deck):
+                continue
+            pending = self._pending.get(deck)
+            if pending is None or pending[0] != signature:
+                self._pending[deck] = (signature, now)
+
+    def _release_stable(self, now: float) -> None:
+        for deck, (signature, since) in list(self._pending.items()):
+            current = _signature(deck)
+            if current is None:
+                del self._pending[deck]
+                continue
+            if current != signature:
+                self._pending[deck] = (current, now)
+                continue
+            if now - since < self.settle_seconds or not is_deck_ready(deck):
+                continue
+            with self._lock:
+                if deck in self._busy:
+                    continue  # 处理中，等处理结束后再判断
+                self._busy.add(deck)
+            del self._pending[deck]
+            self._known[deck] = signature
+            self.logger.info(f"检测到PPT更新，加入处理队列: {deck}")
+            self._queue.put(deck)
+            metrics.QUEUE_DEPTH.set(self._queue.qsize(), queue="watch")
+        metrics.QUEUE_DEPTH.set(len(self._pending), queue="watch.settling")
+
+    def _worker(self) -> None:
+        while True:
+            deck = self._queue.get()
+            metrics.QUEUE_DEPTH.set(self._queue.qsize(), queue="watch")
+            if deck is None:
+                return
+            try:
+                with metrics.busy("watch"):
+                    self.handler(deck)
+            except Exception as e:
+                self.logger.error(f"处理 {deck} 失败: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._busy.discard(deck)
+
+    def run(self) -> None:
+        """阻塞运行，直到 stop() 被调用（或 KeyboardInterrupt）"""
+        backend = create_backend(self.roots, self.backend_name, self.interval, self.logger)
+        self.logger.info(f"开始监视 {self.roots}（{backend.name} 模式，稳定时间 {self.settle_seconds}s）")
+        for root in self.roots:
+            backend.add_tree(root)
+        self._full_scan()
+        now = time.monotonic()
+        for deck in self._best_by_dir.values():
+            if self.process_existing:
+                self._pending[deck] = (_signature(deck), now - self.settle_seconds)
+            else:
+                self._known[deck] = _signature(deck)
+
+        metrics.WORKERS.set(self.workers, pool="watch")
+        threads = [threading.Thread(target=self._worker, name=f"watch-worker-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self._stop.is_set():
+                self._release_stable(time.monotonic())
+                dirty = backend.poll(self._stop)
+                if dirty is FULL_RESCAN:
+                    self._full_scan()
+                elif dirty:
+                    self._rescan_dirs(dirty)
+                self._detect_changes(time.monotonic())
+        finally:
+            backend.close()
+            for _ in threads:
+                self._queue.put(None)
+            for thread in threads:
+                thread.join()
+            self.logger.info("监视已停止")
@@ -1 +1,8 @@
-# 依据模板文件，按照字典替代规则，导出二阶模组拆分明细表
\ No newline at end of file
+# 依据模板文件，按照字典替代规则，导出二阶模组拆分明细表
+from exporters.registry import TemplateReportExporter, register_exporter
+
+
+@register_exporter
+class ModuleSplitExporter(TemplateReportExporter):
+    """二阶模组拆分明细表（模板见 reports.templates.二阶模组拆分，未配置时跳过）"""
+    name = "二阶模组拆分"
@@ -1,13 +1,14 @@
-from docx import Document
-from docx.shared import Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+# python-docx / PIL / comtypes 均在首次使用时导入，避免拖慢GUI与CLI启动
 import os
+import shutil
+import tempfile
+import threading
 from pathlib import Path
-import comtypes.client
 import time
-from PIL import Image
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
+from utils import tracing
 from utils.logger import LoggerFactory, LOG_LEVELS
+from exporters.registry import ImageRenderCache, TemplateReportExporter, is_image_field, register_exporter
 # 获取当前文件的绝对路径的根目录
 current_file_path = Path(__file__).resolve()
 main_dir = current_file_path.parent.parent  # 项目根目录（ppt_processor/）
@@ -24,12 +25,15 @@ class ImageExporter:
         """
         self.logger = LoggerFactory.create_logger("ImageExporter")
         self.pptx_path = pptx_path
-        self.temp_dir = os.path.join(main_dir, ".temp")
+        # 每个导出器使用独立的临时子目录，多个线程同时导出时图片文件互不覆盖
+        self.temp_root = os.path.join(main_dir, ".temp")
         self._ensure_temp_dir()
+        self.temp_dir = tempfile.mkdtemp(prefix="export_", dir=self.temp_root)
         self.logger.debug(f"temp_dir: {self.temp_dir}")
         self.logger.debug(f"pptx_path: {self.pptx_path}")
         
-        # 初始化PowerPoint类型库
+        # 初始化PowerPoint类型库（comtypes 仅在选择 COM 渲染时导入，无界面/非 Windows 环境不依赖它）
+        import comtypes.client
         try:
             from comtypes.gen import PowerPoint
         except ImportError:
@@ -47,6 +51,19 @@ class ImageExporter:
             output_path: 图片保存路径
             region_cm: 区域坐标(left, top, width, height)，单位为厘米
         """
+        if not self.export_slide_image(slide_index, output_path):
+            return False
+        return self.crop_region(output_path, output_path, region_cm)
+
+    def export_slide_image(self, slide_index: int, output_path: str) -> bool:
+        """
+        通过 PowerPoint COM 导出整页图片
+
+        Args:
+            slide_index: 要导出的幻灯片索引(从1开始)
+            output_path: 图片保存路径
+        """
+        import comtypes.client
         powerpoint = None
         try:
             powerpoint = comtypes.client.CreateObject("PowerPoint.Application")
@@ -56,13 +73,36 @@ class ImageExporter:
             )
             
             # 导出完整幻灯片
-            temp_output = output_path
             slide = presentation.Slides[slide_index]
-            slide.Export(temp_output, "PNG")
+            slide.Export(output_path, "PNG")
             presentation.Close()
+            return True
             
-            # 裁剪指定区域
-            with Image.open(temp_output) as img:
+        except Exception as e:
+            print(f"Error exporting slide region: {e}")
+            return False
+        finally:
+            if powerpoint:
+                try:
+                    powerpoint.Quit()
+                    time.sleep(1)
+                except:
+                    pass
+
+    @staticmethod
+    def crop_region(image_path: str, output_path: str,
+                    region_cm: Tuple[float, float, float, float]) -> bool:
+        """
+        从整页图片中裁剪指定区域
+
+        Args:
+            image_path: 整页图片路径
+            output_path: 裁剪结果保存路径（可与 image_path 相同）
+            region_cm: 区域坐标(left, top, width, height)，单位为厘米
+        """
+        from PIL import Image
+        try:
+            with Image.open(image_path) as img:
                 # 将厘米转换为像素 (96 DPI)
                 left_cm, top_cm, width_cm, height_cm = region_cm
                 dpi = 96
@@ -79,37 +119,26 @@ class ImageExporter:
                     left_px + width_px, 
                     top_px + height_px
                 ))
-                cropped_img.save(output_path)
-            
+            cropped_img.save(output_path)
             return True
-            
         except Exception as e:
             print(f"Error exporting slide region: {e}")
             return False
-        finally:
-            if powerpoint:
-                try:
-                    powerpoint.Quit()
-                    time.sleep(1)
-                except:
-                    pass
 
     def _ensure_temp_dir(self):
-        if not os.path.exists(self.temp_dir):
-            os.makedirs(self.temp_dir)
+        os.makedirs(self.temp_root, exist_ok=True)
     
     def _clean_temp_files(self):
         # if self.logger.log_level < 20:
         #     if self.logger:
         #         self.logger.debug("DEBUG等级下，跳过临时文件删除。")
         #     return
-        for file in os.listdir(self.temp_dir):
-            file_path = os.path.join(self.temp_dir, file)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
+        try:
+            shutil.rmtree(self.temp_dir)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error deleting {self.temp_dir}: {e}")
 
     def export_images(self, extracted_data: Dict[str, Any]) -> Dict[str, str]:
         image_paths = {}
@@ -137,8 +166,10 @@ class DocxProcessor:
         self.logger = LoggerFactory.create_logger("DocxProcessor")
         
     def process_content(self, replacements: Dict[str, Any]) -> bool:
+        from docx import Document
         try:
-            self.doc = Document(self.docx_path)
+            with tracing.span("docx.load"):
+                self.doc = Document(self.docx_path)
             text_replacements = {}
             image_mappings = {}
             
@@ -149,18 +180,34 @@ class DocxProcessor:
                     text_replacements[key] = str(value)
             
             if text_replacements:
-                self._process_all_text(text_replacements)
+                with tracing.span("docx.substitute", fields=len(text_replacements)):
+                    self._process_all_text(text_replacements)
             
             if image_mappings:
-                self._insert_images(image_mappings)
+                with tracing.span("docx.images", images=len(image_mappings)):
+                    self._insert_images(image_mappings)
             
-            self.doc.save(self.output_path)
+            with tracing.span("docx.save"):
+                self._save_atomic()
             return True
             
         except Exception as e:
             print(f"Error processing document: {e}")
             return False
 
+    def _save_atomic(self) -> None:
+        """先写入同目录下的临时文件再替换，进程中途退出时不会留下写了一半的文档"""
+        temp_path = f"{self.output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.doc.save(temp_path)
+            os.replace(temp_path, self.output_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
     def _process_all_text(self, replacements: Dict[str, str]) -> None:
         for section in self.doc.sections:
             for para in section.header.paragraphs:
@@ -180,10 +227,16 @@ class DocxProcessor:
 
     def _replace_keywords_in_paragraph(self, para, replacements: Dict[str, str]) -> None:
         for run in para.runs:
+            # run.text 每次读取都要遍历XML，只读一次，全部替换完成后再写回
+            text = run.text
+            replaced = False
             for key, value in replacements.items():
                 # 只有value非空才替换
-                if key in run.text and value not in [None, ""]:
-                    run.text = run.text.replace(key, str(value))
+                if key in text and value not in [None, ""]:
+                    text = text.replace(key, str(value))
+                    replaced = True
+            if replaced:
+                run.text = text
 
     def _replace_keywords_in_table(self, table, replacements: Dict[str, str]) -> None:
         for row in table.rows:
@@ -194,6 +247,8 @@ class DocxProcessor:
                     self._replace_keywords_in_table(nested_table, replacements)
     
     def _insert_images(self, image_mappings: Dict[str, Dict]) -> None:
+        from docx.shared import Cm
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
         found_markers = set()
         
         for paragraph in self.doc.paragraphs:
@@ -220,23 +275,38 @@ class DocxProcessor:
 
 class ExporterA:
     """发包规范导出器"""
-    def __init__(self, pptx_path: str, docx_template_path: str, output_path: str):
+    def __init__(self, pptx_path: str, docx_template_path: str, output_path: str, render_images: bool = True,
+                 image_cache: Optional[ImageRenderCache] = None):
+        """
+        Args:
+            render_images: 是否通过 PowerPoint COM 导出图片；为 False 时跳过图片字段（无界面/非 Windows 环境）
+            image_cache: 同一PPT多个报表共享的图片缓存，由调用方负责关闭；为 None 时本导出器自建并在结束后清理
+        """
         self.logger = LoggerFactory.create_logger("Exporter发包规范")
         self.logger.info("初始化导出器")
         self.output_path = output_path
-        self.image_exporter = ImageExporter(pptx_path)
+        self._owns_cache = render_images and image_cache is None
+        if not render_images:
+            image_cache = None
+        elif image_cache is None:
+            image_cache = ImageRenderCache(pptx_path)
+        self.image_cache = image_cache
         self.docx_processor = DocxProcessor(docx_template_path, self.output_path)
         self.logger.debug("pptx_path: %s", pptx_path)
         self.logger.debug("output_path: %s", output_path)
         self.logger.debug("docx_template_path: %s", docx_template_path)
 
+    def _release_cache(self):
+        if self._owns_cache:
+            self.image_cache.close()
+
     def process(self, result_data: Dict[str, Any]) -> bool:
         try:
             self.logger.info("开始处理文档")
             
-            # 1. 导出图片到临时目录
+            # 1. 导出图片到临时目录（同页只导出一次整页图片）
             self.logger.debug("导出图片到临时目录")
-            image_paths = self.image_exporter.export_images(result_data)
+            image_paths = self.image_cache.export_images(result_data) if self.image_cache else {}
             
             # 2. 将图片和文本内容插入到文档
             self.logger.debug("处理替换内容")
@@ -244,7 +314,7 @@ class ExporterA:
             # 添加非图片字段
             replacements.update({
                 k: v for k, v in result_data.items() 
-                if not (isinstance(v, dict) and 'box' in v and 'page_number' in v)
+                if not is_image_field(v)
             })
             # 添加图片字段，使用shape中的宽度
             replacements.update({
@@ -255,18 +325,30 @@ class ExporterA:
                 for k, path in image_paths.items()
             })
             
-            self.docx_processor.process_content(replacements)
+            if not self.docx_processor.process_content(replacements):
+                self.logger.error(f"文档写入失败: {self.output_path}")
+                return False
             
             self.logger.info(f"文档生成成功: {self.output_path}")
-            # 3. 清理临时文件
-            self.image_exporter._clean_temp_files()
-            
             return True
             
         except Exception as e:
             self.logger.error(f"处理文档时出错: {e}", exc_info=True)
-            self.image_exporter._clean_temp_files()
             return False
+        finally:
+            # 3. 清理临时文件（共享缓存由调用方清理）
+            self._release_cache()
+
+
+@register_exporter
+class PackingSpecExporter(TemplateReportExporter):
+    """发包规范报表（模板为 templates.docx）"""
+    name = "发包规范"
+
+    def is_available(self) -> bool:
+        # 主报表始终导出，模板缺失时在写入阶段报错
+        return True
+
 
 if __name__ == "__main__":
     # 使用示例
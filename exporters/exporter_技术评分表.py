@@ -1 +1,8 @@
-# 依据模板文件，按照字典替代规则，导出二阶模组拆分明细表
\ No newline at end of file
+# 依据模板文件，按照字典替代规则，导出技术评分表
+from exporters.registry import TemplateReportExporter, register_exporter
+
+
+@register_exporter
+class TechScoreExporter(TemplateReportExporter):
+    """技术评分表报表（模板见 reports.templates.技术评分表，未配置时跳过）"""
+    name = "技术评分表"
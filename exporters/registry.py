@@ -0,0 +1,206 @@
+# 报表导出器注册表：同一个PPT只解析、提取一次，启用的各类报表（发包规范 / 技术评分表 / 二阶模组拆分）
+# 都从同一个 ExtractionResult 渲染，图片区域通过 ImageRenderCache 在报表之间共享，每页只导出一次
+import os
+import re
+import threading
+import importlib
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from utils import metrics, tracing
+from utils.logger import LoggerFactory
+
+# 内置报表模块，首次查询注册表时导入（模块导入时通过 register_exporter 注册自身）
+BUILTIN_EXPORTER_MODULES = (
+    "exporters.exporter_发包规范",
+    "exporters.exporter_技术评分表",
+    "exporters.exporter_二阶模组拆分",
+)
+DEFAULT_REPORTS = ("发包规范",)
+
+_EXPORTERS: Dict[str, Type["ReportExporter"]] = {}
+_builtin_lock = threading.Lock()
+_builtin_loaded = False
+
+
+def register_exporter(cls: Type["ReportExporter"]) -> Type["ReportExporter"]:
+    """类装饰器：按 cls.name 注册报表导出器（同名后注册的覆盖先注册的）"""
+    if not cls.name:
+        raise ValueError(f"报表导出器 {cls.__name__} 未设置 name")
+    _EXPORTERS[cls.name] = cls
+    return cls
+
+
+def _load_builtin_exporters() -> None:
+    global _builtin_loaded
+    with _builtin_lock:
+        if _builtin_loaded:
+            return
+        for module_name in BUILTIN_EXPORTER_MODULES:
+            importlib.import_module(module_name)
+        _builtin_loaded = True
+
+
+def available_reports() -> List[str]:
+    """已注册的报表名称（按注册顺序）"""
+    _load_builtin_exporters()
+    return list(_EXPORTERS)
+
+
+def get_exporter_class(name: str) -> Type["ReportExporter"]:
+    _load_builtin_exporters()
+    try:
+        return _EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f"未知的报表类型: {name}，可选: {', '.join(_EXPORTERS)}") from None
+
+
+def report_filename(ppt_path: str, report_name: str) -> str:
+    """根据PPT文件名生成报表文档名（取 V3 前面的字符串作为前缀）"""
+    base_name = os.path.splitext(os.path.basename(ppt_path))[0]
+    match = re.search(r'^(.*?)[vV]3', base_name)
+    prefix = match.group(1).strip('_') if match else base_name
+    return f"{prefix}_v1_{report_name}.docx"
+
+
+def is_image_field(value: Any) -> bool:
+    """提取结果中需要渲染为图片的字段（带 box 与 page_number 的形状字典）"""
+    return isinstance(value, dict) and "box" in value and "page_number" in value
+
+
+class ImageRenderCache:
+    """
+    单个PPT的图片渲染缓存，由同一PPT的所有报表共享
+
+    每页整页图片只通过 PowerPoint COM 导出一次，每个 (页码, 区域) 只裁剪一次；
+    多个报表线程同时请求时，COM 导出串行执行，结果供其余线程直接复用。
+    用完后调用 close()（或使用 with 语句）删除临时目录。
+    """
+
+    def __init__(self, pptx_path: str, staged=None):
+        """
+        Args:
+            pptx_path: PPT文件路径
+            staged: 已暂存的PPT（core.staging.StagedDeck），传入时 COM 打开本地暂存副本而不是原文件
+        """
+        self.pptx_path = pptx_path
+        self.staged = staged
+        self.logger = LoggerFactory.create_logger("ImageRenderCache")
+        self._lock = threading.Lock()
+        self._image_exporter = None
+        self._slides: Dict[int, Optional[str]] = {}
+        self._regions: Dict[Tuple[int, Tuple[float, ...]], Optional[str]] = {}
+        self.renders = 0  # 实际执行的整页导出次数
+
+    @property
+    def temp_dir(self) -> Optional[str]:
+        return self._image_exporter.temp_dir if self._image_exporter else None
+
+    def _slide_image(self, page_number: int) -> Optional[str]:
+        if page_number not in self._slides:
+            if self._image_exporter is None:
+                from exporters.exporter_发包规范 import ImageExporter
+                source_path = self.staged.local_path() if self.staged is not None else self.pptx_path
+                self._image_exporter = ImageExporter(source_path)
+            path = os.path.join(self._image_exporter.temp_dir, f"slide_{page_number}.png")
+            self.renders += 1
+            with tracing.span("image.export_slide", page=page_number), metrics.timed(metrics.SLIDE_RENDER_SECONDS):
+                ok = self._image_exporter.export_slide_image(page_number, path)
+            self._slides[page_number] = path if ok else None
+        return self._slides[page_number]
+
+    def region(self, page_number: int, box) -> Optional[str]:
+        """
+        返回指定页面区域的图片路径
+
+        Args:
+            page_number: 页码（从1开始）
+            box: 区域坐标(left, top, width, height)，单位为厘米
+
+        Returns:
+            图片路径，导出失败时为 None
+        """
+        key = (page_number, tuple(box))
+        with self._lock:
+            metrics.cache_hit("image_region", key in self._regions)
+            if key not in self._regions:
+                from exporters.exporter_发包规范 import ImageExporter
+                with tracing.span("image.region", page=page_number, box=list(key[1])):
+                    slide_path = self._slide_image(page_number)
+                    path = None
+                    if slide_path:
+                        path = os.path.join(self.temp_dir, f"region_{len(self._regions)}.png")
+                        if not ImageExporter.crop_region(slide_path, path, key[1]):
+                            path = None
+                self._regions[key] = path
+            return self._regions[key]
+
+    def export_images(self, extracted_data: Dict[str, Any]) -> Dict[str, str]:
+        """导出提取结果中所有图片字段，返回 {字段名: 图片路径}"""
+        image_paths = {}
+        for field_name, data in extracted_data.items():
+            if is_image_field(data):
+                path = self.region(data["page_number"], data["box"])
+                if path:
+                    image_paths[field_name] = path
+                else:
+                    self.logger.warning(f"图片导出失败: {field_name}")
+        return image_paths
+
+    def close(self) -> None:
+        with self._lock:
+            if self._image_exporter is not None:
+                self._image_exporter._clean_temp_files()
+            self._slides.clear()
+            self._regions.clear()
+
+    def __enter__(self) -> "ImageRenderCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReportExporter:
+    """
+    报表导出器基类
+
+    子类设置 name 并用 @register_exporter 注册；render 只消费已补全的 ExtractionResult，
+    不重新读取PPT。实例只持有只读配置，可被多个线程共享。
+    """
+    name = ""
+
+    def __init__(self, config, render_images: bool = True):
+        """
+        Args:
+            config: 配置加载器
+            render_images: 是否导出图片字段；为 False 时跳过图片（无界面/非 Windows 环境）
+        """
+        self.config = config
+        self.render_images = render_images
+
+    def is_available(self) -> bool:
+        """是否具备导出条件（如模板已配置）"""
+        return True
+
+    def get_output_filename(self, ppt_path: str) -> str:
+        return report_filename(ppt_path, self.name)
+
+    def render(self, result, output_path: str, image_cache: Optional[ImageRenderCache] = None) -> bool:
+        raise NotImplementedError
+
+
+class TemplateReportExporter(ReportExporter):
+    """按docx模板与字段替换规则导出的报表（模板路径见 config.get_report_template_path）"""
+
+    def get_template_path(self) -> str:
+        return self.config.get_report_template_path(self.name)
+
+    def is_available(self) -> bool:
+        template_path = self.get_template_path()
+        return bool(template_path) and os.path.isfile(template_path)
+
+    def render(self, result, output_path: str, image_cache: Optional[ImageRenderCache] = None) -> bool:
+        from exporters.exporter_发包规范 import ExporterA
+        exporter = ExporterA(result.pptx_path, self.get_template_path(), output_path,
+                             render_images=self.render_images, image_cache=image_cache)
+        return exporter.process(result.to_dict())
@@ -1,23 +1,23 @@
 # src/office_ops/ppt_processor/extractors/extractor_a.py
 # 实现需求A：提取指定页面的标题等字段并导出为 发包规范
 import os
-import yaml
 import re
 import math
 from os import path
 from typing import List, Dict
 from extractors.base_extrator import BaseExtractor
+from extractors.rule_engine import RuleEngine, RulePlan, RuleStats, TextIndex, TextRule
+from extractors.regex_guard import GuardedPattern, RegexBudgetExceeded
 from content_models import Slide, calculate_iou
 from utils.text_utils import split_after_colon  # 确保已导入
 from utils.logger import LoggerFactory, LOG_LEVELS
 from config.loader import ConfigLoader
 from pathlib import Path
-from openpyxl import load_workbook
-from openpyxl.utils.exceptions import InvalidFileException
-from openpyxl.worksheet.worksheet import Worksheet  # 新增：导入 Worksheet 类
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union, TYPE_CHECKING
 from utils.exceptions import *
 
+if TYPE_CHECKING:
+    from openpyxl.worksheet.worksheet import Worksheet
 
 
 class ExtractorExcel(BaseExtractor):
@@ -64,8 +64,8 @@ class ExtractorExcel(BaseExtractor):
         self.logger = LoggerFactory.create_logger("ExtractorExcel")
         self.logger.debug(f"excel file path: {self.file_path}")
         # 初始化工作簿和工作表（延迟加载，避免重复打开）
-        self.wb: Optional[load_workbook] = None
-        self.ws: Optional[Worksheet] = None
+        self.wb = None
+        self.ws: Optional["Worksheet"] = None
 
         # 初始化标题相关属性
         self.header_row: List[Optional[str]] = []
@@ -73,6 +73,9 @@ class ExtractorExcel(BaseExtractor):
 
     def _load_workbook(self) -> None:
         """私有方法：加载工作簿（仅在首次使用时打开）"""
+        # openpyxl 在首次读取总表时才导入
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
         if self.wb is None:
             try:
                 if not path.exists(self.file_path):
@@ -121,7 +124,7 @@ class ExtractorExcel(BaseExtractor):
 
     def _read_header(self) -> None:
         """私有方法：读取标题行并用正则规则替换为标准key"""
-        if not isinstance(self.ws, Worksheet):
+        if self.ws is None:
             self._load_worksheet()  # 确保工作表已加载
 
         max_row = self.ws.max_row
@@ -244,16 +247,22 @@ class ExtractorExcel(BaseExtractor):
         """上下文管理器：退出时自动关闭工作簿"""
         self.close()
 
-    def extract(self) -> List[Dict]:
+    def extract(self, progress_callback=None, progress_step: int = 200) -> List[Dict]:
         """
         结构化返回所有数据行，每行一个dict，header为key，数据为value
+
+        参数:
+            progress_callback: 可选进度回调 (已读取行数, 预计总行数)，每 progress_step 行及结束时调用
         """
         self._load_worksheet()
         self._read_header()
         start_row = self.header_row_num + 1
+        total = max(0, (self.ws.max_row or 0) - self.header_row_num)
         result = []
-        for row in self.ws.iter_rows(min_row=start_row, values_only=True):
-            print(row)  
+        row_count = 0
+        for row_count, row in enumerate(self.ws.iter_rows(min_row=start_row, values_only=True), start=1):
+            if progress_callback and row_count % progress_step == 0:
+                progress_callback(row_count, max(total, row_count))
             # 跳过空行
             if all(cell is None for cell in row):
                 continue
@@ -263,12 +272,24 @@ class ExtractorExcel(BaseExtractor):
                 for i in range(len(self.header_row))
             }
             result.append(row_dict)
+        if progress_callback:
+            progress_callback(row_count, row_count)
         return result
 
 
 class ExtractorA(BaseExtractor):
     """需求A提取器（支持多类型 shape 提取）"""
-    def __init__(self, slides: List[Slide], config_loader: ConfigLoader = None):
+    # match_rule → 查找目标形状的方向
+    DIRECTION_MAP = {1: "down", 2: "left", 3: "up", 4: "right"}
+
+    def __init__(self, slides: List[Slide], config_loader: ConfigLoader = None,
+                 rule_stats: Optional[RuleStats] = None):
+        """
+        Args:
+            slides: 页面字典列表
+            config_loader: 配置加载器
+            rule_stats: 传入时逐条规则统计评估耗时与命中情况（规则诊断，见 core/rule_profile.py）
+        """
         self.logger = LoggerFactory.create_logger("Extractor_发包规范")
         self.logger.info("初始化提取器")
         super().__init__(slides)
@@ -280,6 +301,13 @@ class ExtractorA(BaseExtractor):
 
         if not self.config:
             self.logger.warning("未找到发包规范V1_PPT的配置")
+        # 幻灯片 → {父级 index: 同级形状}，近邻查找时按需建立
+        self._sibling_index: Dict[int, Dict[Optional[int], List[Dict]]] = {}
+        self.rule_stats = rule_stats
+        # 本PPT中匹配超出时间预算的字段：不再用于后续形状，字段留空
+        self._over_budget: Dict[str, str] = {}
+        # 形状文本的简体形式（normalize_text 的规则使用），每个形状只转换一次
+        self._texts = TextIndex()
 
 
     def _calc_utilization_rate(self, failure_rate: str) -> str:
@@ -300,63 +328,10 @@ class ExtractorA(BaseExtractor):
     def extract(self) -> Dict:
         self.logger.info("excel 开始提取内容")
         try:
-            flat_result = {}
-
-            # 处理 master 字段（用 master_shapes 匹配）
-            master_cfg = self.config.get("master", {})
-            if master_cfg:
-                pos_dict = master_cfg.get("iou", {})
-                iou_threshold = master_cfg.get("iou_threshold", 0.1)
-                for key, position in pos_dict.items():
-                    if len(position) < 4:
-                        self.logger.error(f"position of ProjectCode is empty, please check the fields_config.yaml")
-                        raise ValueError("position of ProjectCode is empty, please check the fields_config.yaml")
-                    # 遍历所有 slide，查找 master_shapes
-                    for slide in self.slides:
-                        for shape in slide.get("master_shapes", []):
-                            iou = calculate_iou(shape["box"], position)
-                            self.logger.debug(f"匹配 master 字段 {key}，计算 IOU: {iou:.2f}")
-                            if iou > iou_threshold:
-                                # 只取第一个匹配
-                                flat_result[key] = shape.get("text", "")
-                                break
-
-            # 按 page 定位
-            for page_num, page_cfg in self.config.get("page", {}).items():
-                slide = self._get_slide_by_page(int(page_num))
-                if not slide:
-                    continue
-                for field, iou_cfg in page_cfg.get("iou", {}).items():
-                    box = iou_cfg.get("box")
-                    need_split = iou_cfg.get("need_split")
-                    storage_vars = iou_cfg.get("storage_var")
-                    # IOU 匹配 shape
-                    for shape in slide["shapes"]:
-                        iou = calculate_iou(shape["box"], box)
-                        if iou > 0.3:
-                            text = shape.get("text", "")
-                            if need_split and isinstance(storage_vars, list):
-                                parts = text.split(need_split)
-                                for idx, var in enumerate(storage_vars):
-                                    if var and idx < len(parts):
-                                        flat_result[var] = parts[idx]
-                            else:
-                                flat_result[field] = text
-                            break
-
-            # 按 title 定位
-            for title_cfg in self.config.get("title", []):
-                slide = self._get_slide_by_title(title_cfg["first"], title_cfg.get("second", ""))
-                if not slide:
-                    continue
-                # re 匹配文本字段
-                for field, field_cfg in title_cfg.get("re", {}).items():
-                    storage_var = field
-                    flat_result[storage_var] = self._extract_text_by_re(slide, field, field_cfg)
-                # table 匹配表格字段
-                for field, field_cfg in title_cfg.get("table", {}).items():
-                    storage_var = field
-                    flat_result[storage_var] = self._extract_table_last_row(slide, field_cfg["match_key_string"])
+            # 规则按配置编译一次；每页形状只遍历一次，master → page → title 的写入顺序保持不变
+            plan = RulePlan.for_config(self.config)
+            flat_result = RuleEngine(plan, self._match_text_rule, self._flat_shapes, self.logger,
+                                     self.rule_stats).run(self.slides)
 
             # 自动补充 dev_utilization_rate 字段
             failure_rate = flat_result.get("dev_failure_rate", "")
@@ -368,6 +343,27 @@ class ExtractorA(BaseExtractor):
         except Exception as e:
             self.logger.error(f"提取内容时出错: {str(e)}", exc_info=True)
 
+    def _match_text_rule(self, shape, rule: TextRule, slide):
+        """规则引擎的文本匹配回调（与 _extract_text_by_re 对单个形状的处理相同）"""
+        if rule.field in self._over_budget:
+            return None
+        search_text = self._texts.simplified(shape) if rule.normalize else None
+        try:
+            return self._process_single_shape(shape, rule.pattern, rule.match_rule,
+                                              slide, slide["page_number"], self.DIRECTION_MAP, search_text)
+        except RegexBudgetExceeded as e:
+            self._over_budget[rule.field] = str(e)
+            self.logger.error(f"{e}，字段 {rule.field} 留空（第 {slide['page_number']} 页）")
+            return None
+
+    @staticmethod
+    def _search(re_rule, text: str) -> Optional[Tuple[int, int]]:
+        """按规则查找第一个匹配的区间；规则计划中的 GuardedPattern 带有长度与时间限制"""
+        if isinstance(re_rule, GuardedPattern):
+            return re_rule.search(text)
+        match = re.search(re_rule, text)
+        return match.span() if match else None
+
     def _get_slide_by_page(self, page_number: int):
         for slide in self.slides:
             if slide["page_number"] == page_number:
@@ -386,7 +382,7 @@ class ExtractorA(BaseExtractor):
         position: (left, top, width, height)
         """
         iou_threshold = 0.3  # 可根据实际情况调整
-        for shape in slide["shapes"]:
+        for shape in self._flat_shapes(slide):
             iou = calculate_iou(shape["box"], position)
             if iou > iou_threshold:
                 if shape["type"] == "TextBox" or shape["type"] == "文本框" or shape["type"] == "矩形":
@@ -410,69 +406,64 @@ class ExtractorA(BaseExtractor):
         """
         match_rule = field_cfg.get("match_rule", 0)
         re_rule = field_cfg.get("re_rule", "")
-        shapes = slide["shapes"]
-        direction_map = {1: "down", 2: "left", 3: "up", 4: "right"}
+        direction_map = self.DIRECTION_MAP
 
-        # 遍历所有shape
-        for shape in shapes:
-            # 处理群组
-            if shape["type"] == "Group":
-                result = self._process_group_shape(
-                    shape, re_rule, match_rule, 
-                    slide["page_number"], direction_map
-                )
-                if result:
-                    return result
-                    
-            # 处理独立文本框
-            elif shape["type"] in ["文本框", "矩形"]:
+        # 按先序遍历展开后的形状（群组内的文本框紧跟在群组之后，与逐层遍历的顺序一致）
+        for shape in self._flat_shapes(slide):
+            if shape["type"] in ["文本框", "矩形"]:
                 result = self._process_single_shape(
                     shape, re_rule, match_rule,
-                    shapes, slide["page_number"], direction_map
+                    slide, slide["page_number"], direction_map
                 )
                 if result:
                     return result
 
         return None
 
-    def _process_group_shape(self, group, re_rule, match_rule, page_number, direction_map):
-        """处理群组内的shape"""
-        for sub_shape in group["shapes"]:
-            if sub_shape["type"] in ["文本框", "矩形"]:
-                text = sub_shape.get("text", "")
-                if re_rule and re.search(re_rule, text):
-                    if match_rule > 0:
-                        if match_rule == 5:
-                            # 返回当前sub_shape本身和页码
-                            sub_shape["page_number"] = page_number
-                            return sub_shape
-                        else:
-                            # 原有的群组内搜索逻辑
-                            for target in group["shapes"]:
-                                if target["type"] in ["Image", "CustomShape", "Group", "矩形"]:
-                                    target["page_number"] = page_number
-                                    return target
-                    elif match_rule == 0:
-                        # 清理文本前后的空白字符
-                        return text.strip() if text else ""
-                    elif match_rule == -1:
-                        _text = self._extract_value_after_colon(text, re_rule)
-                        return _text.strip() if _text else ""
-        return None
+    @staticmethod
+    def _flat_shapes(slide) -> List[Dict]:
+        """幻灯片展开后的形状列表（兼容没有 flat_shapes 的旧结构）"""
+        return slide.get("flat_shapes") or slide["shapes"]
+
+    def _siblings(self, slide, shape) -> List[Dict]:
+        """与 shape 同属一个父级的形状（顶层形状的兄弟即所有顶层形状），按 parent 分组后缓存"""
+        groups = self._sibling_index.get(id(slide))
+        if groups is None:
+            groups = {}
+            for item in self._flat_shapes(slide):
+                groups.setdefault(item.get("parent"), []).append(item)
+            self._sibling_index[id(slide)] = groups
+        return groups.get(shape.get("parent"), [])
+
+    def _process_single_shape(self, shape, re_rule, match_rule, slide, page_number, direction_map,
+                              search_text: Optional[str] = None):
+        """
+        处理文本框（顶层或群组内）
 
-    def _process_single_shape(self, shape, re_rule, match_rule, all_shapes, page_number, direction_map):
-        """处理单独的文本框"""
+        Args:
+            search_text: 代替原文参与匹配的文本（如简体形式）；返回的文本仍取自原文
+        """
         text = shape.get("text", "")
-        if re_rule and re.search(re_rule, text):
+        if search_text is None:
+            search_text = text
+        span = self._search(re_rule, search_text) if re_rule else None
+        if span:
             if match_rule > 0:
                 if match_rule == 5:
                     # 返回当前shape本身和页码
                     shape["page_number"] = page_number
                     return shape
+                siblings = self._siblings(slide, shape)
+                if shape.get("parent") is not None:
+                    # 群组内：返回同一群组中的第一个图片/形状
+                    for target in siblings:
+                        if target["type"] in ["Image", "CustomShape", "Group", "矩形"]:
+                            target["page_number"] = page_number
+                            return target
                 else:
-                    # 原有的近邻搜索逻辑
+                    # 顶层：在顶层形状中按方向查找最近的目标
                     direction = direction_map.get(match_rule, "down")
-                    target = self._find_nearest_shape(shape, all_shapes, direction)
+                    target = self._find_nearest_shape(shape, siblings, direction)
                     if target:
                         target["page_number"] = page_number
                         return target
@@ -480,17 +471,17 @@ class ExtractorA(BaseExtractor):
                 # 清理文本前后的空白字符
                 return text.strip() if text else ""
             elif match_rule == -1:
-                _text = self._extract_value_after_colon(text, re_rule)
+                # 复用上面的匹配区间，不再对同一文本重复执行规则；简体与原文逐字对应，取原文中的同一区间
+                source = text if len(search_text) == len(text) else search_text
+                _text = split_after_colon(source[span[0]:span[1]]) or ""
                 return _text.strip() if _text else ""
         return None
 
     def _extract_value_after_colon(self, text: str, re_rule: str) -> str:
         """提取冒号后的值"""
-        regex = re.compile(re_rule)
-        match = regex.search(text)
-        if match and len(match.regs) > 0:
-            temp = text[match.regs[0][0]:match.regs[0][1]]
-            return split_after_colon(temp) or ""
+        span = self._search(re_rule, text)
+        if span:
+            return split_after_colon(text[span[0]:span[1]]) or ""
         return ""
 
     def _find_nearest_shape(self, ref_shape, shapes, direction="down"):
@@ -525,7 +516,7 @@ class ExtractorA(BaseExtractor):
         return nearest
 
     def _extract_table_last_row(self, slide, field_name):
-        for shape in slide["shapes"]:
+        for shape in self._flat_shapes(slide):
             if shape["type"] == "Table":
                 return shape["last_row"].get(field_name, "")
         return None
@@ -0,0 +1,355 @@
+# 限时的正则匹配：防止个别异常文本框配合回溯严重的规则卡住整批处理
+# - 编译规则时拒绝嵌套的无界量词（如 (\d+\s*)*、(.*)+），这类模式在不匹配的长文本上呈指数级回溯；
+#   同一序列中超过 MAX_WILDCARDS 个依次回溯的无界通配量词（如 机台.*[:：].*人.*/.*机）也拒绝，回溯步数为文本长度的高次方
+# - 参与匹配的文本按规则截断到 max_chars
+# - 每条规则按通配量词个数估算最坏回溯步数（约为文本长度的 degree 次方；与其后分隔符互斥的 [^:：\n]*[:：] 只扫描一遍），
+#   估算不超过 inline_steps 的文本在当前线程匹配；更长的文本在子进程中匹配，超过 budget_ms 时终止该子进程，
+#   字段留空并记录日志（re 模块的匹配无法在线程内中断）。子进程组成小型进程池，各解析线程的长文本匹配互不等待；
+#   批处理的多进程 worker 各只用一个子进程（configure_workers），批处理结束与进程退出时终止空闲的子进程
+import os
+import re
+import atexit
+import time
+import threading
+import multiprocessing
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple, Union
+
+from utils import metrics
+from utils.logger import LoggerFactory
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+_REPEATS = ("MAX_REPEAT", "MIN_REPEAT")
+# 超过该次数上限的量词按无界处理（如 {0,10000}）
+_UNBOUNDED_MIN = 100
+# 同一序列中允许依次回溯的无界通配量词（.* / .+ / [^x]* / \S+ 等，与其后分隔符互斥的不计入）个数
+MAX_WILDCARDS = 2
+
+
+@dataclass(frozen=True)
+class RegexLimits:
+    """
+    单条规则的执行限制
+
+    Attributes:
+        max_chars: 参与匹配的文本最多字符数，超出部分不参与匹配
+        inline_steps: 最坏回溯步数估算（文本长度的 degree 次方）不超过该值的文本直接在当前线程匹配；
+                      默认值在回溯最严重的文本上约耗时数十毫秒，不超过 budget_ms
+        budget_ms: 在子进程中匹配时的时间预算（毫秒）；当前线程匹配超出时只记录日志
+    """
+    max_chars: int = 20000
+    inline_steps: int = 50_000_000
+    budget_ms: float = 200.0
+
+    def inline_chars(self, degree: int) -> int:
+        """回溯次数为 degree 的规则可在当前线程匹配的最大文本长度"""
+        return min(self.max_chars, int(round(self.inline_steps ** (1.0 / max(1, degree)))))
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict], base: Optional["RegexLimits"] = None) -> "RegexLimits":
+        """从配置中读取 max_chars / inline_steps / budget_ms，未配置的项沿用 base"""
+        base = base or cls()
+        if not cfg:
+            return base
+        changes = {key: type(getattr(base, key))(cfg[key])
+                   for key in ("max_chars", "inline_steps", "budget_ms") if cfg.get(key) is not None}
+        return replace(base, **changes) if changes else base
+
+
+class RegexBudgetExceeded(Exception):
+    """规则在子进程中的匹配超出时间预算（已终止）"""
+
+
+def _has_nested_repeat(items, inside_unbounded: bool) -> bool:
+    """解析树中是否有无界量词嵌套在另一个无界量词内"""
+    for op, av in items:
+        name = str(op)
+        if name in _REPEATS:
+            _, high, sub = av
+            unbounded = high == _sre_parse.MAXREPEAT or high >= _UNBOUNDED_MIN
+            if unbounded and inside_unbounded:
+                return True
+            children = [sub]
+            inside = inside_unbounded or unbounded
+        elif name == "SUBPATTERN":
+            children, inside = [av[-1]], inside_unbounded
+        elif name == "BRANCH":
+            children, inside = av[1], inside_unbounded
+        elif name in ("ASSERT", "ASSERT_NOT"):
+            children, inside = [av[1]], inside_unbounded
+        elif name == "GROUPREF_EXISTS":
+            children, inside = [branch for branch in av[1:] if branch], inside_unbounded
+        else:
+            # POSSESSIVE_REPEAT / ATOMIC_GROUP 不回溯，其余为单个字符或位置判断
+            continue
+        if any(_has_nested_repeat(child, inside) for child in children):
+            return True
+    return False
+
+
+def _is_wide(items) -> bool:
+    """量词作用的内容是否能匹配几乎任意字符（. / [^x] / \\S / \\W / \\D 等）"""
+    for op, av in items:
+        name = str(op)
+        if name in ("ANY", "NOT_LITERAL"):
+            return True
+        if name == "IN" and any(str(sub_op) == "NEGATE" or (str(sub_op) == "CATEGORY" and "_NOT_" in str(sub_av))
+                                for sub_op, sub_av in av):
+            return True
+        if name in _REPEATS and _is_wide(av[2]):
+            return True
+        if name == "SUBPATTERN" and _is_wide(av[-1]):
+            return True
+        if name == "BRANCH" and any(_is_wide(branch) for branch in av[1]):
+            return True
+    return False
+
+
+def _char_key(op, av) -> Tuple[str, object]:
+    return str(op), av if str(op) == "LITERAL" else str(av)
+
+
+def _char_set(items) -> Optional[set]:
+    """单个字符位置可匹配的字面字符/类别集合（只处理 x、[xy]、\\s 等简单情形，其余返回 None）"""
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    name = str(op)
+    if name == "LITERAL":
+        return {("LITERAL", av)}
+    if name == "IN" and all(str(sub_op) in ("LITERAL", "CATEGORY") for sub_op, _ in av):
+        return {_char_key(sub_op, sub_av) for sub_op, sub_av in av}
+    return None
+
+
+def _excluded_set(items) -> Optional[set]:
+    """通配量词的内容不能匹配的字面字符/类别集合（[^x]、\\S 等），其他情形返回 None"""
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    name = str(op)
+    if name == "NOT_LITERAL":
+        return {("LITERAL", av)}
+    if name == "IN" and av and str(av[0][0]) == "NEGATE":
+        return {_char_key(sub_op, sub_av) for sub_op, sub_av in av[1:]}
+    if name == "IN" and len(av) == 1 and str(av[0][0]) == "CATEGORY" and "_NOT_" in str(av[0][1]):
+        return {("CATEGORY", str(av[0][1]).replace("_NOT_", "_"))}
+    return None
+
+
+def _is_delimited(sub, following) -> bool:
+    """
+    通配量词的内容与紧随其后的字符互斥（如 [^:：]*[:：]、\\S*\\s）：量词只能停在第一个分隔符前，
+    只扫描一遍，不会在每个回退位置重新尝试后续部分
+    """
+    excluded = _excluded_set(sub)
+    needed = _char_set(following[:1]) if following else None
+    return bool(excluded and needed and needed <= excluded)
+
+
+def _backtrack_cost(items) -> int:
+    """
+    从某一位置开始匹配 items 的最坏步数关于文本长度的次数：无界通配量词在每个回退位置重新尝试后续部分（次数加 1），
+    与其后分隔符互斥的量词只扫描一遍（至少为 1，不与后续部分相乘）；分支取最坏的一支，分组展开到所在序列
+    """
+    items = list(items)
+    if not items:
+        return 0
+    (op, av), rest = items[0], items[1:]
+    name = str(op)
+    if name in _REPEATS:
+        _, high, sub = av
+        if (high == _sre_parse.MAXREPEAT or high >= _UNBOUNDED_MIN) and _is_wide(sub):
+            if _is_delimited(list(sub), rest):
+                return max(1, _backtrack_cost(rest))
+            return 1 + _backtrack_cost(rest)
+        return max(_backtrack_cost(list(sub) + rest), _backtrack_cost(rest))
+    if name == "SUBPATTERN":
+        return _backtrack_cost(list(av[-1]) + rest)
+    if name == "BRANCH":
+        return max(_backtrack_cost(list(branch) + rest) for branch in av[1])
+    if name == "GROUPREF_EXISTS":
+        return max(_backtrack_cost(list(branch or []) + rest) for branch in av[1:])
+    if name in ("ASSERT", "ASSERT_NOT"):
+        return max(_backtrack_cost(av[1]), _backtrack_cost(rest))
+    return _backtrack_cost(rest)
+
+
+def backtrack_degree(pattern: str) -> int:
+    """
+    估算规则最坏情况下回溯步数关于文本长度的次数：起始位置一次，加上从起始位置匹配的次数
+    （如 UPH.*[:：].*PCS/H 在不匹配的文本上约为 n^3，UPH[^:：\\n]*[:：].*PCS/H 约为 n^2）
+
+    Raises:
+        re.error: 正则无效
+    """
+    return 1 + _backtrack_cost(_sre_parse.parse(pattern))
+
+
+def check_pattern(pattern: str) -> Optional[str]:
+    """
+    检查规则是否可能出现灾难性回溯
+
+    Returns:
+        拒绝的原因；可以使用时返回 None
+    """
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except re.error as e:
+        return f"正则无效: {e}"
+    if _has_nested_repeat(parsed, False):
+        return "无界量词嵌套在另一个无界量词内（如 (a+)*），不匹配的长文本上会指数级回溯"
+    cost = _backtrack_cost(parsed)
+    if cost > MAX_WILDCARDS:
+        return (f"同一序列中依次回溯的无界通配量词过多（如 .*、.+，最多 {MAX_WILDCARDS} 个），"
+                f"不匹配的文本上回溯步数约为文本长度的 {cost + 1} 次方；请改用 [^:：\\n]* 等排除其后分隔符的写法")
+    return None
+
+
+def _search_span(pattern: str, flags: int, text: str) -> Optional[Tuple[int, int]]:
+    match = re.compile(pattern, flags).search(text)
+    return match.span() if match else None
+
+
+def _ready() -> bool:
+    return True
+
+
+class _RegexWorkers:
+    """
+    在子进程中匹配长文本的进程池：每个子进程同时只执行一个匹配，按需启动到 max_workers 个；
+    超时的子进程单独终止，不影响其他线程正在进行的匹配
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self._idle: List = []
+        self._started = 0
+        self._cond = threading.Condition()
+
+    def _acquire(self, timeout: float):
+        """
+        Raises:
+            multiprocessing.TimeoutError: timeout 秒内没有空闲的子进程
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._idle and self._started >= self.max_workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise multiprocessing.TimeoutError(f"{timeout:.3f} 秒内没有空闲的匹配子进程")
+                self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            pool = multiprocessing.get_context("spawn").Pool(1)
+            # 等子进程启动完成后再计时，启动耗时不计入规则的预算
+            pool.apply(_ready)
+            return pool
+        except BaseException:
+            self._release(None)
+            raise
+
+    def _release(self, pool) -> None:
+        """归还空闲的子进程；pool 为 None 表示该子进程已终止"""
+        with self._cond:
+            if pool is None:
+                self._started -= 1
+            else:
+                self._idle.append(pool)
+            self._cond.notify()
+
+    def search(self, regex: re.Pattern, text: str, timeout: float) -> Optional[Tuple[int, int]]:
+        """
+        等待空闲子进程与匹配各自最多 timeout 秒
+
+        Raises:
+            multiprocessing.TimeoutError: 超过 timeout 秒未完成（子进程已终止）或没有空闲的子进程
+        """
+        pool = self._acquire(timeout)
+        try:
+            result = pool.apply_async(_search_span, (regex.pattern, regex.flags, text)).get(timeout)
+        except BaseException:
+            pool.terminate()
+            self._release(None)
+            raise
+        self._release(pool)
+        return result
+
+    def close(self) -> None:
+        """终止空闲的子进程（正在匹配的子进程归还后仍可使用，之后按需重新启动）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+            self._cond.notify_all()
+        for pool in idle:
+            pool.terminate()
+
+
+_workers = _RegexWorkers(max(2, min(4, os.cpu_count() or 1)))
+atexit.register(_workers.close)
+
+
+def configure_workers(max_workers: int) -> None:
+    """
+    设置本进程匹配子进程的数量上限（批处理的多进程 worker 各设为 1，整批最多与 worker 数相同）
+    """
+    with _workers._cond:
+        _workers.max_workers = max(1, int(max_workers))
+        _workers._cond.notify_all()
+
+
+def shutdown_workers() -> None:
+    """终止本进程空闲的匹配子进程（批处理结束时调用；进程退出时也会自动调用）"""
+    _workers.close()
+
+
+class GuardedPattern:
+    """带执行限制的编译后正则（规则计划中文本规则的 pattern），search 返回命中区间"""
+    __slots__ = ("regex", "field", "limits", "inline_chars")
+
+    def __init__(self, pattern: Union[str, re.Pattern], field: str, limits: RegexLimits = RegexLimits()):
+        self.regex = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+        self.field = field
+        self.limits = limits
+        # 不超过该长度的文本在当前线程匹配，最坏回溯步数不超过 limits.inline_steps
+        self.inline_chars = limits.inline_chars(backtrack_degree(self.regex.pattern))
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    def search(self, text: str) -> Optional[Tuple[int, int]]:
+        """
+        在 text 中查找第一个匹配
+
+        Returns:
+            (start, end)；未匹配时为 None
+
+        Raises:
+            RegexBudgetExceeded: 长文本在子进程中的匹配超出时间预算，或预算内没有空闲的匹配子进程
+        """
+        limits = self.limits
+        if len(text) > limits.max_chars:
+            text = text[:limits.max_chars]
+        if len(text) <= self.inline_chars:
+            start = time.perf_counter()
+            match = self.regex.search(text)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > limits.budget_ms:
+                LoggerFactory.create_logger("RegexGuard").warning(
+                    f"规则 {self.field} 匹配耗时 {elapsed_ms:.0f} ms，超出预算 {limits.budget_ms:.0f} ms"
+                    f"（文本 {len(text)} 字符），请检查 re_rule")
+            return match.span() if match else None
+        try:
+            return _workers.search(self.regex, text, limits.budget_ms / 1000)
+        except multiprocessing.TimeoutError as e:
+            metrics.REGEX_BUDGET_EXCEEDED.inc(field=self.field)
+            reason = f"：{e}" if e.args else "，已终止匹配"
+            raise RegexBudgetExceeded(f"规则 {self.field} 匹配超出时间预算 {limits.budget_ms:.0f} ms"
+                                      f"（文本 {len(text)} 字符）{reason}")
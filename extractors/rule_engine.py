@@ -0,0 +1,439 @@
+# 单次扫描的字段规则引擎
+# 字段配置（master / page / title 三类规则）先编译为 RulePlan；提取时按页码与 (标题, 副标题) 建一次索引，
+# 每页的展开形状只遍历一次，把该形状分派给本页所有尚未命中的规则。
+# 每条规则仍取“按形状顺序第一个命中”的结果，最后按规则在配置中的顺序回放写入，flat_result 与逐条规则扫描完全一致。
+import re
+import time
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from content_models import calculate_iou
+from extractors.regex_guard import GuardedPattern, RegexLimits, check_pattern
+from utils import tracing
+from utils.logger import LoggerFactory
+from utils.text_utils import traditional_to_simplified
+
+# 文本规则只作用于这些形状类型，表格规则只作用于表格
+TEXT_SHAPE_TYPES = ("文本框", "矩形")
+TABLE_SHAPE_TYPE = "Table"
+PAGE_IOU_THRESHOLD = 0.3
+
+
+@dataclass(frozen=True)
+class MasterRule:
+    """母版形状按 IOU 定位（每页取第一个命中的形状，后面的页覆盖前面的页）"""
+    seq: int
+    field: str
+    position: Tuple[float, ...]
+    threshold: float
+
+
+@dataclass(frozen=True)
+class PageRule:
+    """指定页按 IOU 定位，need_split 时按分隔符拆分到 storage_var 中的多个字段"""
+    seq: int
+    field: str
+    box: Tuple[float, ...]
+    need_split: Optional[str]
+    storage_vars: Any
+
+
+@dataclass(frozen=True)
+class TextRule:
+    """
+    标题页内按正则匹配文本框/矩形，match_rule 含义见 ExtractorA._extract_text_by_re；pattern 为空时不匹配
+
+    normalize 为真时规则与形状文本都转为简体后再匹配（取值仍取原文中的同一区间）
+    """
+    seq: int
+    field: str
+    pattern: Any
+    match_rule: int
+    normalize: bool = False
+
+
+@dataclass(frozen=True)
+class TableRule:
+    """标题页内第一个表格最后一行的指定列"""
+    seq: int
+    field: str
+    column: str
+
+
+class RulePlan:
+    """
+    字段配置编译结果（只读，可在多个线程、多个PPT之间共享）
+
+    每条规则带有在配置中的顺序号 seq，提取时按 seq 回放写入，保证结果键顺序与逐条规则执行时相同。
+    文本规则编译为带执行限制的 GuardedPattern（配置中的 re_limits 为默认限制，字段配置可单独覆盖）；
+    可能灾难性回溯的规则在编译时被拒绝，记入 rejected 并记录错误日志，该字段留空。
+    配置中 normalize_text 为真时（字段配置可单独覆盖），规则转为简体后编译，匹配简体文本，只需写简体写法。
+    """
+    _cache: Dict[int, Tuple[Dict, "RulePlan"]] = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, config: Dict):
+        """
+        Args:
+            config: 字段配置（如 FIELDS_CONFIG.发包规范V1_PPT）
+
+        Raises:
+            ValueError: master 规则的位置不足4个坐标
+        """
+        seq = 0
+        master_cfg = config.get("master", {}) or {}
+        master_rules = []
+        threshold = master_cfg.get("iou_threshold", 0.1)
+        for field, position in master_cfg.get("iou", {}).items():
+            if len(position) < 4:
+                raise ValueError(f"position of {field} is empty, please check the fields_config.yaml")
+            master_rules.append(MasterRule(seq, field, tuple(position), threshold))
+            seq += 1
+
+        page_rules: Dict[int, List[PageRule]] = {}
+        for page_num, page_cfg in config.get("page", {}).items():
+            rules = page_rules.setdefault(int(page_num), [])
+            for field, iou_cfg in page_cfg.get("iou", {}).items():
+                rules.append(PageRule(seq, field, tuple(iou_cfg.get("box")), iou_cfg.get("need_split"),
+                                      iou_cfg.get("storage_var")))
+                seq += 1
+
+        title_rules = []
+        self.rejected: Dict[str, str] = {}
+        default_limits = RegexLimits.from_config(config.get("re_limits"))
+        default_normalize = bool(config.get("normalize_text", False))
+        for title_cfg in config.get("title", []):
+            text_rules = []
+            for field, field_cfg in title_cfg.get("re", {}).items():
+                re_rule = field_cfg.get("re_rule", "")
+                normalize = bool(field_cfg.get("normalize_text", default_normalize))
+                if normalize and re_rule:
+                    re_rule = traditional_to_simplified(re_rule)
+                pattern = ""
+                reason = check_pattern(re_rule) if re_rule else None
+                if reason:
+                    self.rejected[field] = reason
+                    LoggerFactory.create_logger("RulePlan").error(f"字段 {field} 的 re_rule 已停用: {reason}: {re_rule}")
+                elif re_rule:
+                    pattern = GuardedPattern(re.compile(re_rule), field,
+                                             RegexLimits.from_config(field_cfg, default_limits))
+                text_rules.append(TextRule(seq, field, pattern, field_cfg.get("match_rule", 0), normalize))
+                seq += 1
+            table_rules = []
+            for field, field_cfg in title_cfg.get("table", {}).items():
+                table_rules.append(TableRule(seq, field, field_cfg["match_key_string"]))
+                seq += 1
+            title_rules.append((title_cfg["first"], title_cfg.get("second", ""),
+                                tuple(text_rules), tuple(table_rules)))
+
+        self.master_rules = tuple(master_rules)
+        self.page_rules = {page: tuple(rules) for page, rules in page_rules.items()}
+        self.title_rules = tuple(title_rules)
+        self.size = seq
+
+    def rules(self) -> List[Any]:
+        """按配置顺序返回全部规则"""
+        rules: List[Any] = list(self.master_rules)
+        for page_rules in self.page_rules.values():
+            rules.extend(page_rules)
+        for _, _, text_rules, table_rules in self.title_rules:
+            rules.extend(text_rules)
+            rules.extend(table_rules)
+        return sorted(rules, key=lambda rule: rule.seq)
+
+    @classmethod
+    def for_config(cls, config: Dict) -> "RulePlan":
+        """按配置对象缓存编译结果（同一个 ConfigLoader 的配置只编译一次）"""
+        cached = cls._cache.get(id(config))
+        if cached is not None and cached[0] is config:
+            return cached[1]
+        plan = cls(config)
+        with cls._cache_lock:
+            cls._cache[id(config)] = (config, plan)
+        return plan
+
+
+class RuleStats:
+    """
+    逐条规则的评估统计（诊断用，按规则 seq 汇总）
+
+    tests 为测试过的形状数，matches 为命中次数，total_s / max_s 为单次评估的累计与最大耗时；
+    多个PPT用 add_deck 汇总时，decks 为找到了规则所在页面的PPT数，decks_matched 为命中的PPT数。
+    """
+
+    def __init__(self):
+        self.decks = 0
+        self.rules: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_entry(rule) -> Dict[str, Any]:
+        return {
+            "field": rule.field,
+            "kind": type(rule).__name__,
+            "pattern": getattr(getattr(rule, "pattern", None), "pattern", None),
+            "tests": 0,
+            "matches": 0,
+            "total_s": 0.0,
+            "max_s": 0.0,
+            "decks": 0,
+            "decks_matched": 0,
+        }
+
+    def _entry(self, rule) -> Dict[str, Any]:
+        entry = self.rules.get(rule.seq)
+        if entry is None:
+            entry = self.rules[rule.seq] = self._new_entry(rule)
+        return entry
+
+    def get(self, rule) -> Dict[str, Any]:
+        """规则的统计；从未评估过的规则返回全零的统计"""
+        return self.rules.get(rule.seq) or self._new_entry(rule)
+
+    def applicable(self, rule) -> None:
+        """规则所在的页面存在（标题页 / 指定页码找到）"""
+        self._entry(rule)["decks"] = 1
+
+    def record(self, rule, seconds: float, matched: bool) -> None:
+        entry = self._entry(rule)
+        entry["tests"] += 1
+        entry["total_s"] += seconds
+        if seconds > entry["max_s"]:
+            entry["max_s"] = seconds
+        if matched:
+            entry["matches"] += 1
+
+    def merge(self, other: "RuleStats") -> None:
+        """并入同一个PPT内的统计（如单页扫描的统计）"""
+        for seq, item in other.rules.items():
+            entry = self.rules.setdefault(seq, dict(item, tests=0, matches=0, total_s=0.0, max_s=0.0))
+            entry["tests"] += item["tests"]
+            entry["matches"] += item["matches"]
+            entry["total_s"] += item["total_s"]
+            entry["max_s"] = max(entry["max_s"], item["max_s"])
+            entry["decks"] = max(entry["decks"], item["decks"])
+
+    def add_deck(self, deck: "RuleStats") -> None:
+        """汇总一个PPT的统计（线程安全）"""
+        with self._lock:
+            self.decks += 1
+            for seq, item in deck.rules.items():
+                entry = self.rules.setdefault(seq, dict(item, tests=0, matches=0, total_s=0.0, max_s=0.0,
+                                                        decks=0, decks_matched=0))
+                entry["tests"] += item["tests"]
+                entry["matches"] += item["matches"]
+                entry["total_s"] += item["total_s"]
+                entry["max_s"] = max(entry["max_s"], item["max_s"])
+                entry["decks"] += item["decks"]
+                entry["decks_matched"] += 1 if item["matches"] else 0
+
+    def costs_ms(self) -> Dict[str, float]:
+        """{字段名: 累计耗时毫秒}，用于追踪中的 rule_ms"""
+        return {item["field"]: round(item["total_s"] * 1000, 3) for item in self.rules.values() if item["tests"]}
+
+
+class SlideIndex:
+    """按页码与 (标题, 副标题) 索引页面，重复时保留第一页（与顺序查找的结果相同）"""
+
+    def __init__(self, slides: List[Dict]):
+        self.by_page: Dict[int, Dict] = {}
+        self.by_title: Dict[Tuple[str, str], Dict] = {}
+        self.by_first_title: Dict[str, Dict] = {}
+        for slide in slides:
+            self.by_page.setdefault(slide["page_number"], slide)
+            self.by_title.setdefault((slide["title"], slide["second_title"]), slide)
+            self.by_first_title.setdefault(slide["title"], slide)
+
+    def page(self, page_number: int) -> Optional[Dict]:
+        return self.by_page.get(page_number)
+
+    def title(self, first_title: str, second_title: str) -> Optional[Dict]:
+        if not second_title:
+            return self.by_first_title.get(first_title)
+        return self.by_title.get((first_title, second_title))
+
+
+class TextIndex:
+    """
+    单个PPT的归一化文本索引：形状 → (原文, 简体)
+
+    形状在首次被需要归一化的规则测试时转换并记录，本PPT内的后续规则直接取用；
+    不同PPT中相同的文本由 traditional_to_simplified 的缓存复用转换结果。
+    """
+
+    def __init__(self):
+        self._texts: Dict[int, Tuple[str, str]] = {}
+
+    def get(self, shape: Dict) -> Tuple[str, str]:
+        entry = self._texts.get(id(shape))
+        if entry is None:
+            text = shape.get("text", "") or ""
+            entry = self._texts[id(shape)] = (text, traditional_to_simplified(text))
+        return entry
+
+    def simplified(self, shape: Dict) -> str:
+        return self.get(shape)[1]
+
+
+class _SlideJob:
+    """某一页上待命中的规则"""
+    __slots__ = ("slide", "page_rules", "text_rules", "table_rules")
+
+    def __init__(self, slide: Dict):
+        self.slide = slide
+        self.page_rules: List[PageRule] = []
+        self.text_rules: List[TextRule] = []
+        self.table_rules: List[TableRule] = []
+
+
+class RuleEngine:
+    """
+    单次扫描执行 RulePlan
+
+    Args:
+        plan: 编译后的规则
+        match_text: 文本规则的匹配函数 (shape, rule, slide) -> 命中结果，返回假值表示未命中
+        flat_shapes: 取页面展开形状列表的函数
+        logger: 可选日志
+        stats: 传入时逐条规则统计评估次数、命中与耗时，每次 run() 作为一个PPT汇总进去
+    """
+
+    def __init__(self, plan: RulePlan, match_text: Callable[[Dict, TextRule, Dict], Any],
+                 flat_shapes: Callable[[Dict], List[Dict]], logger=None, stats: Optional[RuleStats] = None):
+        self.plan = plan
+        self.match_text = match_text
+        self.flat_shapes = flat_shapes
+        self.logger = logger
+        self.stats = stats
+
+    def run(self, slides: List[Dict]) -> Dict:
+        """提取所有字段，返回与逐条规则执行相同顺序的 flat_result"""
+        writes: Dict[int, List[Tuple[str, Any]]] = {}
+        # 诊断或追踪开启时才逐条规则计时，否则扫描中只多一次 None 判断
+        collect = self.stats is not None or tracing.enabled()
+        deck_stats = RuleStats() if self.stats is not None else None
+        if self.plan.master_rules:
+            with tracing.span("extract.master", rules=len(self.plan.master_rules)):
+                self._run_master(slides, writes, deck_stats)
+
+        index = SlideIndex(slides)
+        jobs: Dict[int, _SlideJob] = {}
+
+        def job_for(slide: Dict) -> _SlideJob:
+            job = jobs.get(id(slide))
+            if job is None:
+                job = jobs[id(slide)] = _SlideJob(slide)
+            return job
+
+        for page_number, rules in self.plan.page_rules.items():
+            slide = index.page(page_number)
+            if slide:
+                job_for(slide).page_rules.extend(rules)
+                if deck_stats is not None:
+                    for rule in rules:
+                        deck_stats.applicable(rule)
+        for first_title, second_title, text_rules, table_rules in self.plan.title_rules:
+            slide = index.title(first_title, second_title)
+            if not slide:
+                continue
+            # 标题页找到后字段总会写入，未命中时为 None
+            for rule in text_rules + table_rules:
+                writes[rule.seq] = [(rule.field, None)]
+                if deck_stats is not None:
+                    deck_stats.applicable(rule)
+            job = job_for(slide)
+            job.text_rules.extend(text_rules)
+            job.table_rules.extend(table_rules)
+
+        for job in jobs.values():
+            rules = len(job.page_rules) + len(job.text_rules) + len(job.table_rules)
+            with tracing.span("extract.scan", page=job.slide["page_number"], rules=rules) as span:
+                # 规则在同一次扫描中交错执行，只能按规则累计耗时
+                job_stats = RuleStats() if collect else None
+                self._scan_slide(job, writes, job_stats)
+                if job_stats is not None:
+                    span.set(rule_ms=job_stats.costs_ms())
+                    if deck_stats is not None:
+                        deck_stats.merge(job_stats)
+        if deck_stats is not None:
+            self.stats.add_deck(deck_stats)
+
+        flat_result = {}
+        for seq in sorted(writes):
+            for key, value in writes[seq]:
+                flat_result[key] = value
+        return flat_result
+
+    def _run_master(self, slides: List[Dict], writes: Dict[int, List[Tuple[str, Any]]],
+                    stats: Optional[RuleStats] = None) -> None:
+        if stats is not None and slides:
+            for rule in self.plan.master_rules:
+                stats.applicable(rule)
+        for slide in slides:
+            pending = list(self.plan.master_rules)
+            for shape in slide.get("master_shapes", []):
+                for rule in list(pending):
+                    if stats is None:
+                        iou = calculate_iou(shape["box"], rule.position)
+                    else:
+                        start = time.perf_counter()
+                        iou = calculate_iou(shape["box"], rule.position)
+                        stats.record(rule, time.perf_counter() - start, iou > rule.threshold)
+                    if iou > rule.threshold:
+                        if self.logger:
+                            self.logger.debug(f"匹配 master 字段 {rule.field}，计算 IOU: {iou:.2f}")
+                        writes[rule.seq] = [(rule.field, shape.get("text", ""))]
+                        pending.remove(rule)
+                if not pending:
+                    break
+
+    def _scan_slide(self, job: _SlideJob, writes: Dict[int, List[Tuple[str, Any]]],
+                    stats: Optional[RuleStats] = None) -> None:
+        """
+        遍历一页的展开形状一次，每个形状分派给本页所有未命中的规则
+
+        Args:
+            stats: 传入时记录每条规则对每个形状的评估耗时与是否命中
+        """
+        slide = job.slide
+        page_rules, text_rules, table_rules = list(job.page_rules), list(job.text_rules), list(job.table_rules)
+        for shape in self.flat_shapes(slide):
+            if not (page_rules or text_rules or table_rules):
+                break
+            for rule in list(page_rules):
+                if stats is None:
+                    matched = calculate_iou(shape["box"], rule.box) > PAGE_IOU_THRESHOLD
+                else:
+                    start = time.perf_counter()
+                    matched = calculate_iou(shape["box"], rule.box) > PAGE_IOU_THRESHOLD
+                    stats.record(rule, time.perf_counter() - start, matched)
+                if matched:
+                    writes[rule.seq] = self._page_writes(rule, shape.get("text", ""))
+                    page_rules.remove(rule)
+            shape_type = shape["type"]
+            if text_rules and shape_type in TEXT_SHAPE_TYPES:
+                for rule in list(text_rules):
+                    if stats is None:
+                        result = self.match_text(shape, rule, slide)
+                    else:
+                        start = time.perf_counter()
+                        result = self.match_text(shape, rule, slide)
+                        stats.record(rule, time.perf_counter() - start, bool(result))
+                    if result:
+                        writes[rule.seq] = [(rule.field, result)]
+                        text_rules.remove(rule)
+            if table_rules and shape_type == TABLE_SHAPE_TYPE:
+                last_row = shape["last_row"]
+                for rule in table_rules:
+                    writes[rule.seq] = [(rule.field, last_row.get(rule.column, ""))]
+                    if stats is not None:
+                        stats.record(rule, 0.0, rule.column in last_row)
+                table_rules = []
+
+    @staticmethod
+    def _page_writes(rule: PageRule, text: str) -> List[Tuple[str, Any]]:
+        if rule.need_split and isinstance(rule.storage_vars, list):
+            parts = text.split(rule.need_split)
+            return [(var, parts[idx]) for idx, var in enumerate(rule.storage_vars) if var and idx < len(parts)]
+        return [(rule.field, text)]
@@ -1,13 +1,23 @@
+import os
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from ui.发包规范_window_ui import DemoMainWindow
 
+# 启动基准探针：设置该环境变量时，窗口显示后立即输出标记并退出（见 benchmarks/startup.py）
+STARTUP_PROBE_ENV = "PPT_PROCESSOR_STARTUP_PROBE"
+
 def main():
     """主函数"""
     app = QApplication(sys.argv)
     window = DemoMainWindow()
     window.show()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        print("first-window", flush=True)
+        sys.exit(0)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 打包后的程序需要支持 spawn 子进程（长文本的正则在子进程中限时匹配）
+    multiprocessing.freeze_support()
+    main()
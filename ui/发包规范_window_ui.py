@@ -1,7 +1,7 @@
 import sys
 import os
-import re
 import traceback
+from contextlib import nullcontext
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QFileDialog,
                              QPushButton, QLabel, QTextEdit, QCheckBox,
@@ -11,10 +11,20 @@ from PyQt5.QtGui import QFont, QIcon
 from utils.logger import LoggerFactory, LOG_LEVELS, LEVEL_MAP
 from utils.resource import resource_path
 from config.loader import ConfigLoader
-from PyQt5.QtCore import QThread, pyqtSignal
-from extractors.extrator_发包规范 import ExtractorExcel
-# 初始化处理器
-from core.packing_file_发包规范 import PackingFileProcessor
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from core.project_index import ProjectIndexLoader
+from core.catalog import DirectoryCatalog
+
+# 后台读取方案总表线程
+class ExcelLoadThread(QThread):
+    progress = pyqtSignal(int, int)   # 已读取行数, 预计总行数
+    loaded = pyqtSignal(int, str)     # 读取行数, 错误信息（成功时为空）
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+    def run(self):
+        index = self.loader.load(progress_callback=self.progress.emit)
+        self.loaded.emit(len(index), self.loader.error or "")
 
 # 后台处理线程
 class ProcessThread(QThread):
@@ -22,60 +32,101 @@ class ProcessThread(QThread):
     error = pyqtSignal(str)
     log_signal = pyqtSignal(str)
     auto_info_signal = pyqtSignal(str, str)  # 新增，传递自动匹配的名称和类型
-    def __init__(self, processor, selected_dir, data_list=None, manual_proj_name_value=None, manual_proj_action_value=None):
+    def __init__(self, processor, selected_dir, data_list=None, manual_proj_name_value=None, manual_proj_action_value=None,
+                 catalog=None, log_level="INFO", profiler=None, journal_path=None):
         super().__init__()
         self.processor = processor
         self.selected_dir = selected_dir
+        self.catalog = catalog
         self.data_list = data_list
         self.manual_proj_name_value = manual_proj_name_value
         self.manual_proj_action_value = manual_proj_action_value
+        self.log_level = log_level
+        self.profiler = profiler  # 配置开启性能剖析时逐PPT输出 .pstats 与内存分配排行
+        self.journal_path = journal_path  # 检查点日志：上次处理中途退出时跳过已完成的PPT
     def emit_log(self, msg):
         self.log_signal.emit(msg)
     def run(self):
         try:
-            self.processor.set_log_callback(self.emit_log)
+            from core.pipeline import ProcessingContext
+            # 本线程的日志回调与输入只放在上下文中，处理器实例不保存逐次调用的状态
+            context = ProcessingContext(
+                data_list=self.data_list,
+                manual_proj_name_value=self.manual_proj_name_value,
+                manual_proj_action_value=self.manual_proj_action_value,
+                version="v1",
+                log_callback=self.emit_log,
+                log_level=self.log_level,
+            )
             # 1. 获取所有PPT文件路径
-            pptx_paths = self.processor.get_v3_pptx_directories(self.selected_dir)
+            pptx_paths = self.processor.get_v3_pptx_directories(self.selected_dir, catalog=self.catalog)
             results = {}
-            
-            for pptx_path in pptx_paths:
-                try:
+            journal = self._open_journal()
+            try:
+                self._process_decks(pptx_paths, context, results, journal)
+            finally:
+                if journal is not None:
+                    journal.close()
+            self.finished.emit(results)
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def _open_journal(self):
+        if not self.journal_path:
+            return None
+        from core.journal import BatchJournal
+        resume = BatchJournal.interrupted(self.journal_path)
+        if resume:
+            self.emit_log("检测到上次处理中途退出，跳过已完成的PPT继续处理")
+        return BatchJournal(self.journal_path, resume=resume)
+
+    def _process_decks(self, pptx_paths, context, results, journal):
+        for pptx_path in pptx_paths:
+            record = journal.completed(pptx_path) if journal is not None else None
+            if record is not None:
+                results[pptx_path] = record["output"]
+                self.emit_log(f"上次已完成，跳过: {pptx_path}")
+                continue
+            record = {"pptx": pptx_path, "output": None, "status": "failed", "error": None, "reports": {}}
+            try:
+                planned = journal.planned_output(pptx_path) if journal is not None else None
+                if planned:
+                    # 续跑时沿用上次的结果目录，不再新建 result_N
+                    result_dir = os.path.dirname(planned)
+                    os.makedirs(result_dir, exist_ok=True)
+                else:
                     dir_path = os.path.dirname(pptx_path)
-                    result_dir = self.processor._create_result_dir(dir_path)
-                    
-                    # 2. 提取PPT数据
-                    extracted_data = self.processor.extract_ppt_data(
-                        pptx_path, version="v1",
-                        data_list=self.data_list,
-                        manual_proj_name_value=self.manual_proj_name_value,
-                        manual_proj_action_value=self.manual_proj_action_value
-                    )
+                    result_dir = self.processor._create_result_dir(dir_path, context)
+                if journal is not None:
+                    journal.plan([(pptx_path, os.path.join(result_dir,
+                                                           self.processor.get_output_filename(pptx_path)))])
+                    journal.start(pptx_path)
+                
+                profiling = self.profiler.profile(pptx_path) if self.profiler else nullcontext()
+                with profiling as profile_report:
+                    # 2. 读取、提取并匹配（每个PPT只解析一次，结果供界面反馈与导出共用）
+                    result = self.processor.analyze(pptx_path, context)
                     
                     # 3. 发送自动匹配信息到UI
-                    matched_name = extracted_data.get("name", "")
-                    matched_action = extracted_data.get("Action", "")
-                    self.auto_info_signal.emit(matched_name, matched_action)
-                    
-                    # 4. 生成输出文件名
-                    filename = os.path.basename(pptx_path)
-                    base_name = os.path.splitext(filename)[0]
-                    v3_pattern = re.compile(r'^(.*?)[vV]3')
-                    match = v3_pattern.search(base_name)
-                    prefix = match.group(1).strip('_') if match else base_name
-                    output_filename = f"{prefix}_v1_发包规范.docx"
-                    output_path = os.path.join(result_dir, output_filename)
+                    self.auto_info_signal.emit(result.get("name", ""), result.get("Action", ""))
                     
-                    # 5. 导出文档
-                    success = self.processor.export_to_docx(pptx_path, output_path, extracted_data)
-                    if success:
-                        results[pptx_path] = output_path
-                        
-                except Exception as e:
-                    self.emit_log(f"处理文件 {pptx_path} 失败: {str(e)}\n{traceback.format_exc()}")
+                    # 4. 导出启用的报表（共用同一分析结果与图片缓存）
+                    outputs = self.processor.render_reports(result, result_dir, context)
+                if profile_report is not None:
+                    flags = f"，超出阈值: {profile_report['flags']}" if profile_report["flags"] else ""
+                    self.emit_log(f"性能剖析: 耗时 {profile_report['seconds']} s，峰值内存 "
+                                  f"{profile_report['peak_mb']} MB{flags}，结果: {profile_report['pstats']}")
+                output_path = outputs.get("发包规范") or next((p for p in outputs.values() if p), None)
+                if output_path:
+                    results[pptx_path] = output_path
+                record.update(output=output_path, reports=outputs,
+                              status="ok" if outputs and all(outputs.values()) else "failed")
                     
-            self.finished.emit(results)
-        except Exception as e:
-            self.error.emit(str(e))
+            except Exception as e:
+                record["error"] = str(e)
+                self.emit_log(f"处理文件 {pptx_path} 失败: {str(e)}\n{traceback.format_exc()}")
+            if journal is not None:
+                journal.finish(record)
 
 
 class DemoMainWindow(QMainWindow):
@@ -87,34 +138,64 @@ class DemoMainWindow(QMainWindow):
         icon_path = resource_path("icon.ico")
         self.setWindowIcon(QIcon(icon_path))
 
-        # 初始化配置和日志
+        # 配置、处理器和总表在窗口显示后再加载（见 _deferred_init），窗口先行出现
+        self.configs = None
+        self.logger = None
+        self.processor = None
+        self.data_list = []
+        self.index_loader = None
+        self.excel_thread = None
+        self.catalog = None
+        self.selected_dirs = []
+        self.ui_log_level = "INFO"  # 输出到界面日志框的等级，随处理线程传入
+        self.profiler = None  # app_settings.yaml 中 profiling.enabled 为 true 时创建
+
+        # 绑定控件
+        self._bind_widgets()
+        self._connect_signals()
+        self.apply_style()
+
+        self.manual_proj_name_value = ""
+        self.manual_proj_action.setCurrentIndex(0)
+        self.manual_proj_action_value = self.manual_proj_action.currentText()
+        self.read_project_status.setEnabled(False)
+        self.generate_btn.setEnabled(False)
+        self.status_label.setText("初始化中...")
+        QTimer.singleShot(0, self._deferred_init)
+
+    def _deferred_init(self):
+        """事件循环启动后加载配置、处理器并读取总表"""
+        # 处理器模块较重，首次使用时才导入
+        from core.packing_file_发包规范 import PackingFileProcessor
         self.configs = ConfigLoader()
         self.logger = LoggerFactory.create_logger("DemoUI")
         level = LoggerFactory.get_global_log_level()
-        self.processor = None
-        self.selected_dirs = []
 
         # 显示日志目录
         logs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logs"))
         self.append_log(f"日志目录: {logs_dir}")
 
-        # 绑定控件
-        self._bind_widgets()
-        self._connect_signals()
-        self.apply_style()
-        
-        # 设置日志等级下拉框初始值
+        if self.configs.is_dir_catalog_enabled():
+            self.catalog = DirectoryCatalog.from_config(self.configs)
+
+        if self.configs.get_profiling_config().get("enabled"):
+            from utils.profiling import DeckProfiler
+            self.profiler = DeckProfiler.from_config(self.configs)
+            self.append_log(f"已开启性能剖析，结果目录: {self.profiler.directory}")
 
+        # 设置日志等级下拉框初始值
         self.processor = PackingFileProcessor(self.configs)
+        self.ui_log_level = level
         for i in range(self.log_level_combo.count()):
             if self.log_level_combo.itemText(i) == level:
                 self.log_level_combo.setCurrentIndex(i)
                 break
-        self.manual_proj_name_value = ""
-        self.manual_proj_action.setCurrentIndex(0)
-        self.manual_proj_action_value = self.manual_proj_action.currentText()
-        self.read_project_status.setEnabled(False)
-        self.data_list = self._read_from_local_excel()
+        # 总表在后台线程读取，窗口立即可用；处理线程仅在匹配总表时才等待读取完成
+        self.index_loader = ProjectIndexLoader(self.configs)
+        self.data_list = self.index_loader
+        self.generate_btn.setEnabled(True)
+        self.status_label.setText("就绪")
+        self.reload_project_sheet()
 
     def apply_style(self):
         self.setStyleSheet("""
@@ -183,10 +264,12 @@ class DemoMainWindow(QMainWindow):
         self.auto_proj_name = self.findChild(QLabel, "auto_proj_name_label")
         self.auto_proj_action = self.findChild(QLabel, "auto_proj_action_label")
         self.read_project_status = self.findChild(QCheckBox, "chBox_read_ProjectStatus") # 状态圆如用自定义控件可用
+        self.reload_excel_btn = self.findChild(QPushButton, "reload_excel_btn")
 
     def _connect_signals(self):
         self.select_dir_btn.clicked.connect(self.select_directories)
         self.generate_btn.clicked.connect(self.generate_output)
+        self.reload_excel_btn.clicked.connect(self.reload_project_sheet)
         self.log_level_combo.currentTextChanged.connect(self.change_log_level)
         # 新增：手动输入信号与槽函数绑定
         self.manual_proj_name.editingFinished.connect(self.on_manual_proj_name_changed)
@@ -196,18 +279,24 @@ class DemoMainWindow(QMainWindow):
     def on_manual_proj_name_changed(self):
         value = self.manual_proj_name.text()
         self.manual_proj_name_value = value
-        self.logger.debug(f"手动工程名字输入: {value}")
+        if self.logger:
+            self.logger.debug(f"手动工程名字输入: {value}")
         self.append_log(f"手动工程名字输入: {value}")
 
     def on_manual_proj_action_changed(self, value):
         self.manual_proj_action_value = value
-        self.logger.debug(f"手动工程类型选择: {value}")
+        if self.logger:
+            self.logger.debug(f"手动工程类型选择: {value}")
         self.append_log(f"手动工程类型选择: {value}")
 
     def select_directories(self):
         """选择多个目录，显示所有已选目录"""
         default_dir = os.getcwd()
-        if isinstance(self.configs.config, dict) and 'default_dirs' in self.configs.config:
+        recent_roots = [r for r in self.catalog.recent_roots() if os.path.isdir(r)] if self.catalog else []
+        if recent_roots:
+            # 优先打开最近扫描过的目录
+            default_dir = recent_roots[0]
+        elif isinstance(self.configs.config, dict) and 'default_dirs' in self.configs.config:
             if isinstance(self.configs.config['default_dirs'], list) and len(self.configs.config['default_dirs']) > 0:
                 default_dir = os.path.abspath(self.configs.config['default_dirs'][0])
                 if not os.path.exists(default_dir):
@@ -224,11 +313,18 @@ class DemoMainWindow(QMainWindow):
             dirs_str = '\n'.join(self.selected_dirs)
             self.selected_dir_label.setText("已选目录数: {}".format(len(self.selected_dirs)))
             self.log_display.append(f"当前已选择的目录：\n{dirs_str}")
+            if self.catalog:
+                known = self.catalog.known_decks(folderName)
+                if known:
+                    self.append_log(f"目录缓存中已知 {len(known)} 个v3 PPT（上次扫描结果，生成时增量刷新）")
         else:
             if not self.selected_dirs:
                 self.selected_dir_label.setText("未选择目录")
 
     def change_log_level(self, level):
+        if self.processor is None:
+            # 初始化阶段设置下拉框初始值时触发，无需处理
+            return
         new_level = LEVEL_MAP[level]
         self.logger.setLevel(new_level)
         for logger in LoggerFactory._loggers.values():
@@ -237,7 +333,7 @@ class DemoMainWindow(QMainWindow):
             for handler in logger.handlers:
                 handler.setLevel(new_level)
         self.append_log(f"日志级别已切换为: {level}")
-        self.processor.change_log_level(level)
+        self.ui_log_level = level
 
 
     def generate_output(self):
@@ -246,6 +342,8 @@ class DemoMainWindow(QMainWindow):
             self.logger.warning("请先选择目录")
             return
         self.append_log("开始处理...")
+        if self.index_loader and self.index_loader.state == ProjectIndexLoader.LOADING:
+            self.append_log("方案总表仍在读取，匹配总表时将等待读取完成")
         try:
             self.status_label.setText("处理中...")
             self.generate_btn.setEnabled(False)
@@ -263,6 +361,11 @@ class DemoMainWindow(QMainWindow):
         self.auto_proj_name.setText(name)
         self.auto_proj_action.setText(action)
 
+    def _journal_path(self, selected_dir):
+        """每个目录一份检查点日志（放在缓存目录的 journals 下）"""
+        from core.journal import BatchJournal
+        return BatchJournal.default_path(self.configs.get_cache_dir(), [selected_dir], "numbered")
+
     def _process_next_dir(self):
         if not self._pending_dirs:
             # 全部处理完成
@@ -280,7 +383,10 @@ class DemoMainWindow(QMainWindow):
             return
         # 启动后台线程
         self.process_thread = ProcessThread(self.processor, item, self.data_list,
-                                            self.manual_proj_name_value, self.manual_proj_action_value)
+                                            self.manual_proj_name_value, self.manual_proj_action_value,
+                                            catalog=self.catalog, log_level=self.ui_log_level,
+                                            profiler=self.profiler,
+                                            journal_path=self._journal_path(item))
         self.process_thread.finished.connect(self._on_single_process_finished)
         self.process_thread.error.connect(self._on_single_process_error)
         self.process_thread.log_signal.connect(self.append_log)
@@ -308,24 +414,40 @@ class DemoMainWindow(QMainWindow):
         scrollbar = self.log_display.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
 
-    def _read_from_local_excel(self):
+    def reload_project_sheet(self):
+        """在后台线程（重新）读取方案总表，无需重启程序"""
+        if self.index_loader is None:
+            return
+        if self.excel_thread and self.excel_thread.isRunning():
+            self.append_log("方案总表正在读取中，请稍候")
+            return
+        self.index_loader.begin()
+        self.read_project_status.setChecked(False)
+        self.read_project_status.setText("项目总表格读取中...")
+        self.reload_excel_btn.setEnabled(False)
+        self.append_log("开始后台读取方案总表...")
+        self.excel_thread = ExcelLoadThread(self.index_loader)
+        self.excel_thread.progress.connect(self._on_excel_progress)
+        self.excel_thread.loaded.connect(self._on_excel_loaded)
+        self.excel_thread.start()
+
+    def _on_excel_progress(self, done, total):
+        self.read_project_status.setText(f"项目总表格读取中 ({done}/{total})")
+
+    def _on_excel_loaded(self, row_count, error):
         """
-        读取本地Excel，异常保护，日志根据等级显示和记录
+        总表读取结束，异常保护，日志根据等级显示和记录
         """
-        try:
-            extractor = ExtractorExcel(self.configs)
-            data_list = extractor.extract()  # 返回 [dict1, dict2, ...]
-            self.logger.info(f"成功读取Excel数据，共{len(data_list)}行")
-            self.append_log(f"成功读取Excel数据，共{len(data_list)}行")
-            self.read_project_status.setChecked(True)  # 读取成功，设为True
-            return data_list
-        except Exception as e:
-            msg = f"读取Excel失败: {e}"
-            if self.logger:
-                self.logger.error(msg)
+        self.read_project_status.setText("项目总表格读取")
+        self.reload_excel_btn.setEnabled(True)
+        if error:
+            msg = f"读取Excel失败: {error}"
+            self.logger.error(msg)
             self.append_log(msg)
             self.read_project_status.setChecked(False)  # 读取失败，设为False
-            return []
+            return
+        self.append_log(f"成功读取Excel数据，共{row_count}行")
+        self.read_project_status.setChecked(True)  # 读取成功，设为True
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -3,6 +3,7 @@ from logging.handlers import TimedRotatingFileHandler
 from datetime import datetime
 import os
 import sys
+import threading
 
 LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
 LEVEL_MAP = {
@@ -16,6 +17,7 @@ class LoggerFactory:
 
     _loggers = {}
     _global_config = {}
+    _lock = threading.RLock()  # 多线程同时创建同名logger时避免重复添加handler
 
     @classmethod
     def set_global_config(cls, log_level="INFO", log_dir="logs", fmt="%Y_%m_%d", retention_days=30):
@@ -35,6 +37,13 @@ class LoggerFactory:
         fmt: str = None,
         retention_days: int = None
     ) -> logging.Logger:
+        with cls._lock:
+            if name in cls._loggers:
+                return cls._loggers[name]
+            return cls._create_logger(name, log_level, log_dir, fmt, retention_days)
+
+    @classmethod
+    def _create_logger(cls, name, log_level, log_dir, fmt, retention_days) -> logging.Logger:
         # 优先用全局配置
         cfg = cls._global_config
         log_level = log_level or cfg.get("log_level", "INFO")
@@ -95,6 +104,16 @@ class LoggerFactory:
             cls._loggers[name] = logger
         return logger
 
+    @classmethod
+    def apply_level(cls, level: str):
+        """将日志等级应用到全局配置及所有已创建的logger"""
+        cls._global_config["log_level"] = level
+        new_level = LEVEL_MAP[level]
+        for logger in cls._loggers.values():
+            logger.setLevel(new_level)
+            for handler in logger.handlers:
+                handler.setLevel(new_level)
+
     @classmethod
     def get_global_log_level(cls):
         """返回当前全局日志等级（字符串）"""
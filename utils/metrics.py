@@ -0,0 +1,304 @@
+# 运行指标：计数器、仪表与直方图，供批处理 / 监视模式 / 服务内嵌时观察吞吐量与尾部延迟
+# 以 Prometheus 文本格式导出到文件，或在本机地址上提供 HTTP 端点（/metrics）
+# 每次更新只有一次无竞争的加锁与加法，处理器与渲染器中直接调用；多进程模式下子进程内的更新不汇总到主进程
+import os
+import time
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from utils.logger import LoggerFactory
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值组合保存各自的子项，子项在首次使用时创建"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """按标签取子项；常用的子项可在模块级保存后直接调用 inc()/observe()"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """只增不减的计数器（如已处理的PPT数、缓存命中次数）"""
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def _samples(self) -> Iterable[str]:
+        for key, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """可增可减的当前值（如队列长度、忙碌的工作线程数）"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.labels(**labels).dec(amount)
+
+    def set(self, value: float, **labels) -> None:
+        self.labels(**labels).set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一项为 +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """按区间统计的分布（如各阶段耗时），可由 histogram_quantile 计算 P95/P99"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def _samples(self) -> Iterable[str]:
+        for key, child in self._items():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标只创建一次，render() 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """导出到文件（先写临时文件再替换，node_exporter 的 textfile 收集器不会读到半个文件）"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        在后台线程提供 HTTP 端点（GET /metrics），默认只监听本机地址
+
+        Returns:
+            ThreadingHTTPServer: 调用 shutdown() 停止；port 为 0 时实际端口见 server_address
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+        logger = LoggerFactory.create_logger("Metrics")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"指标端点: http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+# 本工具的指标（处理器、渲染器、批处理与监视模式共用）
+DECKS = REGISTRY.counter("packing_decks_total", "已处理的PPT数", ["status"])
+DECK_SECONDS = REGISTRY.histogram("packing_deck_seconds", "单个PPT从读取到写完文档的耗时（秒）")
+STAGE_SECONDS = REGISTRY.histogram("packing_stage_seconds", "处理器各阶段耗时（秒）", ["stage"])
+REPORTS = REGISTRY.counter("packing_reports_total", "生成的报表文档数", ["report", "status"])
+SLIDE_RENDER_SECONDS = REGISTRY.histogram("packing_slide_render_seconds", "整页图片导出耗时（秒）")
+CACHE_REQUESTS = REGISTRY.counter("packing_cache_requests_total", "缓存查询次数（按缓存与是否命中）",
+                                  ["cache", "result"])
+REGEX_BUDGET_EXCEEDED = REGISTRY.counter("packing_regex_budget_exceeded_total",
+                                         "正则规则匹配超出时间预算而被终止的次数", ["field"])
+LEASES = REGISTRY.counter("packing_leases_total", "分布式批处理的租约事件（认领、回收过期租约、租约被回收）",
+                          ["event"])
+QUEUE_DEPTH = REGISTRY.gauge("packing_queue_depth", "等待处理的条目数", ["queue"])
+WORKERS = REGISTRY.gauge("packing_workers", "工作线程/协程数", ["pool"])
+WORKERS_BUSY = REGISTRY.gauge("packing_workers_busy", "正在处理的工作线程/协程数", ["pool"])
+WORKER_BUSY_SECONDS = REGISTRY.counter("packing_worker_busy_seconds_total",
+                                       "工作线程/协程累计忙碌时间（秒），除以 packing_workers 即利用率", ["pool"])
+
+
+def observe_deck(record: Dict) -> None:
+    """按处理记录（status / elapsed）更新PPT计数与耗时"""
+    DECKS.inc(status=record.get("status", "failed"))
+    if record.get("status") != "skipped" and record.get("elapsed") is not None:
+        DECK_SECONDS.observe(record["elapsed"])
+
+
+class _Busy:
+    __slots__ = ("pool", "start")
+
+    def __init__(self, pool: str):
+        self.pool = pool
+        self.start = 0.0
+
+    def __enter__(self) -> "_Busy":
+        self.start = time.perf_counter()
+        WORKERS_BUSY.inc(pool=self.pool)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        WORKERS_BUSY.dec(pool=self.pool)
+        WORKER_BUSY_SECONDS.inc(time.perf_counter() - self.start, pool=self.pool)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramValue):
+        self.child = child
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+def busy(pool: str) -> _Busy:
+    """with metrics.busy("watch"): ... 期间计为一个忙碌的工作线程，并累计忙碌时间"""
+    return _Busy(pool)
+
+
+def timed(histogram: Histogram, **labels) -> _Timer:
+    """with metrics.timed(STAGE_SECONDS, stage="read"): ... 把语句块耗时记入直方图"""
+    return _Timer(histogram.labels(**labels))
+
+
+def cache_hit(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
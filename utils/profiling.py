@@ -0,0 +1,132 @@
+# 逐PPT性能剖析：用 cProfile 与 tracemalloc 包住单个PPT的处理，输出 .pstats 与内存分配排行，
+# 峰值内存或耗时超过阈值的PPT在记录中标记并写警告日志，用于排查生产批次中的异常PPT
+# cProfile 只记录调用线程，tracemalloc 统计整个进程的分配，因此同一进程内应逐个剖析PPT
+import os
+import time
+import hashlib
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from utils.logger import LoggerFactory
+
+main_dir = Path(__file__).resolve().parent.parent  # 项目根目录
+
+# 分配排行中忽略的模块（剖析工具自身与导入机制）
+_IGNORED_FILES = (tracemalloc.__file__, cProfile.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class DeckProfiler:
+    """
+    单个PPT的 CPU 与内存剖析
+
+    每个PPT在 directory 下生成 <文件名>_<路径摘要>.pstats（可用 snakeviz / pstats 查看）
+    与 <文件名>_<路径摘要>.alloc.txt（按代码行统计的前 top_n 项内存分配）；
+    不同目录下的同名PPT以路径摘要区分。对象只保存配置，可传给子进程使用。
+    """
+
+    def __init__(self, directory: str, top_n: int = 25, max_peak_mb: Optional[float] = None,
+                 max_seconds: Optional[float] = None, frames: int = 1):
+        self.directory = directory
+        self.top_n = max(1, int(top_n))
+        self.max_peak_mb = max_peak_mb
+        self.max_seconds = max_seconds
+        self.frames = max(1, int(frames))
+
+    @classmethod
+    def from_config(cls, config, directory: Optional[str] = None) -> "DeckProfiler":
+        """按 app_settings.yaml 的 profiling 配置创建；directory 覆盖配置中的输出目录"""
+        cfg = config.get_profiling_config()
+        directory = directory or os.path.join(main_dir, cfg.get("dir") or ".profiles")
+        return cls(directory, top_n=cfg.get("top_n", 25), max_peak_mb=cfg.get("max_peak_mb"),
+                   max_seconds=cfg.get("max_seconds"), frames=cfg.get("frames", 1))
+
+    def base_path(self, pptx_path: str) -> str:
+        """剖析文件的路径前缀（不含扩展名）"""
+        stem = os.path.splitext(os.path.basename(pptx_path))[0]
+        digest = hashlib.sha1(os.path.abspath(pptx_path).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, f"{stem}_{digest}")
+
+    @contextmanager
+    def profile(self, pptx_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        剖析 with 语句块内对一个PPT的处理，用法：
+
+            with profiler.profile(pptx_path) as report:
+                result = processor.analyze(pptx_path, context)
+                processor.render_reports(result, output_dir, context)
+
+        Returns:
+            dict: 退出 with 语句块后填入 pstats / allocations 文件路径、seconds、peak_mb 与超出阈值的 flags
+        """
+        logger = LoggerFactory.create_logger("DeckProfiler")
+        report: Dict[str, Any] = {"pstats": None, "allocations": None, "seconds": None, "peak_mb": None, "flags": []}
+        owns_tracing = not tracemalloc.is_tracing()
+        if owns_tracing:
+            tracemalloc.start(self.frames)
+        else:
+            tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        profiler: Optional[cProfile.Profile] = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # 同一线程已有其他剖析器（如调试器、外层 cProfile）时只统计耗时与内存
+            logger.warning(f"无法启用 cProfile: {e}")
+            profiler = None
+        try:
+            yield report
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if owns_tracing:
+                tracemalloc.stop()
+            report["seconds"] = round(seconds, 3)
+            report["peak_mb"] = round(max(0, peak - baseline) / 1024 / 1024, 2)
+            try:
+                self._write(pptx_path, report, profiler, snapshot)
+            except OSError as e:
+                logger.error(f"写入剖析结果失败: {pptx_path}: {e}")
+            self._check_thresholds(pptx_path, report, logger)
+
+    def _write(self, pptx_path: str, report: Dict[str, Any], profiler: Optional[cProfile.Profile],
+               snapshot: tracemalloc.Snapshot) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = self.base_path(pptx_path)
+        if profiler is not None:
+            profiler.dump_stats(base + ".pstats")
+            report["pstats"] = base + ".pstats"
+
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, name) for name in _IGNORED_FILES])
+        stats = snapshot.statistics("traceback" if self.frames > 1 else "lineno")
+        lines = [
+            f"PPT: {pptx_path}",
+            f"耗时: {report['seconds']} s  峰值内存: {report['peak_mb']} MB  结束时仍占用: "
+            f"{sum(stat.size for stat in stats) / 1024 / 1024:.2f} MB",
+            "",
+            f"内存分配前 {self.top_n} 项（结束时仍未释放，按代码行统计）:",
+        ]
+        for rank, stat in enumerate(stats[:self.top_n], 1):
+            frame = stat.traceback[0]
+            lines.append(f"#{rank} {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB（{stat.count} 块）")
+            # 首行为分配位置，其后为源码行与（frames > 1 时）调用链
+            lines.extend(f"    {line.strip()}" for line in stat.traceback.format()[1:])
+        with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        report["allocations"] = base + ".alloc.txt"
+
+    def _check_thresholds(self, pptx_path: str, report: Dict[str, Any], logger) -> None:
+        if self.max_peak_mb is not None and report["peak_mb"] > self.max_peak_mb:
+            report["flags"].append("peak_memory")
+        if self.max_seconds is not None and report["seconds"] > self.max_seconds:
+            report["flags"].append("wall_time")
+        if report["flags"]:
+            logger.warning(f"PPT超出性能阈值 {report['flags']}: {pptx_path}"
+                           f"（耗时 {report['seconds']} s，峰值内存 {report['peak_mb']} MB）")
@@ -1,8 +1,11 @@
 import re
+from functools import lru_cache
 from typing import Optional
-import zhconv
 
+@lru_cache(maxsize=8192)
 def traditional_to_simplified(traditional_text):
+    """繁体转简体（按文本缓存，同一文本在各页、各PPT之间只转换一次；zh-hans 转换逐字对应，长度不变）"""
+    import zhconv  # 首次调用时才加载转换词典
     simplified_text = zhconv.convert(traditional_text, 'zh-hans')
     return simplified_text
 
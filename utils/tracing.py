@@ -0,0 +1,219 @@
+# 分阶段耗时追踪：按PPT收集各处理阶段的时间段（span），可导出为 JSON 报告或 Chrome trace-event 格式（火焰图）
+# 未启用追踪时 span() 返回共享的空对象，只多一次 ContextVar 读取，热点路径（逐页、逐规则）可直接埋点
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACE_FORMATS = ("json", "chrome")
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+
+
+class _NoopSpan:
+    """未启用追踪时的 span：不记录任何内容"""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace: "Trace", name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start, time.perf_counter(), self.attrs)
+
+    def set(self, **attrs) -> None:
+        """补充属性（如处理完成后才知道的数量、逐规则耗时）"""
+        self.attrs.update(attrs)
+
+
+class Trace:
+    """
+    单个PPT（或一次批处理中的公共阶段）的追踪记录
+
+    在某个线程中 activate() 后，该线程（及其中的 asyncio 任务）内的 span() 都记录到本对象；
+    提交到线程池的函数用 bind() 包装后在工作线程中同样记录到本对象。
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.epoch = time.time()
+        self._origin = time.perf_counter()
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attrs) -> _Span:
+        return _Span(self, name, attrs)
+
+    def add(self, name: str, start: float, end: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+        """记录一个时间段（start/end 为 time.perf_counter() 的值）"""
+        thread = threading.current_thread()
+        item = {
+            "name": name,
+            "start_ms": round((start - self._origin) * 1000, 3),
+            "dur_ms": round((end - start) * 1000, 3),
+            "pid": os.getpid(),
+            "thread": thread.ident,
+            "thread_name": thread.name,
+            "attrs": attrs or {},
+        }
+        with self._lock:
+            self._spans.append(item)
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """并入另一个追踪的 to_dict() 结果（如子进程中解析阶段的追踪），按两者起点差调整时间"""
+        offset = (other["epoch"] - self.epoch) * 1000
+        with self._lock:
+            for item in other.get("spans", []):
+                self._spans.append(dict(item, start_ms=round(item["start_ms"] + offset, 3)))
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        """在当前线程（上下文）中启用本追踪"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def bind(self, func: Callable) -> Callable:
+        """包装函数：在任意线程中执行时都启用本追踪"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _current.set(self)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current.reset(token)
+        return wrapper
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda item: item["start_ms"])
+        summary: Dict[str, Dict[str, float]] = {}
+        for item in spans:
+            entry = summary.setdefault(item["name"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + item["dur_ms"], 3)
+        return {
+            "name": self.name,
+            "attrs": self.attrs,
+            "epoch": self.epoch,
+            "elapsed_ms": round((time.perf_counter() - self._origin) * 1000, 3),
+            "summary": summary,
+            "spans": spans,
+        }
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def enabled() -> bool:
+    return _current.get() is not None
+
+
+def span(name: str, **attrs):
+    """
+    在当前追踪中记录一个时间段，用法：with tracing.span("read.slide", page=3): ...
+
+    未启用追踪时返回空对象，不记录
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, attrs)
+
+
+def bind_current(func: Callable) -> Callable:
+    """把当前追踪绑定到函数上（提交到线程池前调用）；未启用追踪时原样返回"""
+    trace = _current.get()
+    return func if trace is None else trace.bind(func)
+
+
+class TraceReport:
+    """一次运行的追踪报告：公共阶段（发现文件、读取总表）+ 每个PPT各一份"""
+
+    def __init__(self, run: Optional[Dict[str, Any]] = None, decks: Optional[List[Dict[str, Any]]] = None):
+        self.run = run
+        self.decks: List[Dict[str, Any]] = list(decks or [])
+
+    def add(self, trace: Dict[str, Any]) -> None:
+        self.decks.append(trace)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"run": self.run, "decks": self.decks}
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Chrome trace-event 格式（chrome://tracing、Perfetto、speedscope 可直接打开）
+
+        每个PPT一个 pid（进程名为文件名），线程按实际执行线程区分，时间轴以最早的追踪起点为 0
+        """
+        traces = ([self.run] if self.run else []) + self.decks
+        if not traces:
+            return {"traceEvents": [], "displayTimeUnit": "ms"}
+        base = min(trace["epoch"] for trace in traces)
+        events: List[Dict[str, Any]] = []
+        thread_ids: Dict[Any, int] = {}
+        for pid, trace in enumerate(traces):
+            label = os.path.basename(trace["name"]) or trace["name"]
+            events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": label}})
+            events.append({"ph": "M", "name": "process_sort_index", "pid": pid, "tid": 0, "args": {"sort_index": pid}})
+            offset_us = (trace["epoch"] - base) * 1e6
+            named = set()
+            for item in trace["spans"]:
+                key = (item.get("pid"), item.get("thread"))
+                tid = thread_ids.setdefault(key, len(thread_ids) + 1)
+                if tid not in named:
+                    named.add(tid)
+                    events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                                   "args": {"name": item.get("thread_name") or str(tid)}})
+                events.append({
+                    "name": item["name"],
+                    "cat": item["name"].split(".", 1)[0],
+                    "ph": "X",
+                    "ts": round(offset_us + item["start_ms"] * 1000, 1),
+                    "dur": round(item["dur_ms"] * 1000, 1),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": item["attrs"],
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, fmt: str = "json") -> None:
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"未知的追踪格式: {fmt}，可选: {', '.join(TRACE_FORMATS)}")
+        data = self.to_chrome() if fmt == "chrome" else self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)